@@ -0,0 +1,159 @@
+import sys
+import json
+import time
+import asyncio
+from agents.planner import PlannerAgent
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from core.runtime import get_worker_pool
+from core.deadline import Deadline, deadline_scope
+from core.telemetry import tracer, quantile
+from tools.registry import registry
+
+
+def parse_batch_line(line, line_no):
+    """
+    One input line -> {"id", "query"}, or None for blank lines.
+    Accepts {"id": ..., "query": ...} objects, JSON strings or plain text;
+    the id defaults to the line number so reruns see the same ids.
+    """
+    text = line.strip()
+    if not text:
+        return None
+    if text.startswith("{"):
+        record = json.loads(text)
+        return {"id": str(record.get("id", line_no)), "query": record["query"]}
+    if text.startswith('"'):
+        return {"id": str(line_no), "query": json.loads(text)}
+    return {"id": str(line_no), "query": text}
+
+
+def read_batch(lines, skip_ids=()):
+    """Yields batch records from an iterable of lines, skipping ids already answered."""
+    for line_no, line in enumerate(lines, start=1):
+        try:
+            record = parse_batch_line(line, line_no)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Skipping malformed batch line {line_no}: {e}", file=sys.stderr)
+            continue
+        if record is not None and record["id"] not in skip_ids:
+            yield record
+
+
+def completed_ids(path):
+    """Ids already present in a previous run's output file, for resuming."""
+    ids = set()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    ids.add(str(json.loads(line)["id"]))
+                except (ValueError, KeyError, TypeError):
+                    continue  # Torn last line from an interrupted run
+    except OSError:
+        pass
+    return ids
+
+
+class BatchRunner:
+    """
+    Runs many queries through plan -> execute -> verify with bounded concurrency.
+    Identical tool calls across concurrent queries are merged by BaseTool.arun
+    and repeated ones are served by the shared tool cache, so each distinct
+    call hits its API once per batch.
+    """
+
+    def __init__(self, concurrency=8, ordered=False, planner=None, executor=None, verifier=None):
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.planner = planner or PlannerAgent()
+        self.executor = executor or ExecutorAgent()
+        self.verifier = verifier or VerifierAgent()
+
+    async def arun_one(self, record, tool_defs):
+        """One query -> one output record; failures are reported, never raised."""
+        start = time.perf_counter()
+        result = {"id": record["id"], "query": record["query"]}
+        with tracer.trace() as trace_id, deadline_scope(Deadline.from_env()):
+            try:
+                plan_stream = self.planner.astream_plan(record["query"], tool_defs)
+                results = await self.executor.aexecute_stream(plan_stream)
+                response = await self.verifier.averify_and_respond(record["query"], results)
+                try:
+                    verdict = json.loads(response)
+                except ValueError:
+                    verdict = {"status": "success", "final_answer": response}
+                result["status"] = verdict.get("status", "failure")
+                result["final_answer"] = verdict.get("final_answer")
+                result["steps"] = len(results)
+            except Exception as e:
+                result["status"] = "error"
+                result["error"] = str(e)
+        result["trace_id"] = trace_id
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    async def arun(self, records, sink):
+        """
+        Feeds `records` (any iterable, read lazily so stdin works) to
+        `concurrency` workers and passes each result to `sink` as it
+        completes, or in input order when `ordered` is set.
+        Returns a summary of throughput and latency.
+        """
+        loop = asyncio.get_running_loop()
+        tool_defs = registry.definitions()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        iterator = iter(records)
+        latencies = []
+        failures = 0
+        pending = {}
+        next_to_emit = 0
+        deduplicated_before = tracer.counters.get("tool_calls_deduplicated", 0)
+
+        def emit(seq, result):
+            nonlocal next_to_emit, failures
+            latencies.append(result["latency_ms"])
+            failures += result["status"] != "success"
+            if not self.ordered:
+                sink(result)
+                return
+            pending[seq] = result
+            while next_to_emit in pending:
+                sink(pending.pop(next_to_emit))
+                next_to_emit += 1
+
+        async def produce():
+            seq = 0
+            while True:
+                # Reading may block (stdin), so it happens off the loop thread
+                record = await loop.run_in_executor(get_worker_pool(), next, iterator, None)
+                if record is None:
+                    break
+                await queue.put((seq, record))
+                seq += 1
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                seq, record = item
+                emit(seq, await self.arun_one(record, tool_defs))
+
+        start = time.perf_counter()
+        await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+        wall_s = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "queries": len(latencies),
+            "failures": failures,
+            "wall_s": round(wall_s, 3),
+            "throughput_qps": round(len(latencies) / wall_s, 3) if wall_s else 0.0,
+            "p50_ms": quantile(latencies, 0.50),
+            "p95_ms": quantile(latencies, 0.95),
+            "p99_ms": quantile(latencies, 0.99),
+            "tool_calls_deduplicated": tracer.counters.get("tool_calls_deduplicated", 0) - deduplicated_before
+        }
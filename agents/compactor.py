@@ -0,0 +1,88 @@
+import os
+import json
+from llm.tokens import estimate_tokens
+
+# Floors for the shrink loop; below these results stop being useful
+MIN_LIST_ITEMS = 1
+MIN_STRING_CHARS = 40
+
+
+class ResultCompactor:
+    """
+    Shrinks execution results before they are pasted into the verifier prompt.
+    Drops fields tools mark as noise, empty values and step args, trims long
+    lists and strings, and packs everything as compact JSON. Limits tighten
+    until the estimate fits the token budget.
+    """
+
+    def __init__(self, tools=None, token_budget=None, max_list_items=5, max_string_chars=300):
+        self.tools = tools if tools is not None else {}
+        self.token_budget = token_budget or int(os.getenv("VERIFIER_TOKEN_BUDGET", "1500"))
+        self.max_list_items = max_list_items
+        self.max_string_chars = max_string_chars
+
+    def _shrink(self, value, exclude, max_items, max_chars):
+        if isinstance(value, dict):
+            shrunk = {}
+            for key, item in value.items():
+                if key in exclude or item is None or item == "" or item == [] or item == {}:
+                    continue
+                shrunk[key] = self._shrink(item, exclude, max_items, max_chars)
+            return shrunk
+        if isinstance(value, list):
+            items = [self._shrink(item, exclude, max_items, max_chars) for item in value[:max_items]]
+            if len(value) > max_items:
+                items.append(f"(+{len(value) - max_items} more)")
+            return items
+        if isinstance(value, str) and len(value) > max_chars:
+            return value[:max_chars].rstrip() + "…"
+        if isinstance(value, float):
+            return round(value, 4)
+        return value
+
+    def _pack(self, execution_results, max_items, max_chars):
+        packed = {}
+        for step_id, result in execution_results.items():
+            if isinstance(result, dict) and "output" in result:
+                tool = result.get("tool")
+                exclude = set(self.tools[tool].compact_exclude) if tool in self.tools else set()
+                output = self._shrink(result["output"], exclude, max_items, max_chars)
+                packed[f"{step_id}:{tool}"] = output
+            else:
+                packed[step_id] = self._shrink(result, set(), max_items, max_chars)
+        return json.dumps(packed, separators=(",", ":"), ensure_ascii=False)
+
+    def compact(self, execution_results):
+        """Returns (compact_text, report) where report has the token accounting."""
+        # What the prompt used to receive: str() of the results, or a pre-encoded string
+        before = estimate_tokens(execution_results if isinstance(execution_results, str) else str(execution_results))
+
+        if isinstance(execution_results, str):
+            try:
+                execution_results = json.loads(execution_results)
+            except json.JSONDecodeError:
+                execution_results = {"raw": execution_results}
+        if not isinstance(execution_results, dict):
+            execution_results = {"results": execution_results}
+
+        max_items, max_chars = self.max_list_items, self.max_string_chars
+        text = self._pack(execution_results, max_items, max_chars)
+        while estimate_tokens(text) > self.token_budget and (
+            max_items > MIN_LIST_ITEMS or max_chars > MIN_STRING_CHARS
+        ):
+            max_items = max(MIN_LIST_ITEMS, max_items // 2)
+            max_chars = max(MIN_STRING_CHARS, max_chars // 2)
+            text = self._pack(execution_results, max_items, max_chars)
+
+        after = estimate_tokens(text)
+        packed = text
+        for _ in range(8):
+            if after <= self.token_budget:
+                break
+            # Last resort: cut the packed text itself in proportion to the overshoot
+            packed = packed[: int(len(packed) * self.token_budget / after * 0.9)]
+            text = packed + "…(truncated)"
+            after = estimate_tokens(text)
+
+        report = {"tokens_before": before, "tokens_after": after, "tokens_saved": max(0, before - after)}
+        return text, report
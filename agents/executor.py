@@ -1,46 +1,208 @@
-import concurrent.futures
-from tools.github_tool import GitHubTool
-from tools.weather_tool import WeatherTool
-# Import your other tools as well
-from tools.news_tool import NewsTool
-from tools.currency_tool import CurrencyTool
-from tools.compatibility_tool import CompatibilityTool
-from tools.date_planner_tool import DatePlannerTool
+import re
+import json
+import asyncio
+from core.runtime import run_sync
+from core.deadline import current_deadline, deadline_scope, stage_deadline, timed_out_output
+from tools.registry import registry
+from core.telemetry import tracer
+
+# Matches "{{s1.city}}" or "{{s2.date_venues.0.name}}" inside step args
+REF_PATTERN = re.compile(r"\{\{\s*([A-Za-z0-9_\-]+)((?:\.[A-Za-z0-9_\-]+)*)\s*\}\}")
+
 
 class ExecutorAgent:
-    def __init__(self):
-        # Initializing tools
-        self.tools = {
-            "github_tool": GitHubTool(),
-            "weather_tool": WeatherTool(),
-            "news_tool": NewsTool(),
-            "currency_tool": CurrencyTool(),
-            "compatibility_tool": CompatibilityTool(),
-            "date_planner_tool": DatePlannerTool()
-        }
-
-    def _execute_single_step(self, step):
+    def __init__(self, tools=None):
+        # Tools come from the shared registry and are instantiated on first use
+        self.tools = tools if tools is not None else registry
+
+    async def _execute_single_step(self, step, args):
         """Helper method to execute a single tool step safely."""
         tool_name = step.get("tool")
-        args = step.get("args", {})
-        
+
         if tool_name not in self.tools:
-            return tool_name, {"error": f"Tool {tool_name} not found."}
-        
-        print(f"🔧 Parallel Executing: {tool_name}...")
+            return {"error": f"Tool {tool_name} not found."}
+
+        print(f"🔧 Executing {step['id']}: {tool_name}...")
+        with tracer.span("tool", tool_name, step_id=step["id"]) as span:
+            try:
+                output = await self.tools[tool_name].arun(**args)
+            except Exception as e:
+                output = {"error": str(e)}
+            if isinstance(output, dict) and "error" in output:
+                span.set(error=output["error"])
+            return output
+
+    async def _execute_batch(self, tool_name, batch):
+        """Runs several ready steps of one tool through a single batched call."""
+        step_ids = [step["id"] for step, _ in batch]
+        print(f"🔧 Executing {', '.join(step_ids)}: {tool_name} (batched)...")
+        with tracer.span("tool", tool_name, step_ids=step_ids) as span:
+            try:
+                outputs = await self.tools[tool_name].arun_batch([args for _, args in batch])
+            except Exception as e:
+                outputs = [{"error": str(e)} for _ in batch]
+            errors = [o["error"] for o in outputs if isinstance(o, dict) and "error" in o]
+            if errors:
+                span.set(error=errors[0], errors=len(errors))
+            return outputs
+
+    def _normalize_step(self, raw, index, previous=None):
+        """
+        Gives a step an id and an explicit dependency list.
+        A step without an id gets "s1", "s2", ... by position. A step that
+        references another step's output in its args depends on it, and the
+        legacy "parallel": false flag means "wait for the previous step".
+        """
+        step = dict(raw) if isinstance(raw, dict) else {"tool": None}
+        step["id"] = str(step.get("id") or f"s{index + 1}")
+        step["args"] = step.get("args") or {}
+
+        depends_on = step.get("depends_on") or []
+        if isinstance(depends_on, str):
+            depends_on = [depends_on]
+        depends_on = [str(d) for d in depends_on]
+
+        for ref_id in self._find_refs(step["args"]):
+            if ref_id not in depends_on:
+                depends_on.append(ref_id)
+
+        if not depends_on and step.get("parallel") is False and previous is not None:
+            depends_on = [previous["id"]]
+
+        step["depends_on"] = depends_on
+        return step
+
+    def _normalize_steps(self, steps):
+        normalized = []
+        for index, raw in enumerate(steps):
+            normalized.append(self._normalize_step(raw, index, normalized[-1] if normalized else None))
+        return normalized
+
+    def _find_refs(self, value):
+        """Returns the step ids referenced anywhere inside an args value."""
+        if isinstance(value, str):
+            return [m.group(1) for m in REF_PATTERN.finditer(value)]
+        if isinstance(value, dict):
+            return [ref for v in value.values() for ref in self._find_refs(v)]
+        if isinstance(value, list):
+            return [ref for v in value for ref in self._find_refs(v)]
+        return []
+
+    def _lookup(self, outputs, step_id, path):
+        """Walks a dotted path (dict keys or list indices) into a step output."""
+        value = outputs[step_id]
+        for key in filter(None, path.split(".")):
+            if isinstance(value, list) and key.isdigit():
+                value = value[int(key)]
+            elif isinstance(value, dict):
+                value = value[key]
+            else:
+                raise KeyError(key)
+        return value
+
+    def _resolve_args(self, value, outputs):
+        """
+        Substitutes "{{step_id.path}}" references with earlier outputs.
+        A string that is exactly one reference keeps the referenced value's type.
+        """
+        if isinstance(value, dict):
+            return {k: self._resolve_args(v, outputs) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._resolve_args(v, outputs) for v in value]
+        if not isinstance(value, str):
+            return value
+
+        whole = REF_PATTERN.fullmatch(value.strip())
+        if whole:
+            return self._lookup(outputs, whole.group(1), whole.group(2))
+        return REF_PATTERN.sub(lambda m: str(self._lookup(outputs, m.group(1), m.group(2))), value)
+
+    def _prepare_step(self, step, results):
+        """
+        Resolves a ready step's args against its parents' outputs.
+        Returns (args, None) or (None, error_output) if it cannot run.
+        """
+        for parent in step["depends_on"]:
+            parent_output = results[parent]["output"]
+            if isinstance(parent_output, dict) and "error" in parent_output:
+                return None, {"error": f"Skipped: dependency '{parent}' failed."}
+
+        outputs = {parent: results[parent]["output"] for parent in step["depends_on"]}
         try:
-            output = self.tools[tool_name].execute(**args)
-            return tool_name, output
-        except Exception as e:
-            return tool_name, {"error": str(e)}
+            args = self._resolve_args(step["args"], outputs)
+        except (KeyError, IndexError, TypeError) as e:
+            return None, {"error": f"Could not resolve argument reference: {e}"}
+        if args != step["args"] and step.get("tool") in self.tools:
+            # Referenced values were let through unchecked when the step was admitted
+            args, error = self.tools[step["tool"]].validate_args(args)
+            if error is not None:
+                return None, {"error": error}
+        return args, None
 
-    def execute_plan(self, plan_input):
+    def _admit(self, run, step):
+        """
+        Schedules a step with its args checked and normalized against the
+        tool's schema. A step naming an unknown tool, or whose args cannot
+        be repaired, gets an error output instead, before any call is made.
+        """
+        tool_name = step.get("tool")
+        if tool_name not in self.tools:
+            error = f"Tool {tool_name} not found."
+        else:
+            args, error = self.tools[tool_name].validate_args(step["args"], self._find_refs)
+        if error is not None:
+            print(f"🚫 Rejected {step['id']}: {error}")
+            tracer.incr("plan_steps_rejected")
+            run.invalidate(step, error)
+            return
+        run.add({**step, "args": args})
+
+    def _validate_graph(self, steps):
+        """Returns {step_id: error} for duplicate ids, unknown deps and cycles."""
+        errors = {}
+        ids = [s["id"] for s in steps]
+        known = set(ids)
+
+        for step_id in ids:
+            if ids.count(step_id) > 1:
+                errors[step_id] = f"Duplicate step id '{step_id}'."
+
+        for step in steps:
+            missing = [d for d in step["depends_on"] if d not in known]
+            if missing:
+                errors.setdefault(step["id"], f"Unknown dependency: {', '.join(missing)}.")
+
+        # Kahn's algorithm: whatever never reaches in-degree 0 is on a cycle
+        indegree = {s["id"]: len(set(s["depends_on"]) & known) for s in steps}
+        children = {s["id"]: [] for s in steps}
+        for step in steps:
+            for parent in set(step["depends_on"]):
+                if parent in children:
+                    children[parent].append(step["id"])
+        queue = [sid for sid, deg in indegree.items() if deg == 0]
+        while queue:
+            sid = queue.pop()
+            for child in children[sid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        for sid, deg in indegree.items():
+            if deg > 0:
+                errors.setdefault(sid, "Dependency cycle detected.")
+
+        return errors
+
+    async def aexecute_plan(self, plan_input):
         """
-        Executes the plan. 
+        Executes the plan as a dependency graph.
         Handles both a raw dictionary plan or a (plan, metadata) tuple.
+        Each step starts as soon as all of its parents have finished,
+        and results are keyed by step id so repeated tools don't collide.
+        Under a query deadline, steps still unfinished when the execution
+        stage's share runs out are cancelled and marked as timed out.
         """
         results = {}
-        
+
         # --- FIX START: Handle Tuple vs Dictionary ---
         if isinstance(plan_input, tuple):
             plan = plan_input[0]  # Extract the dictionary from the (plan, metadata) tuple
@@ -49,17 +211,270 @@ class ExecutorAgent:
         # --- FIX END ---
 
         steps = plan.get("steps", []) if isinstance(plan, dict) else []
-        
+
         if not steps:
             print("⚠️ No steps found in plan.")
             return results
 
-        # Using ThreadPoolExecutor to run tools in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(steps)) as executor:
-            future_to_step = {executor.submit(self._execute_single_step, step): step for step in steps}
-            
-            for future in concurrent.futures.as_completed(future_to_step):
-                tool_name, output = future.result()
-                results[tool_name] = output
-        
-        return results
\ No newline at end of file
+        steps = self._normalize_steps(steps)
+        invalid = self._validate_graph(steps)
+        run = _PlanRun(self)
+        for step in steps:
+            if step["id"] in invalid and step["id"] not in run.results:
+                run.invalidate(step, invalid[step["id"]])
+        # Invalid steps already hold an error output, so their children start
+        # right away and are skipped by _prepare_step
+        for step in steps:
+            if step["id"] not in invalid:
+                self._admit(run, step)
+
+        span = tracer.start("execute", steps=len(steps))
+        deadline = stage_deadline("execute")
+        try:
+            # Tool calls started inside inherit the stage deadline and cap their timeouts at it
+            with deadline_scope(deadline):
+                run.launch_ready()
+                while run.running:
+                    done, _ = await asyncio.wait(
+                        run.running, timeout=deadline and deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        self._expire(run, deadline, span)
+                        break
+                    run.collect(done)
+                    run.launch_ready()
+        finally:
+            run.cancel()
+            span.set(failed=run.failed(), merged=len(run.aliases))
+            span.end()
+
+        return run.ordered(steps)
+
+    async def aexecute_stream(self, plan_stream):
+        """
+        Executes a plan while the planner is still generating it (a
+        PlanStream from PlannerAgent.astream_plan()), so the first tool
+        calls overlap with the rest of planning. Each step is scheduled as
+        it arrives and starts once its parents are done, as in aexecute_plan().
+
+        When the stream ends the whole plan is validated: invalid steps get
+        error outputs and results of any that already ran are discarded. If
+        the planner output as a whole is unusable (bad JSON, or steps that
+        differ from what was streamed), in-flight calls are cancelled and the
+        final plan is executed from scratch instead.
+
+        Planning and execution overlap, so under a query deadline they share
+        one slice of it; when that runs out, unfinished steps are cancelled
+        and marked as timed out, and steps not planned yet are dropped.
+        """
+        run = _PlanRun(self)
+        steps = []
+        outer = current_deadline()
+        deadline = stage_deadline("plan", "execute")
+        span = tracer.start("execute", streamed=True)
+        arrival = None
+        try:
+            with deadline_scope(deadline):
+                source = plan_stream.__aiter__()
+                arrival = asyncio.ensure_future(source.__anext__())
+                while arrival is not None or run.running:
+                    waiting = set(run.running)
+                    if arrival is not None:
+                        waiting.add(arrival)
+                    done, _ = await asyncio.wait(
+                        waiting, timeout=deadline and deadline.remaining(), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        if arrival is not None:
+                            span.set(plan_timed_out=True)
+                        self._expire(run, deadline, span)
+                        break
+                    if arrival in done:
+                        done.discard(arrival)
+                        try:
+                            raw = arrival.result()
+                        except StopAsyncIteration:
+                            arrival = None
+                            if not self._finish_stream(run, steps, plan_stream.plan):
+                                run.cancel()
+                                span.set(discarded=True)
+                                # The replacement run takes its own share of what is left
+                                with deadline_scope(outer):
+                                    return await self.aexecute_plan(plan_stream.plan or {})
+                        else:
+                            arrival = asyncio.ensure_future(source.__anext__())
+                            step = self._normalize_step(raw, len(steps), steps[-1] if steps else None)
+                            steps.append(step)
+                            # A repeated id is left to the final validation, which rejects it
+                            if step["id"] not in run.known:
+                                self._admit(run, step)
+                    run.collect(done)
+                    run.launch_ready()
+        finally:
+            if arrival is not None:
+                arrival.cancel()
+            run.cancel()
+            span.set(steps=len(steps), failed=run.failed(), merged=len(run.aliases))
+            span.end()
+
+        return run.ordered(steps)
+
+    def _finish_stream(self, run, steps, plan):
+        """
+        Checks the streamed steps against the final plan. Returns False if
+        they must all be thrown away; otherwise invalidates bad steps in place.
+        """
+        if not isinstance(plan, dict) or plan.get("error"):
+            return False
+        if self._normalize_steps(plan.get("steps") or []) != steps:
+            return False
+        invalid = self._validate_graph(steps)
+        for step in steps:
+            if step["id"] in invalid and step["id"] not in run.invalidated:
+                run.invalidate(step, invalid[step["id"]])
+        # Steps that already consumed an invalidated step's output go too
+        changed = bool(invalid)
+        while changed:
+            changed = False
+            for step in steps:
+                parents = step["depends_on"] + ([run.aliases[step["id"]]] if step["id"] in run.aliases else [])
+                failed = [d for d in parents if d in run.invalidated]
+                if failed and step["id"] not in run.invalidated and step["id"] not in run.pending:
+                    run.invalidate(step, f"Skipped: dependency '{failed[0]}' failed.")
+                    changed = True
+        return True
+
+    def _expire(self, run, deadline, span):
+        timed_out = run.expire(f"Timed out: no result within the {deadline.budget_s:.1f}s budget.")
+        print(f"⏱️ Deadline reached; {timed_out} step(s) timed out.")
+        tracer.incr("steps_timed_out", timed_out)
+        span.set(timed_out=timed_out)
+
+    def execute_plan(self, plan_input):
+        """Blocking wrapper around aexecute_plan() for sync callers."""
+        return run_sync(self.aexecute_plan(plan_input))
+
+    def execute_stream(self, plan_stream):
+        """Blocking wrapper around aexecute_stream() for sync callers."""
+        return run_sync(self.aexecute_stream(plan_stream))
+
+
+class _PlanRun:
+    """
+    Scheduling state of one plan execution. Steps are added as they become
+    known (all at once, or one by one while a plan streams in) and each one
+    starts as soon as all of its parents have finished. A step identical to
+    an earlier one (same tool, args and parents) is merged into it: it never
+    runs, dependents read the earlier step's output, and it is left out of
+    the results.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.results = {}
+        self.known = set()
+        self.invalidated = set()
+        self.pending = {}
+        self.remaining_deps = {}
+        # Independent branches run concurrently as tasks on the current loop
+        self.running = {}
+        # Step signature -> first step id with it; merged step id -> that id
+        self.signatures = {}
+        self.aliases = {}
+
+    def add(self, step):
+        self.known.add(step["id"])
+        self.pending[step["id"]] = step
+        deps = set(step["depends_on"])
+        signature = json.dumps([step.get("tool"), step["args"], sorted(deps)], sort_keys=True, default=str)
+        original = self.signatures.setdefault(signature, step["id"])
+        if original != step["id"]:
+            self.aliases[step["id"]] = original
+            tracer.incr("plan_steps_merged")
+            deps.add(original)
+        self.remaining_deps[step["id"]] = deps - set(self.results)
+
+    def invalidate(self, step, error):
+        """Gives a step an error output instead of running it, or instead of the result it produced."""
+        self.known.add(step["id"])
+        self.invalidated.add(step["id"])
+        self.pending.pop(step["id"], None)
+        self.remaining_deps.pop(step["id"], None)
+        self.complete(step, step["args"], {"error": error})
+
+    def complete(self, step, args, output):
+        self.results[step["id"]] = {"tool": step.get("tool"), "args": args, "output": output}
+        for deps in self.remaining_deps.values():
+            deps.discard(step["id"])
+
+    def launch_ready(self):
+        by_tool = {}
+        ready = [sid for sid, deps in self.remaining_deps.items() if not deps]
+        while ready:
+            for sid in ready:
+                del self.remaining_deps[sid]
+                step = self.pending.pop(sid)
+                if sid in self.aliases:
+                    original = self.results[self.aliases[sid]]
+                    self.complete(step, original["args"], original["output"])
+                    continue
+                args, error = self.executor._prepare_step(step, self.results)
+                if error is not None:
+                    self.complete(step, step["args"], error)
+                else:
+                    by_tool.setdefault(step.get("tool"), []).append((step, args))
+            # Children of skipped steps are ready now too
+            ready = [sid for sid, deps in self.remaining_deps.items() if not deps]
+
+        # Steps of one tool that become ready together go out as one batch
+        for tool_name, batch in by_tool.items():
+            if len(batch) > 1 and tool_name in self.executor.tools:
+                task = asyncio.ensure_future(self.executor._execute_batch(tool_name, batch))
+                self.running[task] = (batch, True)
+            else:
+                for step, args in batch:
+                    task = asyncio.ensure_future(self.executor._execute_single_step(step, args))
+                    self.running[task] = ([(step, args)], False)
+
+    def collect(self, done):
+        for task in done:
+            batch, batched = self.running.pop(task)
+            outputs = task.result() if batched else [task.result()]
+            for (step, args), output in zip(batch, outputs):
+                # Invalidated while in flight: keep the error output
+                if step["id"] not in self.invalidated:
+                    self.complete(step, args, output)
+
+    def cancel(self):
+        for task in self.running:
+            task.cancel()
+
+    def expire(self, error):
+        """
+        Cancels every running call and gives its steps, and every step not
+        started yet, a timed-out output. Returns how many steps were marked.
+        """
+        expired = 0
+        for task, (batch, _) in self.running.items():
+            task.cancel()
+            for step, args in batch:
+                if step["id"] not in self.invalidated:
+                    self.complete(step, args, timed_out_output(error))
+                    expired += 1
+        self.running.clear()
+        for step in list(self.pending.values()):
+            self.complete(step, step["args"], timed_out_output(error))
+            expired += 1
+        self.pending.clear()
+        self.remaining_deps.clear()
+        return expired
+
+    def failed(self):
+        return sum(
+            1 for sid, r in self.results.items()
+            if sid not in self.aliases and isinstance(r["output"], dict) and "error" in r["output"]
+        )
+
+    def ordered(self, steps):
+        # Keep the plan's step order in the returned results
+        return {s["id"]: self.results[s["id"]] for s in steps if s["id"] in self.results and s["id"] not in self.aliases}
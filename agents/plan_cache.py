@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Common ISO codes; lowercase mentions only count for these so words like
+# "all" or "try" are never mistaken for currencies
+CURRENCY_CODES = {
+    "USD", "INR", "EUR", "GBP", "JPY", "AUD", "CAD", "CHF", "CNY", "SGD",
+    "AED", "HKD", "NZD", "SEK", "NOK", "DKK", "ZAR", "RUB", "BRL", "MXN",
+    "KRW", "THB", "MYR", "IDR", "PHP", "PKR", "BDT", "LKR", "NPR", "SAR",
+    "QAR", "KWD", "TRY", "PLN", "ILS", "EGP", "VND", "TWD", "HUF", "CZK"
+}
+
+REPO_PATTERN = re.compile(r"(?<![\w/.-])([A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+)(?![\w/])")
+CURRENCY_PATTERN = re.compile(r"\b([A-Za-z]{3})\b")
+AMOUNT_PATTERN = re.compile(r"(?<![\w.,])(\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?)(?![\w])")
+LOCATION_PATTERN = re.compile(
+    r"\b(?:in|at|near|around|from)\s+([A-Z][\w'-]*(?:(?:\s*,\s*|\s+)[A-Z][\w'-]*)*)"
+)
+SLOT_MARKER = re.compile(r"<<(\w+)>>")
+
+
+def parse_amount(text):
+    value = float(text.replace(",", ""))
+    return int(value) if value.is_integer() else value
+
+
+def extract_slots(query):
+    """
+    Finds the parameter-like parts of a query.
+    Returns (template, slots) where template is the normalized query with
+    each slot replaced by a placeholder such as <location_0> or <amount_0>.
+    """
+    taken = []  # (start, end, kind, value)
+
+    def claim(match, kind, value):
+        start, end = match.span(1)
+        if any(start < t_end and end > t_start for t_start, t_end, _, _ in taken):
+            return
+        taken.append((start, end, kind, value))
+
+    for m in REPO_PATTERN.finditer(query):
+        claim(m, "repo", m.group(1))
+    for m in CURRENCY_PATTERN.finditer(query):
+        code = m.group(1)
+        if code.upper() in CURRENCY_CODES and (code.isupper() or code.islower()):
+            claim(m, "currency", code.upper())
+    for m in AMOUNT_PATTERN.finditer(query):
+        claim(m, "amount", parse_amount(m.group(1)))
+    for m in LOCATION_PATTERN.finditer(query):
+        claim(m, "location", m.group(1).strip(" ,"))
+
+    slots = {}
+    counters = {}
+    pieces = []
+    cursor = 0
+    for start, end, kind, value in sorted(taken):
+        name = f"{kind}_{counters.get(kind, 0)}"
+        counters[kind] = counters.get(kind, 0) + 1
+        slots[name] = value
+        pieces.append(query[cursor:start].lower())
+        pieces.append(f" <{name}> ")
+        cursor = end
+    pieces.append(query[cursor:].lower())
+
+    template = re.sub(r"[^\w<>\s]", " ", "".join(pieces))
+    return " ".join(template.split()), slots
+
+
+class PlanCache:
+    """
+    LRU cache of planner output keyed on the slot-templated query.
+    On store, slot values found in the plan are replaced by markers; on
+    lookup the new query's slot values are filled back in, so "weather in
+    Delhi" and "weather in Mumbai" share one plan without an LLM call.
+    """
+
+    def __init__(self, max_entries=512, min_confidence=0.8):
+        self.max_entries = max_entries
+        self.min_confidence = min_confidence
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.low_confidence = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_entries=int(os.getenv("PLAN_CACHE_SIZE", "512")),
+            min_confidence=float(os.getenv("PLAN_CACHE_MIN_CONFIDENCE", "0.8"))
+        )
+
+    def _key(self, template, tools_definitions):
+        tools_hash = hashlib.sha1(
+            json.dumps(tools_definitions, sort_keys=True).encode()
+        ).hexdigest()[:12]
+        return f"{tools_hash}:{template}"
+
+    def _bind(self, value, slots, bound, track):
+        """Replaces slot values inside a plan value with slot markers."""
+        if isinstance(value, dict):
+            return {k: self._bind(v, slots, bound, track) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._bind(v, slots, bound, track) for v in value]
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)):
+            for name, slot_value in slots.items():
+                if name.startswith("amount_") and value == slot_value:
+                    if track:
+                        bound[name] = "exact"
+                    return {"$slot": name}
+            return value
+        if isinstance(value, str):
+            # Longest values first so "Bellandur, Bangalore" wins over "Bangalore"
+            for name, slot_value in sorted(slots.items(), key=lambda kv: -len(str(kv[1]))):
+                pattern = re.compile(r"(?<!\w)" + re.escape(str(slot_value)) + r"(?!\w)", re.IGNORECASE)
+                if pattern.search(value):
+                    exact = pattern.fullmatch(value.strip()) is not None
+                    value = pattern.sub(f"<<{name}>>", value)
+                    if track and bound.get(name) != "exact":
+                        bound[name] = "exact" if exact else "partial"
+            return value
+        return value
+
+    def _fill(self, value, slots):
+        if isinstance(value, dict):
+            if set(value) == {"$slot"}:
+                return slots[value["$slot"]]
+            return {k: self._fill(v, slots) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._fill(v, slots) for v in value]
+        if isinstance(value, str):
+            return SLOT_MARKER.sub(lambda m: str(slots[m.group(1)]), value)
+        return value
+
+    def store(self, query, tools_definitions, plan):
+        """Caches a freshly generated plan; failed or empty plans are ignored."""
+        if not isinstance(plan, dict) or plan.get("error") or not plan.get("steps"):
+            return
+        template, slots = extract_slots(query)
+
+        bound = {}
+        steps = []
+        for step in plan["steps"]:
+            if not isinstance(step, dict):
+                return
+            step = dict(step)
+            step["args"] = self._bind(step.get("args") or {}, slots, bound, track=True)
+            if isinstance(step.get("reason"), str):
+                step["reason"] = self._bind(step["reason"], slots, bound, track=False)
+            steps.append(step)
+
+        entry = {
+            "plan": json.dumps({**plan, "steps": steps}),
+            "bound": bound,
+            "example_slots": slots
+        }
+        key = self._key(template, tools_definitions)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def confidence(self, entry, slots):
+        """
+        Share of slots we can trust to fill. A slot the plan never referenced
+        may have been used in a transformed form (e.g. "Bangalore" written as
+        "Bengaluru"), so it only counts if its value is unchanged. A slot that
+        only matched part of an arg ("Delhi" in "New Delhi") counts half.
+        """
+        if not slots:
+            return 1.0
+        trusted = 0.0
+        for name, value in slots.items():
+            if entry["example_slots"].get(name) == value or entry["bound"].get(name) == "exact":
+                trusted += 1
+            elif entry["bound"].get(name) == "partial":
+                trusted += 0.5
+        return trusted / len(slots)
+
+    def lookup(self, query, tools_definitions):
+        """Returns a filled plan, or None when the LLM should plan instead."""
+        template, slots = extract_slots(query)
+        key = self._key(template, tools_definitions)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if self.confidence(entry, slots) < self.min_confidence:
+                self.low_confidence += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._fill(json.loads(entry["plan"]), slots)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.low_confidence = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "low_confidence": self.low_confidence,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries)
+            }
@@ -1,35 +1,165 @@
 import json
+import asyncio
 from llm.client import LLMClient
+from llm.json_stream import JsonArrayStream
+from core.runtime import run_sync
+from core.deadline import stage_deadline, within
+from agents.plan_cache import PlanCache
+from agents.router import IntentRouter
+from core.telemetry import tracer
+
+class PlanStream:
+    """
+    A plan arriving step by step, from PlannerAgent.astream_plan().
+    Iterate it once with `async for` to get each step as soon as it is
+    complete; afterwards `plan` holds the whole plan ({"steps": [], "error": ...}
+    if the planner output turned out to be invalid).
+    """
+
+    def __init__(self):
+        self.plan = None
+        self._steps = None
+
+    def __aiter__(self):
+        return self._steps
+
 
 class PlannerAgent:
+    # Shared across planner instances so every query warms the same cache
+    plan_cache = PlanCache.from_env()
+    # Rule-based fast path for common query shapes, tried before the cache and the LLM
+    router = IntentRouter.from_env()
+
     def __init__(self):
         self.llm = LLMClient()
 
-    def create_plan(self, user_query, tools_definitions):
-        prompt = f"""
-        You are an expert Planner Agent. Your goal is to break down the user query into steps.
+    def _plan_locally(self, user_query, tools_definitions, span):
+        """A plan from the router or the plan cache, or None when the LLM has to plan."""
+        routed, confidence = self.router.route(user_query, tools_definitions)
+        if routed is not None:
+            print("⚡ Routed locally, skipping planner LLM call.")
+            tracer.incr("plan_router_hits")
+            span.set(routed=True, source="router", router_confidence=confidence, steps=len(routed["steps"]))
+            return routed
+        if self.router.enabled:
+            tracer.incr("plan_router_deferred")
+            span.set(router_confidence=confidence)
+
+        cached = self.plan_cache.lookup(user_query, tools_definitions)
+        if cached is not None:
+            print("⚡ Plan cache hit, skipping planner LLM call.")
+            span.set(cache_hit=True, source="plan_cache", steps=len(cached.get("steps", [])))
+        return cached
+
+    async def acreate_plan(self, user_query, tools_definitions):
+        with tracer.span("plan") as span:
+            local = self._plan_locally(user_query, tools_definitions, span)
+            if local is not None:
+                return local, None
+
+            try:
+                plan_data, usage = await within(self._plan_with_llm(user_query, tools_definitions), stage_deadline("plan"))
+            except asyncio.TimeoutError:
+                print("⏱️ Planner ran out of its share of the query deadline.")
+                span.set(timed_out=True)
+                plan_data, usage = {"steps": [], "error": "Planner timed out"}, None
+            span.set(source="llm", steps=len(plan_data.get("steps", [])))
+            if plan_data.get("error"):
+                span.set(error=plan_data["error"])
+            return plan_data, usage
+
+    def astream_plan(self, user_query, tools_definitions):
+        """
+        Returns a PlanStream that yields the plan's steps while the planner
+        LLM is still writing the rest, for ExecutorAgent.aexecute_stream().
+        Router and plan cache hits yield all their steps at once.
+        """
+        stream = PlanStream()
+        stream._steps = self._astream_steps(stream, user_query, tools_definitions)
+        return stream
+
+    async def _astream_steps(self, stream, user_query, tools_definitions):
+        # Started explicitly: a generator's context does not persist across yields
+        span = tracer.start("plan", stream=True)
+        try:
+            local = self._plan_locally(user_query, tools_definitions, span)
+            if local is not None:
+                stream.plan = local
+                for step in local.get("steps", []):
+                    yield step
+                return
+
+            extractor = JsonArrayStream("steps")
+            async for chunk in self.llm.astream_chat(self._build_messages(user_query, tools_definitions), json_mode=True):
+                for step in extractor.feed(chunk):
+                    if "first_step_ms" not in span.attrs:
+                        span.set(first_step_ms=round(span.elapsed_ms(), 3))
+                    yield step
+
+            plan_data = self._parse_plan(extractor.text)
+            stream.plan = plan_data
+            span.set(source="llm", steps=len(plan_data.get("steps", [])))
+            if plan_data.get("error"):
+                span.set(error=plan_data["error"])
+            self.plan_cache.store(user_query, tools_definitions, plan_data)
+        finally:
+            span.end()
+
+    def _build_messages(self, user_query, tools_definitions):
+        # Everything but the query is the same on every call, so the system
+        # prompt is one stable prefix the LLM client can cache and reuse
+        return [
+            {"role": "system", "content": self._system_prompt(tools_definitions)},
+            {"role": "user", "content": f"User Query: {user_query}"}
+        ]
+
+    def _system_prompt(self, tools_definitions):
+        # sort_keys: the prefix must not change with dict ordering
+        return f"""
+        You are an expert Planner Agent. Your goal is to break down the user query
+        (sent as the user message) into steps.
         
-        CRITICAL: Identify steps that can be executed in PARALLEL. 
-        - If two tool calls do not depend on each other's output, mark them as "parallel": true.
-        - If a step needs data from a previous tool, mark it "parallel": false.
+        CRITICAL: Steps form a dependency graph and independent steps run in PARALLEL.
+        - Give every step a short unique "id" ("s1", "s2", ...).
+        - If a step needs data from earlier steps, list their ids in "depends_on".
+        - Reference an earlier output inside "args" as "{{{{step_id.field}}}}",
+          e.g. "{{{{s1.city}}}}" or "{{{{s2.date_venues.0.name}}}}".
+        - Independent steps use "depends_on": [] and "parallel": true.
 
-        User Query: {user_query}
-        Available Tools: {json.dumps(tools_definitions)}
+        Available Tools: {json.dumps(tools_definitions, sort_keys=True)}
         
         Format the output as a clean JSON object:
         {{
             "steps": [
                 {{
+                    "id": "s1",
                     "tool": "tool_name", 
                     "args": {{...}}, 
+                    "depends_on": [],
                     "parallel": true, 
                     "reason": "why I need this"
                 }}
             ]
         }}
         """
+
+    def _parse_plan(self, plan_text):
+        # Clean up potential markdown formatting that breaks json.loads
+        plan_text = plan_text.replace("```json", "").replace("```", "").strip()
+
+        try:
+            plan_data = json.loads(plan_text)
+        except json.JSONDecodeError as e:
+            # Fallback for common LLM parsing errors
+            print(f"❌ JSON Parsing Error: {e}")
+            plan_data = {"steps": [], "error": "Failed to parse AI plan"}
+        if not isinstance(plan_data, dict):
+            plan_data = {"steps": [], "error": "Failed to parse AI plan"}
+        return plan_data
+
+    async def _plan_with_llm(self, user_query, tools_definitions):
         # Call LLM with JSON mode
-        response = self.llm.chat([{"role": "system", "content": prompt}], json_mode=True)
+        response = await self.llm.achat(self._build_messages(user_query, tools_definitions), json_mode=True)
         
         # --- FIX START: Handle different response types ---
         if hasattr(response, 'text'):
@@ -40,16 +170,12 @@ class PlannerAgent:
             # It's already a string (LLMClient might have pre-extracted .text)
             plan_text = response
             usage = None 
-
-        # Clean up potential markdown formatting that breaks json.loads
-        plan_text = plan_text.replace("```json", "").replace("```", "").strip()
-        
-        try:
-            plan_data = json.loads(plan_text)
-        except json.JSONDecodeError as e:
-            # Fallback for common LLM parsing errors
-            print(f"❌ JSON Parsing Error: {e}")
-            plan_data = {"steps": [], "error": "Failed to parse AI plan"}
         # --- FIX END ---
-        
-        return plan_data, usage
\ No newline at end of file
+
+        plan_data = self._parse_plan(plan_text)
+        self.plan_cache.store(user_query, tools_definitions, plan_data)
+        return plan_data, usage
+
+    def create_plan(self, user_query, tools_definitions):
+        """Blocking wrapper around acreate_plan() for sync callers."""
+        return run_sync(self.acreate_plan(user_query, tools_definitions))
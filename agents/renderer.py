@@ -0,0 +1,72 @@
+import json
+from core.deadline import is_timed_out
+
+
+class AnswerRenderer:
+    """
+    Turns structured tool results into a final answer without an LLM call.
+    Tools register by implementing render_answer(args, output); the
+    verifier only bypasses the model when every step succeeded and every
+    step's tool produced a sentence. A partial render, the fallback when
+    the query deadline leaves no time for the verifier LLM, answers from
+    the steps that did succeed and names the ones that did not.
+    """
+
+    def __init__(self, tools=None):
+        # Looked up per render so lazily loaded tools are only built when used
+        self.tools = tools if tools is not None else {}
+        self._renderers = {}
+
+    def register(self, tool_name, render_fn):
+        self._renderers[tool_name] = render_fn
+
+    def _renderer_for(self, tool_name):
+        render_fn = self._renderers.get(tool_name)
+        if render_fn is None and tool_name in self.tools:
+            render_fn = self.tools[tool_name].render_answer
+        return render_fn
+
+    def render(self, execution_results, partial=False):
+        """Returns the answer text, or None when the LLM verifier is needed."""
+        if isinstance(execution_results, str):
+            try:
+                execution_results = json.loads(execution_results)
+            except json.JSONDecodeError:
+                return None
+        if not isinstance(execution_results, dict) or not execution_results:
+            return None
+
+        sentences = []
+        for result in execution_results.values():
+            sentence = self._render_step(result)
+            if sentence is None and partial and isinstance(result, dict):
+                sentence = self._missing_step(result)
+            if sentence is None and not partial:
+                return None
+            if sentence:
+                sentences.append(sentence)
+        return " ".join(sentences) if sentences else None
+
+    def _render_step(self, result):
+        if not isinstance(result, dict):
+            return None
+        output = result.get("output")
+        render_fn = self._renderer_for(result.get("tool"))
+        if render_fn is None or output is None:
+            return None
+        if isinstance(output, dict) and "error" in output:
+            return None
+        try:
+            return render_fn(result.get("args") or {}, output) or None
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    def _missing_step(self, result):
+        """A short note for a step a partial answer has to leave out, or "" to skip it silently."""
+        output = result.get("output")
+        label = str(result.get("tool") or "tool").removesuffix("_tool").replace("_", " ")
+        if is_timed_out(output):
+            return f"The {label} lookup did not finish in time."
+        if isinstance(output, dict) and "error" in output:
+            return f"The {label} lookup failed."
+        return ""
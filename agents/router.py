@@ -0,0 +1,393 @@
+import os
+import re
+import threading
+from agents.plan_cache import CURRENCY_CODES, REPO_PATTERN, AMOUNT_PATTERN, parse_amount
+from tools.venue_store import CATEGORY_SYNONYMS
+from tools.rates import CURRENCY_NAMES
+
+# A clause ends at sentence punctuation, or at "and" / "then" / "also" when a
+# new request follows ("... in Delhi and show me ..."), but not inside lists
+# such as "Sushi and Hiking" or "INR and EUR"
+CLAUSE_BREAK = re.compile(
+    r"[.?!;]+\s*|\s*,?\s+(?:and then|and also|and|then|also|plus)\s+(?=(?:show|tell|get|give|find|check|fetch|"
+    r"look|search|list|suggest|recommend|convert|calculate|compute|what|whats|what's|how|is|are|can|could|"
+    r"please)\b)",
+    re.IGNORECASE
+)
+
+# Capitalized place names after a preposition; "Delhi and Mumbai" and "Delhi vs Mumbai" yield both
+PLACE_PATTERN = re.compile(
+    r"\b(?:in|at|near|around|from|for|of)\s+([A-Z][\w'-]*(?:(?:\s*,\s*|\s+)[A-Z][\w'-]*)*)"
+)
+MORE_PLACES = re.compile(r"\s*(?:,|\band\b|&|\bvs\b\.?|\bversus\b|\bor\b)\s*([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)")
+# Capitalized words: names the rules must either use or know as vocabulary
+CAPITALIZED = re.compile(r"\b[A-Z][\w'-]*")
+# "there" / "nearby" refer back to a place named earlier in the query
+PLACE_BACKREF = re.compile(r"\b(?:there|nearby|near there|same city|that city|close by)\b", re.IGNORECASE)
+
+CURRENCY_TOKEN = re.compile(
+    r"(?<![\w])([$₹€£¥])|\b([A-Za-z]{3}|dollars?|rupees?|euros?|pounds?|yen|dirhams?)\b", re.IGNORECASE
+)
+# Codes that are also everyday words; lowercase mentions of these are ignored
+WORD_CODES = {"TRY"}
+CURRENCY_TRIGGER = re.compile(r"\b(?:convert|conversion|exchange|rates?|worth|how much is)\b", re.IGNORECASE)
+WEATHER_TRIGGER = re.compile(
+    r"\b(?:weather|temperature|forecast|rain(?:ing|y)?|humid(?:ity)?|sunny|degrees|climate)\b", re.IGNORECASE
+)
+NEWS_TRIGGER = re.compile(r"\b(?:news|headlines|articles|stories)\b", re.IGNORECASE)
+NEWS_ABOUT = re.compile(r"\b(?:news|headlines|articles|stories)\s+(?:about|on|regarding|around|covering)\s+(.+)$",
+                        re.IGNORECASE)
+GITHUB_TRIGGER = re.compile(r"\b(?:github|repo|repository|stars?|forks?)\b", re.IGNORECASE)
+COMPAT_TRIGGER = re.compile(
+    r"\b(?:compatib\w*|match score|how well (?:do )?we match|are we a (?:good )?match)\b", re.IGNORECASE
+)
+
+# Interests each side of a compatibility check lists
+SELF_INTERESTS = re.compile(
+    r"\b(?:I (?:love|like|enjoy|am into)|I'm into|my interests are|my hobbies are)\s+([^.;!?]+)", re.IGNORECASE
+)
+MATCH_INTERESTS = re.compile(
+    r"\b(?:they|he|she|my match|someone who|who|their interests are|their hobbies are)"
+    r"\s*(?:loves?|likes?|enjoys?|(?:is|are) into|)\s+([^.;!?]+)",
+    re.IGNORECASE
+)
+INTEREST_END = re.compile(
+    r"\b(?:but|while|whereas|and (?:they|he|she|my match|someone|we|i)|we|suggest|what|how|can|could)\b",
+    re.IGNORECASE
+)
+INTEREST_SPLIT = re.compile(r"\s*(?:,|\band\b|&|/)\s*", re.IGNORECASE)
+
+# Words in front of "news" that say nothing about the topic
+NEWS_FILLER = {
+    "latest", "the", "some", "top", "recent", "today's", "todays", "breaking", "me", "show", "get", "give",
+    "any", "of", "new", "current", "all", "tell", "find", "fetch", "what", "whats", "what's", "is", "are",
+    "a", "few", "us", "about", "on", "for", "in", "and", "please"
+}
+# Mood words kept in front of the venue category ("romantic cafe")
+VIBES = {"romantic", "cozy", "cosy", "quiet", "cute", "rooftop", "popular", "fancy", "casual"}
+# A clause made only of these (plus a place) is context, e.g. "We are in Bangalore"
+FILLER = {
+    "we", "are", "i", "am", "i'm", "we're", "is", "it", "in", "at", "the", "a", "my", "our", "currently",
+    "right", "now", "here", "based", "staying", "living", "located", "both", "please", "thanks", "thank", "you",
+    "me", "us", "today", "tonight"
+}
+_VENUE_PHRASES = sorted(
+    ((phrase, canonical) for canonical, phrases in CATEGORY_SYNONYMS.items() for phrase in phrases),
+    key=lambda item: -len(item[0])
+)
+VENUE_PATTERN = re.compile(
+    r"\b((?:(?:" + "|".join(VIBES) + r")\s+)*)(" + "|".join(re.escape(p) for p, _ in _VENUE_PHRASES) + r")\b",
+    re.IGNORECASE
+)
+_VENUE_CANONICAL = {phrase: canonical for phrase, canonical in _VENUE_PHRASES}
+
+
+def split_clauses(query):
+    """(start, end) spans of the query's clauses, empty ones dropped."""
+    spans, cursor = [], 0
+    for m in CLAUSE_BREAK.finditer(query):
+        spans.append((cursor, m.start()))
+        cursor = m.end()
+    spans.append((cursor, len(query)))
+    return [(s, e) for s, e in spans if query[s:e].strip()]
+
+
+def find_places(text):
+    places = []
+    for m in PLACE_PATTERN.finditer(text):
+        names = [m.group(1)]
+        cursor = m.end()
+        while True:
+            more = MORE_PLACES.match(text, cursor)
+            if more is None:
+                break
+            names.append(more.group(1))
+            cursor = more.end()
+        # Currency codes are capitalized too ("from USD")
+        places += [n.strip(" ,") for n in names if n.strip(" ,").upper() not in CURRENCY_CODES]
+    return places
+
+
+def arg_text(value):
+    """Every string and number in a step's args, lowercased, for checking what the step uses."""
+    if isinstance(value, dict):
+        return " ".join(arg_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(arg_text(v) for v in value)
+    return str(value).lower()
+
+
+def is_vocabulary(word):
+    """Capitalized words the rules read as keywords rather than names: "GitHub", "USD", "Cafes"."""
+    if word in ("I", "I'm") or word.upper() in CURRENCY_CODES or word.lower() in CURRENCY_NAMES:
+        return True
+    patterns = (CURRENCY_TRIGGER, WEATHER_TRIGGER, NEWS_TRIGGER, GITHUB_TRIGGER, COMPAT_TRIGGER, VENUE_PATTERN)
+    return any(p.fullmatch(word) for p in patterns) or word.lower() in VIBES
+
+
+def pair_conversions(codes, sources):
+    """
+    Pairs each source with the targets written after it and before the next
+    source: "10 USD to INR and 20 EUR to GBP" is two conversions, "10 USD and
+    20 EUR to INR" sends both to INR. Targets that only come first apply to
+    every source. Returns [] when the order leaves the pairing unclear, so
+    the query goes to the LLM planner.
+    """
+    # `sources` maps a position in `codes` to its amount; groups are [(sources, targets)] in clause order
+    groups, leading = [], []
+    for i, code in enumerate(codes):
+        if i in sources:
+            if not groups or groups[-1][1]:
+                groups.append(([], []))
+            groups[-1][0].append((code, sources[i]))
+        elif groups:
+            groups[-1][1].append(code)
+        else:
+            leading.append(code)
+    if not groups:
+        return []
+    if leading:
+        if any(targets for _, targets in groups) or (len(leading) > 1 and len(sources) > 1):
+            return []
+        groups = [(group_sources, leading) for group_sources, _ in groups]
+    if not groups[-1][1]:
+        return []
+    return [
+        {"from_code": from_code, "to_code": to_code, "amount": amount}
+        for group_sources, targets in groups for from_code, amount in group_sources for to_code in targets
+        if to_code != from_code
+    ]
+
+
+def split_interest_list(text):
+    text = INTEREST_END.split(text, maxsplit=1)[0]
+    items = [i.strip(" ,.'\"").lower() for i in INTEREST_SPLIT.split(text)]
+    return ", ".join(i for i in items if i and i not in ("etc", "more"))
+
+
+class Intent:
+    """One routed tool call with how sure the rule that built it is."""
+
+    def __init__(self, tool, args, confidence, reason):
+        self.tool = tool
+        self.args = args
+        self.confidence = confidence
+        self.reason = reason
+
+
+class IntentRouter:
+    """
+    Deterministic planner for the query shapes most traffic has: currency
+    conversions, weather in a city, news on a topic, venues in a
+    neighbourhood, GitHub repos and two-sided compatibility checks.
+
+    The query is split into clauses; rules with trigger words and slot
+    extractors turn clauses into steps of the usual plan schema. The
+    confidence is the weakest rule's confidence times the share of clauses
+    the rules (or plain context like "We are in Bangalore") account for, so
+    anything the rules don't understand sends the query to the LLM planner.
+    A clause only counts when its steps also use every place and name in
+    it: a city the rules could not place must not silently drop out.
+    """
+
+    def __init__(self, min_confidence=0.85, enabled=True):
+        self.min_confidence = min_confidence
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.deferred = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            min_confidence=float(os.getenv("PLAN_ROUTER_MIN_CONFIDENCE", "0.85")),
+            enabled=os.getenv("PLAN_ROUTER", "1") != "0"
+        )
+
+    # --- rules (one clause each) ---
+    def _currency(self, clause):
+        codes, names_used = [], False
+        for m in CURRENCY_TOKEN.finditer(clause):
+            word = m.group(1) or m.group(2)
+            code = CURRENCY_NAMES.get(word.lower(), word.upper())
+            # Three-letter words must be all upper or all lower case, as in the plan cache
+            if code not in CURRENCY_CODES or (m.group(2) and len(word) == 3 and not (
+                    word.isupper() or (word.islower() and code not in WORD_CODES))):
+                continue
+            names_used |= word.lower() in CURRENCY_NAMES
+            codes.append((m.start(), m.end(), code))
+        amounts = [(m.start(1), m.end(1), parse_amount(m.group(1))) for m in AMOUNT_PATTERN.finditer(clause)]
+        if len(codes) < 2 or not (CURRENCY_TRIGGER.search(clause) or amounts):
+            return []
+
+        # An amount belongs to the code right after ("100 USD") or right before it ("$100", "USD 100")
+        sources = {}
+        for start, end, amount in amounts:
+            for i, (c_start, c_end, code) in enumerate(codes):
+                if i not in sources and (0 <= c_start - end <= 1 or 0 <= start - c_end <= 1):
+                    sources[i] = amount
+                    break
+        if not sources:
+            sources = {0: amounts[0][2] if len(amounts) == 1 else 1}
+        conversions = pair_conversions([code for _, _, code in codes], sources)
+        if not conversions:
+            return []
+
+        confidence = 0.9 if names_used or not amounts else 1.0
+        if len(conversions) == 1:
+            from_code, to_code, amount = conversions[0].values()
+            args = {"from_code": from_code, "to_code": to_code, "amount": amount}
+            return [Intent("currency_tool", args, confidence, f"Convert {amount} {from_code} to {to_code}")]
+        return [Intent("currency_tool", {"conversions": conversions}, confidence,
+                       f"Convert {len(conversions)} amounts")]
+
+    def _weather(self, clause, context):
+        if not WEATHER_TRIGGER.search(clause):
+            return []
+        places = find_places(clause)
+        if not places and context and PLACE_BACKREF.search(clause):
+            return [Intent("weather_tool", {"city": context}, 0.9, f"Current weather in {context}")]
+        return [Intent("weather_tool", {"city": city}, 1.0, f"Current weather in {city}") for city in places]
+
+    def _news(self, clause):
+        trigger = NEWS_TRIGGER.search(clause)
+        if not trigger:
+            return []
+        about = NEWS_ABOUT.search(clause)
+        if about:
+            return [Intent("news_tool", {"query": about.group(1).strip(" ,")}, 1.0, "Latest news")]
+
+        words = []
+        for word in reversed(clause[:trigger.start()].split()):
+            if word.lower().strip(",") in NEWS_FILLER:
+                break
+            words.insert(0, word.strip(","))
+        places = find_places(clause[trigger.end():])
+        topic = " ".join(words + places)
+        if not topic:
+            return [Intent("news_tool", {"query": "latest"}, 0.5, "Latest news")]
+        return [Intent("news_tool", {"query": topic}, 0.9 if words else 0.85, f"Latest news on {topic}")]
+
+    def _venues(self, clause, context):
+        m = VENUE_PATTERN.search(clause)
+        if not m:
+            return []
+        category = _VENUE_CANONICAL[m.group(2).lower()]
+        vibes = " ".join(m.group(1).lower().split())
+        category = f"{vibes} {category}" if vibes else category
+        places = find_places(clause)
+        if places:
+            location, confidence = places[0], 1.0
+        elif context and PLACE_BACKREF.search(clause):
+            location, confidence = context, 0.9
+        else:
+            return [Intent("date_planner_tool", {"location": "", "category": category}, 0.0, "No location")]
+        return [Intent("date_planner_tool", {"location": location, "category": category}, confidence,
+                       f"Find {category} venues in {location}")]
+
+    def _github(self, clause):
+        repos = [m.group(1) for m in REPO_PATTERN.finditer(clause)
+                 if all(re.search(r"[A-Za-z]", part) for part in m.group(1).split("/"))]
+        if not repos:
+            return []
+        confidence = 1.0 if GITHUB_TRIGGER.search(clause) else 0.5
+        return [Intent("github_tool", {"repo_name": repo}, confidence, f"Repository stats for {repo}") for repo in repos]
+
+    def _compatibility(self, query):
+        """Whole-query rule: the two sides' interests are often in other sentences than the ask."""
+        trigger = COMPAT_TRIGGER.search(query)
+        if not trigger:
+            return None, []
+        spans = [trigger.span()]
+        mine = SELF_INTERESTS.search(query)
+        theirs = next((m for m in MATCH_INTERESTS.finditer(query) if not mine or m.start() != mine.start()), None)
+        user_interests = split_interest_list(mine.group(1)) if mine else ""
+        match_interests = split_interest_list(theirs.group(1)) if theirs else ""
+        spans += [m.span(1) for m in (mine, theirs) if m]
+        # With one side missing the planner would have to invent it; leave that to the LLM
+        confidence = 1.0 if user_interests and match_interests else 0.4
+        intent = Intent("compatibility_tool",
+                        {"user_interests": user_interests, "match_interests": match_interests},
+                        confidence, "Score the shared interests")
+        return intent, spans
+
+    def _unused_names(self, clause, intents):
+        """Places and capitalized words of a clause that none of its intents' args mention."""
+        used = " ".join(arg_text(i.args) for i in intents)
+        lead = len(clause) - len(clause.lstrip())
+        names = find_places(clause) + [
+            m.group(0) for m in CAPITALIZED.finditer(clause)
+            if m.start() != lead and not is_vocabulary(m.group(0))
+        ]
+        return [name for name in names if name.lower() not in used]
+
+    def _is_context(self, clause):
+        """True for clauses like "We are in Bangalore" that only set a place."""
+        rest = PLACE_PATTERN.sub(" ", clause)
+        return all(w.lower().strip(",'\"") in FILLER for w in rest.split())
+
+    # --- routing ---
+    def analyze(self, query):
+        """(plan, confidence) for any query; plan is None when no rule applies."""
+        clauses = split_clauses(query)
+        compat, compat_spans = self._compatibility(query)
+
+        intents, explained, context = [], 0, None
+        for start, end in clauses:
+            clause = query[start:end]
+            found = self._currency(clause) + self._weather(clause, context) + self._news(clause)
+            if not found:
+                found = self._venues(clause, context) + self._github(clause)
+            in_compat = any(s < end and e > start for s, e in compat_spans)
+            if found:
+                explained += not self._unused_names(clause, found)
+            elif in_compat or self._is_context(clause):
+                explained += 1
+            intents += found
+            places = find_places(clause)
+            if places:
+                context = places[-1]
+        if compat is not None:
+            intents.append(compat)
+
+        if not intents:
+            return None, 0.0
+        confidence = min(i.confidence for i in intents) * explained / len(clauses)
+        steps = [
+            {"id": f"s{n + 1}", "tool": i.tool, "args": i.args, "depends_on": [], "parallel": True, "reason": i.reason}
+            for n, i in enumerate(intents)
+        ]
+        return {"steps": steps}, round(confidence, 3)
+
+    def route(self, query, tools_definitions):
+        """
+        Returns (plan, confidence). The plan is None when routing is off,
+        confidence is below min_confidence or a step needs a tool that is
+        not available, i.e. whenever the LLM planner should decide.
+        """
+        if not self.enabled:
+            return None, 0.0
+        plan, confidence = self.analyze(query)
+        available = {d.get("name") for d in tools_definitions}
+        if plan is not None and any(s["tool"] not in available for s in plan["steps"]):
+            plan, confidence = None, 0.0
+        routed = plan is not None and confidence >= self.min_confidence
+        with self._lock:
+            if routed:
+                self.hits += 1
+            else:
+                self.deferred += 1
+        return (plan if routed else None), confidence
+
+    def clear(self):
+        with self._lock:
+            self.hits = self.deferred = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.deferred
+            return {
+                "hits": self.hits,
+                "deferred": self.deferred,
+                "hit_rate": self.hits / total if total else 0.0
+            }
@@ -0,0 +1,276 @@
+"""
+Long-lived local query service.
+
+One process keeps the planner, executor and verifier warm, and through them
+the LLM client, tool instances, HTTP connection pools and the plan and tool
+caches. Any number of clients (app.py, main.py, see agents/service_client.py)
+share that pipeline over local HTTP:
+
+    POST /queries  {"query": ..., "deadline_s": optional}
+                   -> JSON lines: accepted, plan, results, answer (text
+                      deltas), then done or error
+    GET  /health   GET /stats   GET /spans (JSON lines)   GET /metrics (Prometheus)
+
+At most `workers` queries run the pipeline at once and up to `max_queued`
+more wait for a worker, within their deadline. Past that a query is turned
+away with 503 straight away, so overload shows up as fast rejections rather
+than as latency for everyone.
+
+    python -m agents.service        (or python main.py --serve)
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agents.planner import PlannerAgent
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from core.runtime import get_loop, get_worker_pool, run_sync, iter_sync
+from core.deadline import Deadline, deadline_scope, within
+from core.telemetry import tracer
+from llm.client import LLMClient, get_genai, is_throttle
+from tools.base import BaseTool
+from tools.registry import registry
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Events after which a query's stream ends
+FINAL_EVENTS = ("done", "error")
+
+
+class QueryRejected(Exception):
+    """The service already has as many queries running and queued as it admits."""
+
+
+class _Job:
+    """One admitted query: its deadline, the task running it and the events it has produced."""
+
+    def __init__(self, query, deadline):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.query = query
+        self.deadline = deadline
+        self.events = asyncio.Queue()
+        self.task = None
+
+
+class QueryService:
+    """
+    Runs queries through one shared set of agents on the process-wide
+    event loop, with bounded concurrency and admission control.
+    """
+
+    def __init__(self, workers=8, max_queued=32, planner=None, executor=None, verifier=None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.planner = planner or PlannerAgent()
+        self.executor = executor or ExecutorAgent()
+        self.verifier = verifier or VerifierAgent()
+        # Created on the loop by the first submit()
+        self._slots = None
+        self.running = 0
+        self.queued = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("QUERY_SERVICE_WORKERS", "8")),
+            max_queued=int(os.getenv("QUERY_SERVICE_QUEUE", "32"))
+        )
+
+    async def asubmit(self, query, deadline_s=None):
+        """
+        Admits a query and starts it, or raises QueryRejected when the
+        service is full. The deadline starts now, so time spent waiting for
+        a worker counts against it.
+        """
+        if self.running + self.queued >= self.workers + self.max_queued:
+            self.rejected += 1
+            tracer.incr("queries_rejected")
+            raise QueryRejected(f"{self.running} queries running and {self.queued} queued; try again shortly.")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        job = _Job(query, Deadline(deadline_s) if deadline_s else Deadline.from_env())
+        self.queued += 1
+        job.events.put_nowait({"event": "accepted", "trace_id": job.trace_id, "queued": self.queued})
+        job.task = asyncio.get_running_loop().create_task(self._arun(job))
+        return job
+
+    async def aevents(self, job):
+        """The job's events as they happen, ending with "done" or "error"."""
+        while True:
+            event = await job.events.get()
+            yield event
+            if event["event"] in FINAL_EVENTS:
+                return
+
+    def cancel(self, job):
+        """Stops a job whose client went away; safe to call from any thread."""
+        get_loop().call_soon_threadsafe(job.task.cancel)
+
+    async def _arun(self, job):
+        emit = job.events.put_nowait
+        start = time.perf_counter()
+        with tracer.trace(job.trace_id), deadline_scope(job.deadline):
+            try:
+                await within(self._slots.acquire(), job.deadline)
+            except asyncio.TimeoutError:
+                self.failed += 1
+                emit({"event": "error", "kind": "busy", "error": "Timed out waiting for a free worker."})
+                return
+            finally:
+                self.queued -= 1
+
+            self.running += 1
+            try:
+                await self._apipeline(job, emit)
+                self.served += 1
+            except Exception as e:
+                self.failed += 1
+                emit({"event": "error", "kind": "quota" if is_throttle(e) else "internal", "error": str(e)})
+                return
+            finally:
+                self.running -= 1
+                self._slots.release()
+
+        emit({
+            "event": "done",
+            "trace_id": job.trace_id,
+            "tokens": tracer.trace_tokens(job.trace_id),
+            "spans": tracer.spans(trace_id=job.trace_id),
+            "latency_ms": round((time.perf_counter() - start) * 1000, 3)
+        })
+
+    async def _apipeline(self, job, emit):
+        # Streamed: each step starts executing as soon as the planner has written it
+        plan_stream = self.planner.astream_plan(job.query, registry.definitions())
+        results = await self.executor.aexecute_stream(plan_stream)
+        emit({"event": "plan", "plan": plan_stream.plan})
+        emit({"event": "results", "results": results, "tool_cache": BaseTool.cache.stats()})
+        async for delta in self.verifier.astream_verify_and_respond(job.query, results):
+            emit({"event": "answer", "text": delta})
+
+    def stats(self):
+        return {
+            "admission": {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "running": self.running,
+                "queued": self.queued,
+                "served": self.served,
+                "failed": self.failed,
+                "rejected": self.rejected
+            },
+            "tools": list(registry),
+            "tool_cache": BaseTool.cache.stats(),
+            "router": PlannerAgent.router.stats(),
+            "plan_cache": PlannerAgent.plan_cache.stats(),
+            "context_cache": LLMClient.context_cache.stats(),
+            "stages": tracer.percentiles()
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    One thread per connection (ThreadingHTTPServer). Handlers only admit
+    and relay; the queries themselves run on the shared event loop.
+    """
+
+    def log_message(self, format, *args):
+        # The agents already narrate every query; access logs would drown it
+        pass
+
+    def _send(self, status, body, content_type, headers=None):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, default=str), "application/json", headers)
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/health":
+            self._json(200, {"status": "ok", **service.stats()["admission"]})
+        elif self.path == "/stats":
+            self._json(200, service.stats())
+        elif self.path == "/spans":
+            self._send(200, tracer.export_jsonl(), "application/x-ndjson")
+        elif self.path == "/metrics":
+            self._send(200, tracer.prometheus(), "text/plain; version=0.0.4")
+        else:
+            self._json(404, {"error": f"No such endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/queries":
+            self._json(404, {"error": f"No such endpoint: {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            query = body["query"].strip()
+            deadline_s = body.get("deadline_s")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._json(400, {"error": 'Expected a JSON object with a "query" string.'})
+            return
+        if not query:
+            self._json(400, {"error": "Empty query."})
+            return
+
+        service = self.server.service
+        try:
+            job = run_sync(service.asubmit(query, deadline_s))
+        except QueryRejected as e:
+            self._json(503, {"error": str(e)}, headers={"Retry-After": "1"})
+            return
+
+        # HTTP/1.0 without a length: the stream ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for event in iter_sync(service.aevents(job)):
+                self.wfile.write((json.dumps(event, default=str) + "\n").encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Nobody is reading the answer any more; stop spending quota on it
+            service.cancel(job)
+
+
+def serve(host=None, port=None, service=None):
+    """Serves `service` (from the environment by default) until interrupted."""
+    host = host or os.getenv("QUERY_SERVICE_HOST", DEFAULT_HOST)
+    port = int(port or os.getenv("QUERY_SERVICE_PORT", DEFAULT_PORT))
+    service = service or QueryService.from_env()
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service
+
+    # Warm what the first query would otherwise pay for: tool definitions,
+    # the event loop and the Gemini SDK import (off this thread)
+    registry.definitions()
+    get_loop()
+    get_worker_pool().submit(get_genai)
+
+    print(f"🛰️ Query service on http://{host}:{port} "
+          f"({service.workers} workers, up to {service.max_queued} queued)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,124 @@
+"""
+Client for the local query service (agents/service.py).
+
+Kept light on purpose: it imports neither the agents nor the Gemini SDK, so
+Streamlit reruns and CLI starts are instant and every client shares the
+service's warm pipeline. When nothing answers at the service address the
+client starts the service itself (QUERY_SERVICE_AUTOSTART=0 turns that off).
+"""
+import os
+import sys
+import json
+import time
+import subprocess
+from urllib.parse import urlsplit
+import httpx
+
+DEFAULT_URL = "http://{}:{}".format(
+    os.getenv("QUERY_SERVICE_HOST", "127.0.0.1"), os.getenv("QUERY_SERVICE_PORT", "8765")
+)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# How long a query's stream may go quiet (tools running, LLM thinking)
+READ_TIMEOUT_S = 120
+# The service imports the agents and tools before it listens
+START_TIMEOUT_S = 30
+
+
+class ServiceError(Exception):
+    """The service could not be reached or failed the query."""
+
+
+class ServiceBusy(ServiceError):
+    """The service turned the query away: every worker and queue slot was taken."""
+
+
+class QuotaExceeded(ServiceError):
+    """Gemini quota ran out while answering the query."""
+
+
+class ServiceClient:
+    def __init__(self, url=None, autostart=None):
+        self.url = (url or os.getenv("QUERY_SERVICE_URL") or DEFAULT_URL).rstrip("/")
+        self.autostart = autostart if autostart is not None else os.getenv("QUERY_SERVICE_AUTOSTART", "1") == "1"
+        self._http = httpx.Client(base_url=self.url, timeout=httpx.Timeout(5.0, read=READ_TIMEOUT_S))
+
+    def health(self):
+        """The service's admission counters, or None when nothing is listening."""
+        try:
+            return self._http.get("/health").json()
+        except (httpx.TransportError, ValueError):
+            return None
+
+    def ensure_running(self):
+        if self.health() is not None:
+            return
+        if not self.autostart:
+            raise ServiceError(f"No query service at {self.url}; start one with `python main.py --serve`.")
+        self._start_service()
+        deadline = time.monotonic() + START_TIMEOUT_S
+        while time.monotonic() < deadline:
+            if self.health() is not None:
+                return
+            time.sleep(0.2)
+        raise ServiceError(f"Query service at {self.url} did not start within {START_TIMEOUT_S}s.")
+
+    def _start_service(self):
+        # Detached, so it outlives this client and serves the next one too.
+        # If another client started one first, this one fails to bind and exits.
+        address = urlsplit(self.url)
+        env = {**os.environ, "QUERY_SERVICE_HOST": address.hostname, "QUERY_SERVICE_PORT": str(address.port or 80)}
+        log = open(os.getenv("QUERY_SERVICE_LOG", os.devnull), "a")
+        subprocess.Popen(
+            [sys.executable, "-m", "agents.service"],
+            cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True
+        )
+        log.close()
+
+    def stream(self, query, deadline_s=None):
+        """
+        Yields one query's events as the service produces them: accepted,
+        plan, results, answer (text deltas) and done. Raises ServiceBusy,
+        QuotaExceeded or ServiceError instead of yielding an error event, and
+        ServiceError when the stream ends before done.
+        """
+        self.ensure_running()
+        payload = {"query": query, "deadline_s": deadline_s}
+        try:
+            with self._http.stream("POST", "/queries", json=payload) as response:
+                if response.status_code == 503:
+                    raise ServiceBusy(self._error(response))
+                if response.status_code != 200:
+                    raise ServiceError(self._error(response))
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event["event"] == "error":
+                        raise (QuotaExceeded if event.get("kind") == "quota" else ServiceError)(event["error"])
+                    yield event
+                    if event["event"] == "done":
+                        return
+        except httpx.TransportError as e:
+            raise ServiceError(f"Lost the query service at {self.url}: {e}") from e
+        # The connection closed without "done" or "error": the service died mid-query
+        raise ServiceError(f"Query service at {self.url} closed the stream before the query finished.")
+
+    def _error(self, response):
+        try:
+            return json.loads(response.read())["error"]
+        except (ValueError, KeyError, TypeError):
+            return f"Query service answered HTTP {response.status_code}."
+
+    def stats(self):
+        """Admission counters, cache and router stats and rolling stage latency."""
+        self.ensure_running()
+        return self._http.get("/stats").json()
+
+    def spans(self):
+        """Every span the service still holds, as JSON lines."""
+        return self._http.get("/spans").text
+
+    def metrics(self):
+        """Counters and latency in Prometheus text format."""
+        return self._http.get("/metrics").text
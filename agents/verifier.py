@@ -1,24 +1,126 @@
+import json
+import asyncio
 from llm.client import LLMClient
+from llm.json_stream import JsonFieldStream
+from core.runtime import run_sync, iter_sync
+from core.deadline import stage_deadline, within, aiter_within
+from llm.scheduler import PRIORITY_VERIFY
+from agents.renderer import AnswerRenderer
+from agents.compactor import ResultCompactor
+from tools.registry import registry
+from core.telemetry import tracer
 
-class VerifierAgent:
-    def __init__(self):
-        self.llm = LLMClient()
-
-    def verify_and_respond(self, user_query, execution_results):
-        prompt = f"""
+# The verifier's system prompt; identical on every call, so it is a cacheable prefix
+VERIFIER_INSTRUCTIONS = """
         You are a Verifier Agent.
-        Original Query: {user_query}
-        Execution Results: {execution_results}
+        The user message holds the original query and the execution results.
         
         1. Check if the results satisfy the query.
         2. If yes, generate a natural language final answer.
         3. If data is missing (e.g. error in results), explain what went wrong.
+        4. Results with "timed_out": true did not arrive in time. Answer from the
+           other results and say briefly what could not be checked.
         
         Output JSON:
-        {{
+        {
             "status": "success" or "failure",
             "final_answer": "Natural language response here."
-        }}
+        }
+        """
+
+class VerifierAgent:
+    def __init__(self, tools=None):
+        self.llm = LLMClient()
+        tools = tools if tools is not None else registry
+        # Deterministic answers for results every tool can template
+        self.renderer = AnswerRenderer(tools)
+        self.compactor = ResultCompactor(tools)
+
+    def _render(self, execution_results, span):
+        answer = self.renderer.render(execution_results)
+        span.set(rendered=answer is not None)
+        if answer is not None:
+            print("⚡ Answer rendered from tool templates, skipping verifier LLM call.")
+        return answer
+
+    def _timed_out_answer(self, execution_results, span):
+        """What to say when the deadline passes before the verifier LLM has answered."""
+        print("⏱️ Verifier ran out of time; answering from the tool templates.")
+        span.set(timed_out=True)
+        return (self.renderer.render(execution_results, partial=True)
+                or "Sorry, I couldn't put the answer together in time. Please try again.")
+
+    def _build_messages(self, user_query, execution_results, span):
+        compacted, report = self.compactor.compact(execution_results)
+        span.set(**report)
+        print(f"🗜️ Compacted results: {report['tokens_before']} → {report['tokens_after']} tokens "
+              f"(saved {report['tokens_saved']})")
+        # Static instructions as the system prompt (a cacheable prefix); only
+        # the query and results vary, and they go in the user message
+        return [
+            {"role": "system", "content": VERIFIER_INSTRUCTIONS},
+            {"role": "user", "content": f"Original Query: {user_query}\nExecution Results: {compacted}"}
+        ]
+
+    async def averify_and_respond(self, user_query, execution_results):
+        with tracer.span("verify") as span:
+            answer = self._render(execution_results, span)
+            if answer is not None:
+                return json.dumps({"status": "success", "final_answer": answer})
+
+            # Verifier calls finish queries already in flight, so they jump the queue
+            messages = self._build_messages(user_query, execution_results, span)
+            try:
+                return await within(
+                    self.llm.achat(messages, json_mode=True, priority=PRIORITY_VERIFY), stage_deadline("verify")
+                )
+            except asyncio.TimeoutError:
+                return json.dumps({"status": "success", "final_answer": self._timed_out_answer(execution_results, span)})
+
+    def verify_and_respond(self, user_query, execution_results):
+        """Blocking wrapper around averify_and_respond() for sync callers."""
+        return run_sync(self.averify_and_respond(user_query, execution_results))
+
+    async def astream_verify_and_respond(self, user_query, execution_results):
+        """
+        Yields the final answer text as it is generated.
+        The model still answers in the JSON schema above; final_answer is
+        decoded incrementally so the first words show up immediately.
         """
-        response = self.llm.chat([{"role": "system", "content": prompt}], json_mode=True)
-        return response
\ No newline at end of file
+        # Started explicitly: a generator's context does not persist across yields
+        span = tracer.start("verify", stream=True)
+        try:
+            answer = self._render(execution_results, span)
+            if answer is not None:
+                yield answer
+                return
+
+            extractor = JsonFieldStream("final_answer")
+            chunks = self.llm.astream_chat(
+                self._build_messages(user_query, execution_results, span), json_mode=True, priority=PRIORITY_VERIFY
+            )
+            try:
+                async for chunk in aiter_within(chunks, stage_deadline("verify")):
+                    delta = extractor.feed(chunk)
+                    if delta:
+                        if "ttft_ms" not in span.attrs:
+                            span.set(ttft_ms=round(span.elapsed_ms(), 3))
+                        yield delta
+            except asyncio.TimeoutError:
+                # Text already shown stays; otherwise answer from what the tools returned
+                if "ttft_ms" not in span.attrs:
+                    yield self._timed_out_answer(execution_results, span)
+                else:
+                    span.set(timed_out=True)
+                return
+
+            if not extractor.found:
+                # API error ("{}") or the model ignored the schema
+                span.set(error="final_answer missing from verifier output")
+                yield "The assistant encountered an error processing the results."
+        finally:
+            span.end()
+
+    def stream_verify_and_respond(self, user_query, execution_results):
+        """Sync generator over astream_verify_and_respond() for sync callers."""
+        return iter_sync(self.astream_verify_and_respond(user_query, execution_results))
@@ -1,16 +1,9 @@
 import streamlit as st
-from google.api_core import exceptions
-import json
 import time
-from agents.planner import PlannerAgent
-from agents.executor import ExecutorAgent
-from agents.verifier import VerifierAgent
-from tools.github_tool import GitHubTool
-from tools.weather_tool import WeatherTool
-from tools.news_tool import NewsTool
-from tools.currency_tool import CurrencyTool
-from tools.compatibility_tool import CompatibilityTool
-from tools.date_planner_tool import DatePlannerTool
+# The agents live in the long-lived query service; every rerun and every
+# session talks to the same warm pipeline through this client
+from agents.service_client import ServiceClient, ServiceError, ServiceBusy, QuotaExceeded
+from llm.context_cache import billed_input_tokens
 
 # UI Configuration
 st.set_page_config(page_title="TrulyMadly AI Intern", page_icon="❤️", layout="wide")
@@ -28,27 +21,50 @@ if "last_query" not in st.session_state:
 COST_PER_1M_INPUT = 0.50  
 COST_PER_1M_OUTPUT = 3.00
 
-def calculate_cost(metadata):
-    if not metadata: return 0.0
-    input_cost = (metadata.prompt_token_count / 1_000_000) * COST_PER_1M_INPUT
-    output_cost = (metadata.candidates_token_count / 1_000_000) * COST_PER_1M_OUTPUT
+def calculate_cost(tokens):
+    # Token totals for one query's spans (planner + verifier LLM calls);
+    # cached prompt-prefix tokens bill at a fraction of the input rate
+    billed_input = billed_input_tokens(tokens["input_tokens"], tokens.get("cached_tokens", 0))
+    input_cost = (billed_input / 1_000_000) * COST_PER_1M_INPUT
+    output_cost = (tokens["output_tokens"] / 1_000_000) * COST_PER_1M_OUTPUT
     return input_cost + output_cost
 
-# --- CACHED AGENT FUNCTIONS ---
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_ai_plan(query, _tool_defs):
-    planner = PlannerAgent()
-    return planner.create_plan(query, _tool_defs)
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_ai_execution(plan_json):
-    executor = ExecutorAgent()
-    return executor.execute_plan(json.loads(plan_json))
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_ai_verification(query, results_json):
-    verifier = VerifierAgent()
-    return verifier.verify_and_respond(query, results_json)
+# --- AGENT FUNCTIONS ---
+# Not st.cache_data: plans are cached by the planner's plan cache and tool
+# results per tool call with per-tool TTLs (see tools/cache.py), both held
+# by the query service and finer grained than a whole query.
+@st.cache_resource
+def get_client():
+    # One client (and HTTP connection pool) for every session and rerun
+    return ServiceClient()
+
+def run_ai_plan(events):
+    # The service starts each tool as soon as the planner has written its step;
+    # plan and results arrive once execution is done
+    plan = None
+    for event in events:
+        if event["event"] == "plan":
+            plan = event["plan"]
+        elif event["event"] == "results":
+            return plan, event["results"]
+    # Only reached if the stream ended early, which stream() reports as a ServiceError
+    return plan, None
+
+def stream_ai_verification(events, done):
+    # Rendered token by token as the service relays the verifier's answer.
+    # `done` receives the final event with the query's token totals.
+    for event in events:
+        if event["event"] == "answer":
+            yield event["text"]
+        elif event["event"] == "done":
+            done.update(event)
+
+client = get_client()
+try:
+    service_stats = client.stats()
+except ServiceError as e:
+    st.error(f"⚠️ Query service unavailable: {e}")
+    st.stop()
 
 # --- UI SETUP ---
 st.title("❤️ TrulyMadly AI Ops Assistant")
@@ -62,11 +78,30 @@ with st.sidebar:
     
     # Metric updates instantly because of the st.rerun() in the loop below
     st.metric("Total Session Spend", f"${st.session_state.total_cost:.6f}")
+    cache_stats = service_stats["tool_cache"]
+    st.metric("Tool Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+              help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['backend']})")
+    router_stats = service_stats["router"]
+    st.metric("Planner Router Hit Rate", f"{router_stats['hit_rate']:.0%}",
+              help=f"{router_stats['hits']} routed locally / {router_stats['deferred']} sent to the LLM planner")
     
     if st.button("Reset Session Costs"):
         st.session_state.total_cost = 0.0
         st.session_state.last_answer = None
         st.rerun()
+
+    st.subheader("⏱️ Stage Latency (rolling)")
+    stage_stats = service_stats["stages"]
+    if stage_stats:
+        st.dataframe(
+            [{"stage": stage, "n": s["count"], "p50 ms": s["p50_ms"], "p95 ms": s["p95_ms"]}
+             for stage, s in sorted(stage_stats.items())],
+            hide_index=True, use_container_width=True
+        )
+        st.download_button("Export spans (JSONL)", client.spans(), "spans.jsonl")
+        st.download_button("Export metrics (Prometheus)", client.metrics(), "metrics.prom")
+    else:
+        st.caption("No queries traced yet.")
     
     st.divider()
     
@@ -86,6 +121,9 @@ with st.sidebar:
     st.info("📍 Date Venue Planner")
     
     st.divider()
+    admission = service_stats["admission"]
+    st.caption(f"Query service: {admission['running']}/{admission['workers']} busy, "
+               f"{admission['queued']} queued, {admission['rejected']} turned away")
     st.caption("Caching: Active ✅ | Parallelism: Multi-threaded 🚀")
 
 # --- SAMPLE QUERIES SECTION ---
@@ -102,46 +140,39 @@ selected_sample = st.selectbox("Choose a test case:", list(samples.keys()))
 query_value = samples[selected_sample] if selected_sample != "Select a sample query..." else ""
 user_query = st.text_input("📝 Enter your request:", value=query_value, placeholder="e.g. Suggest 3 cafes in Mumbai.")
 
-tool_defs = [
-    GitHubTool().get_definition(), WeatherTool().get_definition(),
-    NewsTool().get_definition(), CurrencyTool().get_definition(),
-    CompatibilityTool().get_definition(), DatePlannerTool().get_definition()
-]
-
 # --- MAIN AGENT LOOP ---
 if st.button("Run AI Agent"):
     if user_query:
         try:
+            # The service traces the query and holds it to one QUERY_DEADLINE_S budget
+            events = client.stream(user_query)
             with st.status("🤖 Agent Swarm Processing...", expanded=True) as status:
-                # 1. Planning
+                # 1 + 2. Planning, with each step executed as soon as it is planned
                 st.write("🧠 **Planner Agent** is breaking down the request...")
-                plan, plan_metadata = get_ai_plan(user_query, tool_defs)
-                plan_cost = calculate_cost(plan_metadata)
-                
-                # 2. Execution
-                st.write("⚙️ **Executor Agent** is firing tools in parallel...")
-                results = get_ai_execution(json.dumps(plan))
-                
-                # 3. Verification
-                st.write("🔍 **Verifier Agent** is synthesizing the final response...")
-                final_output = get_ai_verification(user_query, json.dumps(results))
-                
-                status.update(label=f"✅ Task Complete!", state="complete")
+                st.write("⚙️ **Executor Agent** is firing tools as steps arrive...")
+                plan, results = run_ai_plan(events)
+            
+                status.update(label=f"✅ Tools finished, writing answer...", state="complete")
+
+            # 3. Verification: render the answer live as tokens arrive
+            st.divider()
+            st.subheader("💌 Final Answer")
+            done = {}
+            final_output = st.write_stream(stream_ai_verification(events, done))
 
             # Update Session State before rerun
-            st.session_state.total_cost += plan_cost
+            st.session_state.total_cost += calculate_cost(done.get("tokens", {"input_tokens": 0, "output_tokens": 0}))
             st.session_state.last_query = user_query
-            
-            if isinstance(final_output, dict):
-                st.session_state.last_answer = final_output.get('final_answer', "No response generated.")
-            else:
-                st.session_state.last_answer = final_output
-            
+        
+            st.session_state.last_answer = final_output or "No response generated."
+        
             # This triggers the sidebar cost to update immediately
             st.rerun()
 
-        except exceptions.ResourceExhausted:
+        except QuotaExceeded:
             st.error("⚠️ Quota Exceeded. Please wait 30 seconds.")
+        except ServiceBusy:
+            st.warning("⏳ The assistant is busy with other requests. Please try again in a moment.")
         except Exception as e:
             st.error(f"An unexpected error occurred: {e}")
 
@@ -0,0 +1,79 @@
+"""
+Bulk compatibility scoring vs. one CompatibilityTool.execute() per pair.
+
+    python -m bench.compatibility --candidates 100000 --users 20 --top-k 10
+
+Checks that every bulk score equals the per-pair score before timing anything.
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.compatibility_tool import CompatibilityTool
+from tools.interests import CandidatePool
+
+INTERESTS = [
+    "sushi", "hiking", "travel", "fitness", "music", "art", "dogs", "cats", "coffee", "books",
+    "yoga", "cricket", "movies", "cooking", "gaming", "dancing", "photography", "running"
+]
+
+
+def make_profiles(count, vocabulary, rng):
+    return [
+        ", ".join(rng.sample(vocabulary, rng.randint(1, 8)))
+        for _ in range(count)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--vocabulary", type=int, default=500, help="Distinct interests in the population")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    vocabulary = INTERESTS + [f"interest-{i}" for i in range(max(0, args.vocabulary - len(INTERESTS)))]
+    candidates = make_profiles(args.candidates, vocabulary, rng)
+    users = make_profiles(args.users, vocabulary, rng)
+    tool = CompatibilityTool()
+
+    start = time.perf_counter()
+    pool = CandidatePool.from_candidates(enumerate(candidates))
+    pool.scores(users[0])  # Builds the bit matrix
+    build_s = time.perf_counter() - start
+
+    # Exactness against the per-pair formula for one user
+    bulk = pool.scores(users[0])
+    for i, match in enumerate(candidates):
+        expected = tool.execute(users[0], match)["compatibility_score"]
+        if f"{bulk[i]}%" != expected:
+            print(f"❌ Mismatch for candidate {i}: bulk {bulk[i]}% vs execute {expected}")
+            return 1
+
+    start = time.perf_counter()
+    for user in users:
+        pool.top_k(user, args.top_k)
+    bulk_s = (time.perf_counter() - start) / len(users)
+
+    start = time.perf_counter()
+    for match in candidates:
+        tool.execute(users[0], match)
+    pairwise_s = time.perf_counter() - start
+
+    matrix = pool._bits()
+    print(f"{args.candidates} candidates, {len(pool.vocabulary)} distinct interests, "
+          f"bit matrix {matrix.nbytes / 2**20:.1f} MB (built in {build_s * 1000:.0f} ms)")
+    print(f"per-pair execute(): {pairwise_s * 1000:9.1f} ms per user")
+    print(f"bulk top-{args.top_k}:       {bulk_s * 1000:9.1f} ms per user  ({pairwise_s / bulk_s:.0f}x faster)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
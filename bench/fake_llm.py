@@ -0,0 +1,141 @@
+import json
+import math
+import random
+import asyncio
+from llm.client import LLMClient
+from llm.scheduler import RequestScheduler
+from llm.context_cache import ContextCache
+from llm.tokens import estimate_tokens
+
+# Characters per streamed chunk, roughly what Gemini sends per event
+STREAM_CHUNK_CHARS = 24
+
+
+class _Usage:
+    def __init__(self, prompt_tokens, output_tokens, cached_tokens=0):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.cached_content_token_count = cached_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Response:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class _StreamResponse:
+    """Async-iterable like the SDK's streamed response; usage is known up front."""
+
+    def __init__(self, text, usage, first_token_s, per_chunk_s):
+        self.text = text
+        self.usage_metadata = usage
+        self._first_token_s = first_token_s
+        self._per_chunk_s = per_chunk_s
+
+    async def __aiter__(self):
+        await asyncio.sleep(self._first_token_s)
+        for i in range(0, len(self.text), STREAM_CHUNK_CHARS):
+            if i:
+                await asyncio.sleep(self._per_chunk_s)
+            yield _Chunk(self.text[i:i + STREAM_CHUNK_CHARS])
+
+
+class FakeModel:
+    """Stands in for a GenerativeModel handle bound to one system instruction."""
+
+    def __init__(self, client, system_instruction):
+        self.client = client
+        self.system_instruction = system_instruction
+
+    async def generate_content_async(self, user_content, generation_config=None, stream=False):
+        prompt = self.system_instruction + "\n" + user_content
+        kind, text = self.client.respond(prompt)
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = self.client.output_tokens.get(kind) or estimate_tokens(text)
+        cached_tokens = self.client.cached_prefix_tokens(self.system_instruction)
+        usage = _Usage(prompt_tokens, output_tokens, cached_tokens)
+        self.client.calls[kind] += 1
+
+        latency = self.client.sample_latency(kind)
+        # Cached prefix tokens skip prefill, which is part of the time to first token
+        first_token_s = latency * self.client.ttft_fraction
+        saved_s = first_token_s * self.client.prefill_share * cached_tokens / prompt_tokens
+        latency -= saved_s
+        first_token_s -= saved_s
+        if stream:
+            chunks = max(1, math.ceil(len(text) / STREAM_CHUNK_CHARS))
+            return _StreamResponse(text, usage, first_token_s, (latency - first_token_s) / chunks)
+        await asyncio.sleep(latency)
+        return _Response(text, usage)
+
+
+class FakeLLMClient(LLMClient):
+    """
+    Offline LLMClient for benchmarks: canned plans keyed by query,
+    seeded lognormal latency per call kind and token counts taken from
+    the real prompt text, so the scheduler and telemetry see realistic load.
+
+    Repeated system instructions of at least `cache_min_tokens` are reported
+    as cached, like Gemini's implicit prefix caching, and take their share
+    of prefill off the time to first token.
+    """
+
+    # Quota is not what the benchmark measures; keep it out of the way
+    scheduler = RequestScheduler(rpm=10 ** 9, tpm=10 ** 12)
+    # Prefix caching is simulated per prompt; never try to create real caches
+    context_cache = ContextCache(enabled=False)
+
+    def __init__(self, plans, latency=None, output_tokens=None, ttft_fraction=0.3, scale=1.0, seed=0,
+                 prefix_cache=True, cache_min_tokens=0, prefill_share=0.5):
+        super().__init__()
+        self.model_name = "fake-llm"
+        self.plans = plans
+        # (median seconds, lognormal sigma) per call kind
+        self.latency = {"plan": (0.9, 0.35), "verify": (1.2, 0.35), **(latency or {})}
+        self.output_tokens = output_tokens or {}
+        self.ttft_fraction = ttft_fraction
+        self.scale = scale
+        self.prefix_cache = prefix_cache
+        self.cache_min_tokens = cache_min_tokens
+        # Share of the time to first token spent on prefill of the prompt
+        self.prefill_share = prefill_share
+        self._seen_prefixes = set()
+        self.calls = {"plan": 0, "verify": 0}
+        self._random = random.Random(seed)
+
+    def sample_latency(self, kind):
+        median, sigma = self.latency[kind]
+        return median * math.exp(self._random.gauss(0.0, sigma)) * self.scale
+
+    def cached_prefix_tokens(self, system_instruction):
+        """Tokens of `system_instruction` served from cache; it is cached from its second use on."""
+        tokens = estimate_tokens(system_instruction)
+        if not self.prefix_cache or tokens < self.cache_min_tokens:
+            return 0
+        if system_instruction not in self._seen_prefixes:
+            self._seen_prefixes.add(system_instruction)
+            return 0
+        return tokens
+
+    def respond(self, prompt):
+        if "Verifier Agent" in prompt:
+            answer = {"status": "success", "final_answer": "Here is what I found for your request, based on the tool results."}
+            return "verify", json.dumps(answer)
+        # Longest query first so one sample query that contains another still resolves
+        for query in sorted(self.plans, key=len, reverse=True):
+            if query in prompt:
+                return "plan", json.dumps(self.plans[query])
+        return "plan", json.dumps({"steps": []})
+
+    def _generation_config(self, json_mode):
+        return None
+
+    def _model_for(self, system_instruction):
+        return FakeModel(self, system_instruction)
@@ -0,0 +1,309 @@
+"""
+Offline end-to-end benchmark: planner -> executor -> verifier against a fake
+LLM and local stub APIs, so it runs without keys or network and is repeatable.
+
+    python -m bench.run                          # compare with bench/baseline.json
+    python -m bench.run --update-baseline        # record a new baseline
+    python -m bench.run --concurrency 1,8 --requests 40 --stream
+    python -m bench.run --stragglers 0.02 --no-hedge   # tail latency without hedging
+    python -m bench.run --no-prefix-cache              # LLM tokens and first-token latency uncached
+
+Exits with status 1 when p95 latency or throughput regresses past --tolerance.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import contextlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from agents.planner import PlannerAgent
+from agents.executor import ExecutorAgent
+from agents.verifier import VerifierAgent
+from agents.plan_cache import PlanCache
+from agents.router import IntentRouter
+from core.runtime import run_sync
+from core.deadline import Deadline, deadline_scope
+from core.telemetry import tracer, quantile
+from llm.context_cache import billed_input_tokens
+from tools.base import BaseTool
+from tools.cache import ToolCache
+from tools.currency_tool import CurrencyTool
+from tools.date_planner_tool import DatePlannerTool
+from tools.venue_store import VenueStore
+from tools.registry import registry
+from bench.fake_llm import FakeLLMClient
+from bench.stub_servers import StubServer, point_tools_at
+
+DEFAULT_SCENARIOS = os.path.join(BENCH_DIR, "scenarios", "samples.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Differences smaller than this are timer noise, whatever the tolerance says
+NOISE_FLOOR_MS = 5.0
+
+
+def load_scenarios(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_agents(scenarios, args):
+    llm = FakeLLMClient(
+        {s["query"]: s["plan"] for s in scenarios},
+        scale=args.latency_scale,
+        seed=args.seed,
+        prefix_cache=not args.no_prefix_cache,
+        cache_min_tokens=args.cache_min_tokens
+    )
+    planner, verifier = PlannerAgent(), VerifierAgent()
+    planner.llm = verifier.llm = llm
+    return planner, ExecutorAgent(), verifier, llm
+
+
+async def run_query(planner, executor, verifier, query, tool_defs, stream, speculate, deadline_s):
+    """One query through all three stages; returns (end-to-end ms, time to first answer text ms)."""
+    with tracer.trace(), deadline_scope(Deadline(deadline_s) if deadline_s > 0 else None):
+        start = time.perf_counter()
+        if speculate:
+            results = await executor.aexecute_stream(planner.astream_plan(query, tool_defs))
+        else:
+            plan, _ = await planner.acreate_plan(query, tool_defs)
+            results = await executor.aexecute_plan(plan)
+        first_text = None
+        if stream:
+            async for _ in verifier.astream_verify_and_respond(query, results):
+                if first_text is None:
+                    first_text = time.perf_counter()
+        else:
+            await verifier.averify_and_respond(query, results)
+        end = time.perf_counter()
+    return (end - start) * 1000, ((first_text or end) - start) * 1000
+
+
+async def run_level(agents, queries, tool_defs, concurrency, stream, speculate, deadline_s):
+    planner, executor, verifier = agents
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(query):
+        async with semaphore:
+            return await run_query(planner, executor, verifier, query, tool_defs, stream, speculate, deadline_s)
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(bounded(q) for q in queries))
+    return timings, time.perf_counter() - start
+
+
+def summarize(timings, wall_s):
+    e2e = sorted(t[0] for t in timings)
+    first = sorted(t[1] for t in timings)
+    stages = {
+        stage: {"p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"]}
+        for stage, s in sorted(tracer.percentiles(window=len(timings) * 8).items())
+    }
+    return {
+        "requests": len(timings),
+        "e2e_p50_ms": quantile(e2e, 0.50),
+        "e2e_p95_ms": quantile(e2e, 0.95),
+        "e2e_p99_ms": quantile(e2e, 0.99),
+        "first_text_p95_ms": quantile(first, 0.95),
+        "throughput_qps": round(len(timings) / wall_s, 3),
+        # The tracer is cleared per level, so these count this level only
+        "requests_hedged": tracer.counters.get("requests_hedged", 0),
+        "steps_timed_out": tracer.counters.get("steps_timed_out", 0),
+        "llm": summarize_llm(tracer.spans("llm")),
+        "stages": stages
+    }
+
+
+def summarize_llm(spans):
+    """Input tokens of this level's LLM calls, what they bill as, and time to first token of streamed calls."""
+    input_tokens = sum(s.get("input_tokens", 0) for s in spans)
+    cached_tokens = sum(s.get("cached_tokens", 0) for s in spans)
+    billed = billed_input_tokens(input_tokens, cached_tokens)
+    ttft = sorted(s["ttft_ms"] for s in spans if "ttft_ms" in s)
+    return {
+        "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
+        "billed_input_tokens": round(billed),
+        "billed_reduction": round(1 - billed / input_tokens, 3) if input_tokens else 0.0,
+        "first_token_p50_ms": quantile(ttft, 0.50),
+        "first_token_p95_ms": quantile(ttft, 0.95)
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Returns one message per metric that is worse than the baseline by more than `tolerance`."""
+    regressions = []
+    for level, current in report["levels"].items():
+        base = baseline.get("levels", {}).get(level)
+        if base is None:
+            continue
+        checks = [("e2e_p95_ms", current["e2e_p95_ms"], base["e2e_p95_ms"])]
+        checks += [
+            (f"{stage}.p95_ms", stats["p95_ms"], base["stages"][stage]["p95_ms"])
+            for stage, stats in current["stages"].items() if stage in base.get("stages", {})
+        ]
+        for metric, now, before in checks:
+            if now > before * (1 + tolerance) and now - before > NOISE_FLOOR_MS:
+                regressions.append(f"c={level} {metric}: {before:.1f} -> {now:.1f} ms")
+        if current["throughput_qps"] < base["throughput_qps"] * (1 - tolerance):
+            regressions.append(
+                f"c={level} throughput_qps: {base['throughput_qps']:.2f} -> {current['throughput_qps']:.2f}"
+            )
+    return regressions
+
+
+def print_report(report):
+    print(f"{'conc':>5} {'reqs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'first p95':>10} {'qps':>8}")
+    for level, r in report["levels"].items():
+        print(f"{level:>5} {r['requests']:>5} {r['e2e_p50_ms']:>9.1f} {r['e2e_p95_ms']:>9.1f} "
+              f"{r['e2e_p99_ms']:>9.1f} {r['first_text_p95_ms']:>10.1f} {r['throughput_qps']:>8.2f}")
+        print("      " + "  ".join(f"{stage} p50/p95 {s['p50_ms']:.0f}/{s['p95_ms']:.0f}" for stage, s in r["stages"].items()))
+        print(f"      hedged GETs: {r.get('requests_hedged', 0)}  timed-out steps: {r.get('steps_timed_out', 0)}")
+        if "llm" in r:
+            llm = r["llm"]
+            print(f"      LLM input tokens: {llm['input_tokens']} ({llm['cached_tokens']} cached), "
+                  f"billed as {llm['billed_input_tokens']} (-{llm['billed_reduction']:.0%})  "
+                  f"first token p50/p95 {llm['first_token_p50_ms']:.0f}/{llm['first_token_p95_ms']:.0f} ms")
+    print(f"peak RSS: {report['maxrss_mb']:.1f} MB | LLM calls: {report['llm_calls']} | API calls: {report['api_calls']}"
+          f" | router hit rate: {report.get('router_hit_rate', 0):.0%}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline planner/executor/verifier benchmark.")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=128, help="Queries per concurrency level")
+    parser.add_argument("--latency-scale", type=float, default=0.1,
+                        help="Multiplier on every simulated LLM and API latency")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--stream", action="store_true", help="Stream the verifier answer like the UIs do")
+    parser.add_argument("--warm-caches", action="store_true",
+                        help="Keep the tool, plan and venue caches (by default every query is a cold miss)")
+    parser.add_argument("--no-router", action="store_true",
+                        help="Send every query to the (fake) LLM planner instead of the rule-based router")
+    parser.add_argument("--no-speculate", action="store_true",
+                        help="Wait for the whole plan before executing instead of streaming steps to the executor")
+    parser.add_argument("--deadline", type=float, default=float(os.getenv("QUERY_DEADLINE_S", "20")),
+                        help="Per-query deadline in seconds, scaled by --latency-scale like the latencies (0: none)")
+    parser.add_argument("--stragglers", type=float, default=0.0,
+                        help="Fraction of stub API responses that are 20x slower than the median")
+    parser.add_argument("--no-hedge", action="store_true", help="Never send hedged duplicate GETs")
+    parser.add_argument("--no-prefix-cache", action="store_true",
+                        help="Fake LLM bills and prefills every prompt in full")
+    parser.add_argument("--cache-min-tokens", type=int, default=0,
+                        help="Shortest prefix the fake LLM caches (Gemini 2.5 Flash needs 1024)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative regression before failing")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = load_scenarios(args.scenarios)
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    if not args.warm_caches:
+        BaseTool.cache = ToolCache(max_entries=0)
+        PlannerAgent.plan_cache = PlanCache(max_entries=0)
+        DatePlannerTool.venues = VenueStore(max_age=0)
+        DatePlannerTool.prefetch_min_hits = float("inf")
+
+    if args.no_router:
+        PlannerAgent.router = IntentRouter(enabled=False)
+    if args.no_hedge:
+        BaseTool.hedge = False
+    deadline_s = args.deadline * args.latency_scale
+
+    rng = random.Random(args.seed)
+    weighted = [s["query"] for s in scenarios for _ in range(s.get("weight", 1))]
+    queries = [rng.choice(weighted) for _ in range(args.requests)]
+
+    report = {
+        "settings": {
+            "requests": args.requests,
+            "latency_scale": args.latency_scale,
+            "seed": args.seed,
+            "stream": args.stream,
+            "warm_caches": args.warm_caches,
+            "router": not args.no_router,
+            "speculate": not args.no_speculate,
+            "deadline_s": args.deadline,
+            "stragglers": args.stragglers,
+            "hedge": not args.no_hedge,
+            "prefix_cache": not args.no_prefix_cache,
+            "cache_min_tokens": args.cache_min_tokens
+        },
+        "levels": {}
+    }
+
+    with StubServer(scale=args.latency_scale, seed=args.seed, stragglers=args.stragglers) as stub:
+        point_tools_at(stub.url, registry, os.environ)
+        tool_defs = registry.definitions()
+        planner, executor, verifier, llm = build_agents(scenarios, args)
+
+        # One pass over every scenario first, so lazy imports and connection
+        # setup are not billed to whichever level happens to run first
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_sync(run_level((planner, executor, verifier), [s["query"] for s in scenarios], tool_defs, 1, False, True,
+                               deadline_s))
+        llm.calls = {kind: 0 for kind in llm.calls}
+        PlannerAgent.router.clear()
+        stub.requests = {api: 0 for api in stub.requests}
+
+        for level in levels:
+            tracer.clear()
+            # Rate tables are how CurrencyTool works, not a result cache; each level starts without them
+            CurrencyTool.rates.clear()
+            # The agents narrate every step; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                timings, wall_s = run_sync(
+                    run_level((planner, executor, verifier), queries, tool_defs, level, args.stream,
+                              not args.no_speculate, deadline_s)
+                )
+            report["levels"][str(level)] = summarize(timings, wall_s)
+
+    report["llm_calls"] = dict(llm.calls)
+    report["api_calls"] = dict(stub.requests)
+    report["router_hit_rate"] = round(PlannerAgent.router.stats()["hit_rate"], 3)
+    # ru_maxrss is KiB on Linux
+    report["maxrss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print_report(report)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+
+    if baseline.get("settings") != report["settings"]:
+        print("⚠️ Baseline was recorded with different settings; comparison may not be meaningful.")
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print("   " + line)
+        return 1
+    print(f"✅ Within {args.tolerance:.0%} of baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
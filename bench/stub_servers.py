@@ -0,0 +1,253 @@
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# (median ms, lognormal sigma) per upstream API, roughly what the real ones answer in
+LATENCY_PROFILES = {
+    "weather": (180, 0.4),
+    "news": (350, 0.5),
+    "currency": (150, 0.3),
+    "venues": (250, 0.45),
+    "github": (220, 0.4)
+}
+
+# How much slower a straggler is than its API's median (a GC pause, a cold shard)
+STRAGGLER_FACTOR = 20
+
+# API keys the tools refuse to run without
+API_KEY_ENV = ("WEATHER_API_KEY", "NEWS_API_KEY", "EXCHANGE_RATE_KEY", "TOMTOM_API_KEY")
+# Optional credentials that switch tools onto their batch endpoints
+BATCH_KEY_ENV = ("GITHUB_TOKEN",)
+
+
+def _stable(text, low, high):
+    """Deterministic pseudo-random number per input so responses are repeatable."""
+    digest = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+    return low + (high - low) * digest / 0xFFFFFFFF
+
+
+# City ids handed out so far, for /group lookups
+_CITIES_BY_ID = {}
+
+
+def _city(city):
+    city_id = int(_stable(city.lower(), 100000, 9999999))
+    _CITIES_BY_ID[city_id] = city
+    return {
+        "id": city_id,
+        "name": city,
+        "main": {"temp": round(_stable(city, 12, 38), 1), "humidity": int(_stable(city + "h", 30, 90))},
+        "weather": [{"description": "clear sky"}]
+    }
+
+
+def weather(path, query):
+    return 200, _city(query.get("q", ["Delhi"])[0])
+
+
+def weather_group(path, query):
+    # /data/2.5/group?id=1,2,3
+    ids = [int(i) for i in query.get("id", [""])[0].split(",") if i.isdigit()]
+    found = [_city(_CITIES_BY_ID[i]) for i in ids if i in _CITIES_BY_ID]
+    return 200, {"cnt": len(found), "list": found}
+
+
+def news(path, query):
+    topic = query.get("q", ["news"])[0]
+    size = int(query.get("pageSize", ["3"])[0])
+    return 200, {
+        "status": "ok",
+        "articles": [
+            {"title": f"{topic} story {i + 1}", "source": {"name": "Stub Wire"}, "url": f"https://news.example/{i}"}
+            for i in range(size)
+        ]
+    }
+
+
+CURRENCIES = ("USD", "INR", "EUR", "GBP", "JPY", "AED", "SGD", "AUD", "CAD", "CHF")
+
+
+def _usd_value(code):
+    # What one unit of `code` is worth in USD; pairs and tables agree on it
+    return 1.0 if code == "USD" else _stable(code, 0.005, 1.5)
+
+
+def currency(path, query):
+    # /v6/{key}/pair/{from}/{to}/{amount} and /v6/{key}/latest/{base}
+    parts = path.strip("/").split("/")
+    if len(parts) >= 6 and parts[2] == "pair" and parts[3] in CURRENCIES and parts[4] in CURRENCIES:
+        from_code, to_code, amount = parts[3], parts[4], float(parts[5])
+        rate = round(_usd_value(from_code) / _usd_value(to_code), 6)
+        return 200, {"result": "success", "conversion_rate": rate, "conversion_result": round(amount * rate, 4)}
+    if len(parts) == 4 and parts[2] == "latest" and parts[3] in CURRENCIES:
+        base = parts[3]
+        rates = {code: round(_usd_value(base) / _usd_value(code), 6) for code in CURRENCIES}
+        return 200, {"result": "success", "base_code": base, "conversion_rates": rates}
+    return 404, {"result": "error", "error-type": "unsupported-code"}
+
+
+def venues(path, query):
+    # /search/2/search/{query}.json
+    text = unquote(path.rsplit("/", 1)[-1])[:-len(".json")]
+    limit = int(query.get("limit", ["3"])[0])
+    return 200, {
+        "results": [
+            {
+                "poi": {"name": f"Stub Venue {i + 1}", "categories": ["cafe"]},
+                "address": {"freeformAddress": f"{i + 1} Main Road, {text.split(' in ')[-1]}"},
+                "dist": round(_stable(text + str(i), 100, 5000), 1),
+                "position": {"lat": round(_stable(text + "lat" + str(i), 12.8, 13.1), 6),
+                             "lon": round(_stable(text + "lon" + str(i), 77.5, 77.8), 6)}
+            }
+            for i in range(limit)
+        ]
+    }
+
+
+def _repo(owner, repo):
+    return {
+        "name": repo,
+        "stargazers_count": int(_stable(owner + repo, 10, 200000)),
+        "description": f"Stub description of {owner}/{repo}",
+        "html_url": f"https://github.com/{owner}/{repo}"
+    }
+
+
+def github(path, query):
+    # /repos/{owner}/{repo}
+    parts = path.strip("/").split("/")
+    if len(parts) != 3:
+        return 404, {"message": "Not Found"}
+    return 200, _repo(parts[1], parts[2])
+
+
+def github_graphql(path, body):
+    # Only the aliased repository(owner: $oN, name: $nN) lookups GitHubTool sends
+    variables = body.get("variables") or {}
+    data, i = {}, 0
+    while f"o{i}" in variables:
+        data[f"r{i}"] = _repo(variables[f"o{i}"], variables[f"n{i}"])
+        i += 1
+    return 200, {"data": data}
+
+
+ROUTES = (
+    ("/data/2.5/weather", "weather", weather),
+    ("/data/2.5/group", "weather", weather_group),
+    ("/v2/everything", "news", news),
+    ("/v6/", "currency", currency),
+    ("/search/2/search/", "venues", venues),
+    ("/repos/", "github", github)
+)
+
+POST_ROUTES = (
+    ("/graphql", "github", github_graphql),
+)
+
+
+class StubServer:
+    """
+    One local HTTP/1.1 server answering for every upstream API the tools call,
+    with seeded lognormal latency per API. `scale` shrinks or stretches all
+    latencies; a `stragglers` fraction of requests takes STRAGGLER_FACTOR times
+    the median instead, the tail that hedged requests and deadlines are for.
+    """
+
+    def __init__(self, scale=1.0, seed=0, profiles=None, host="127.0.0.1", port=0, stragglers=0.0):
+        self.scale = scale
+        self.stragglers = stragglers
+        self.profiles = {**LATENCY_PROFILES, **(profiles or {})}
+        self.requests = {name: 0 for _, name, _ in ROUTES + POST_ROUTES}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _delay(self, api):
+        median_ms, sigma = self.profiles[api]
+        with self._lock:
+            self.requests[api] += 1
+            if self.stragglers and self._random.random() < self.stragglers:
+                return median_ms * STRAGGLER_FACTOR * self.scale / 1000
+            return median_ms * math.exp(self._random.gauss(0.0, sigma)) * self.scale / 1000
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                self._answer(ROUTES, parts.path, parse_qs(parts.query))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    payload = {}
+                self._answer(POST_ROUTES, urlsplit(self.path).path, payload)
+
+            def _answer(self, routes, path, request):
+                for prefix, api, route in routes:
+                    if path.startswith(prefix):
+                        time.sleep(stub._delay(api))
+                        status, payload = route(path, request)
+                        break
+                else:
+                    status, payload = 404, {"message": "Not Found"}
+                body = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up: a hedged request's loser or a deadline cancellation
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def point_tools_at(url, registry, environ):
+    """
+    Redirects every network tool in `registry` to the stub server and fills
+    in dummy API keys, plus the optional ones that enable batch endpoints.
+    """
+    for name in registry:
+        tool = registry[name]
+        if hasattr(type(tool), "base_url"):
+            type(tool).base_url = url
+    for key in API_KEY_ENV + BATCH_KEY_ENV:
+        environ.setdefault(key, "stub")
@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+_current_deadline = contextvars.ContextVar("current_deadline", default=None)
+
+# Share of the time left that a stage may use when it starts. What a stage
+# does not use rolls over to the next one; verification gets the rest.
+STAGE_SHARES = {"plan": 0.3, "execute": 0.6, "verify": 1.0}
+
+# Floor for capped timeouts, so a nearly spent budget still allows a fast answer
+MIN_TIMEOUT_S = 0.05
+
+# Marked on a step's output when it was cancelled or never started because
+# the deadline passed; the verifier answers from the other steps
+TIMED_OUT = "timed_out"
+
+
+class Deadline:
+    """
+    The point in time by which a query must be answered.
+    Each stage runs under a slice of what is left (stage()), and every tool
+    call caps its timeouts at remaining(), so one slow API cannot hold the
+    whole query past its budget.
+    """
+
+    def __init__(self, budget_s, parent=None):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s
+        if parent is not None:
+            self.expires_at = min(self.expires_at, parent.expires_at)
+
+    @classmethod
+    def from_env(cls):
+        """A budget of QUERY_DEADLINE_S seconds (default 20), or None when it is 0."""
+        budget_s = float(os.getenv("QUERY_DEADLINE_S", "20"))
+        return cls(budget_s) if budget_s > 0 else None
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def stage(self, *names):
+        """
+        A child deadline for one stage, or for stages that overlap (streamed
+        planning and execution) with the combined share of both.
+        """
+        unused = 1.0
+        for name in names:
+            unused *= 1 - STAGE_SHARES[name]
+        return Deadline(self.remaining() * (1 - unused), parent=self)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline):
+    """Makes `deadline` (None for no deadline) current for everything started inside the block."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def stage_deadline(*names):
+    """The named stage's slice of the current deadline, or None outside any deadline."""
+    deadline = _current_deadline.get()
+    return deadline.stage(*names) if deadline is not None else None
+
+
+def cap_timeout(timeout):
+    """A (connect, read) timeout no longer than the current deadline allows."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    left = max(deadline.remaining(), MIN_TIMEOUT_S)
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return min(connect, left), min(read, left)
+
+
+async def within(awaitable, deadline):
+    """Awaits `awaitable`, raising asyncio.TimeoutError once `deadline` (None: never) passes."""
+    if deadline is None:
+        return await awaitable
+    return await asyncio.wait_for(awaitable, deadline.remaining())
+
+
+async def aiter_within(iterable, deadline):
+    """Items of an async iterable until `deadline` passes, then asyncio.TimeoutError."""
+    iterator = iterable.__aiter__()
+    while True:
+        try:
+            item = await within(iterator.__anext__(), deadline)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+def timed_out_output(error):
+    return {"error": error, TIMED_OUT: True}
+
+
+def is_timed_out(output):
+    return isinstance(output, dict) and output.get(TIMED_OUT) is True
@@ -0,0 +1,96 @@
+import os
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+
+# One bounded pool for the whole process, used for blocking work
+MAX_WORKERS = int(os.getenv("EXECUTOR_MAX_WORKERS", "16"))
+
+_worker_pool = None
+_loop = None
+_loop_thread = None
+_lock = threading.Lock()
+_background = set()
+
+
+def get_worker_pool():
+    """Returns the shared ThreadPoolExecutor, creating it on first use."""
+    global _worker_pool
+    if _worker_pool is None:
+        with _lock:
+            if _worker_pool is None:
+                _worker_pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix="tool-worker"
+                )
+    return _worker_pool
+
+
+def get_loop():
+    """
+    Returns the process-wide event loop, started on a daemon thread.
+    Every sync entry point funnels its coroutine onto this one loop, so
+    pooled async clients (httpx, Gemini) are created once and reused.
+    """
+    global _loop, _loop_thread
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def serve():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                _loop_thread = threading.Thread(target=serve, name="agent-loop", daemon=True)
+                _loop_thread.start()
+                ready.wait()
+                _loop = loop
+    return _loop
+
+
+async def _in_context(coro, context):
+    # Tasks on the loop thread start from that thread's context; carry the
+    # caller's context vars (e.g. the telemetry trace id) across
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_sync(coro, timeout=None):
+    """Runs a coroutine on the shared loop and blocks for its result."""
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() called from the agent loop; await the coroutine instead.")
+    wrapped = _in_context(coro, contextvars.copy_context())
+    return asyncio.run_coroutine_threadsafe(wrapped, loop).result(timeout)
+
+
+def spawn(coro):
+    """
+    Schedules a coroutine on the shared loop without waiting for it, from
+    any thread. Used for background work such as cache refreshes.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _loop_thread:
+        task = loop.create_task(coro)
+        # The loop only keeps weak references to tasks
+        _background.add(task)
+        task.add_done_callback(_background.discard)
+        return task
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def iter_sync(agen):
+    """Drives an async generator on the shared loop from sync code, item by item."""
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        run_sync(agen.aclose())
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Numeric span attributes that are summed into Prometheus counters
+COUNTED_ATTRS = ("input_tokens", "output_tokens", "cached_tokens")
+
+
+class Span:
+    """One timed stage (plan, execute, tool, verify, llm, api) of one query."""
+
+    def __init__(self, tracer, stage, name, trace_id, attrs):
+        self.tracer = tracer
+        self.stage = stage
+        self.name = name or stage
+        self.trace_id = trace_id
+        self.attrs = dict(attrs)
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            if value:
+                self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def end(self, error=None):
+        if self.duration_ms is not None:
+            return
+        self.duration_ms = self.elapsed_ms()
+        if error is not None:
+            self.attrs["error"] = str(error)
+        self.tracer._record(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "stage": self.stage,
+            "name": self.name,
+            "started_at": round(self.started_at, 6),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            **self.attrs
+        }
+
+
+class _NullSpan:
+    """Returned by current_span() outside any span so callers never need a check."""
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, **counts):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    In-process span collector with a bounded ring buffer.
+    Spans can also be appended to a JSON-lines file as they finish
+    (TELEMETRY_PATH) and rendered in Prometheus text format.
+    """
+
+    def __init__(self, max_spans=5000, sink_path=None):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self.sink_path = sink_path
+        self.counters = defaultdict(int)
+        # Lifetime totals so Prometheus counters survive ring-buffer eviction
+        self._totals = defaultdict(lambda: {"count": 0, "sum_ms": 0.0, "errors": 0, "cache_hits": 0})
+        self._attr_totals = defaultdict(float)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_spans=int(os.getenv("TELEMETRY_MAX_SPANS", "5000")),
+            sink_path=os.getenv("TELEMETRY_PATH") or None
+        )
+
+    @contextmanager
+    def trace(self, trace_id=None):
+        """Groups every span started inside the block under one query id."""
+        trace_id = trace_id or uuid.uuid4().hex[:16]
+        token = _current_trace.set(trace_id)
+        try:
+            yield trace_id
+        finally:
+            _current_trace.reset(token)
+
+    def start(self, stage, name=None, **attrs):
+        """Starts a span without making it current; the caller must end() it."""
+        return Span(self, stage, name, _current_trace.get(), attrs)
+
+    @contextmanager
+    def span(self, stage, name=None, **attrs):
+        span = self.start(stage, name, **attrs)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def current_span(self):
+        return _current_span.get() or NULL_SPAN
+
+    def current_trace(self):
+        return _current_trace.get()
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _record(self, span):
+        record = span.to_dict()
+        key = (span.stage, span.name)
+        with self._lock:
+            self._spans.append(record)
+            totals = self._totals[key]
+            totals["count"] += 1
+            totals["sum_ms"] += record["duration_ms"]
+            totals["errors"] += 1 if record.get("error") else 0
+            totals["cache_hits"] += 1 if record.get("cache_hit") else 0
+            for attr in COUNTED_ATTRS:
+                if record.get(attr):
+                    self._attr_totals[(span.stage, attr)] += record[attr]
+            if self.sink_path:
+                try:
+                    with open(self.sink_path, "a") as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError:
+                    pass
+
+    def spans(self, stage=None, trace_id=None):
+        with self._lock:
+            records = list(self._spans)
+        return [
+            r for r in records
+            if (stage is None or r["stage"] == stage) and (trace_id is None or r["trace_id"] == trace_id)
+        ]
+
+    def percentiles(self, window=200):
+        """Rolling p50/p95 duration per stage over the last `window` spans of each stage."""
+        by_stage = defaultdict(list)
+        for record in self.spans():
+            by_stage[record["stage"]].append(record["duration_ms"])
+        summary = {}
+        for stage, durations in by_stage.items():
+            recent = sorted(durations[-window:])
+            summary[stage] = {
+                "count": len(recent),
+                "p50_ms": quantile(recent, 0.50),
+                "p95_ms": quantile(recent, 0.95)
+            }
+        return summary
+
+    def trace_tokens(self, trace_id):
+        """Token totals across one query's spans."""
+        totals = {attr: 0 for attr in COUNTED_ATTRS}
+        for record in self.spans(trace_id=trace_id):
+            for attr in COUNTED_ATTRS:
+                totals[attr] += record.get(attr, 0) or 0
+        return totals
+
+    def export_jsonl(self):
+        return "".join(json.dumps(r) + "\n" for r in self.spans())
+
+    def prometheus(self):
+        lines = [
+            "# HELP agent_stage_duration_ms Stage latency over the recent span window.",
+            "# TYPE agent_stage_duration_ms summary"
+        ]
+        for stage, stats in sorted(self.percentiles().items()):
+            lines.append(f'agent_stage_duration_ms{{stage="{stage}",quantile="0.5"}} {stats["p50_ms"]:.3f}')
+            lines.append(f'agent_stage_duration_ms{{stage="{stage}",quantile="0.95"}} {stats["p95_ms"]:.3f}')
+
+        with self._lock:
+            totals = dict(self._totals)
+            attr_totals = dict(self._attr_totals)
+            counters = dict(self.counters)
+
+        lines += ["# HELP agent_spans_total Finished spans.", "# TYPE agent_spans_total counter"]
+        for (stage, name), t in sorted(totals.items()):
+            lines.append(f'agent_spans_total{{stage="{stage}",name="{name}"}} {t["count"]}')
+        lines += ["# HELP agent_span_duration_ms_sum Total time spent per span.", "# TYPE agent_span_duration_ms_sum counter"]
+        for (stage, name), t in sorted(totals.items()):
+            lines.append(f'agent_span_duration_ms_sum{{stage="{stage}",name="{name}"}} {t["sum_ms"]:.3f}')
+        lines += ["# HELP agent_span_errors_total Spans that ended in an error.", "# TYPE agent_span_errors_total counter"]
+        for (stage, name), t in sorted(totals.items()):
+            lines.append(f'agent_span_errors_total{{stage="{stage}",name="{name}"}} {t["errors"]}')
+        lines += ["# HELP agent_cache_hits_total Spans served from a cache.", "# TYPE agent_cache_hits_total counter"]
+        for (stage, name), t in sorted(totals.items()):
+            lines.append(f'agent_cache_hits_total{{stage="{stage}",name="{name}"}} {t["cache_hits"]}')
+        lines += ["# HELP agent_tokens_total LLM tokens by stage and kind.", "# TYPE agent_tokens_total counter"]
+        for (stage, attr), value in sorted(attr_totals.items()):
+            lines.append(f'agent_tokens_total{{stage="{stage}",kind="{attr}"}} {int(value)}')
+        lines += ["# HELP agent_events_total Named event counters.", "# TYPE agent_events_total counter"]
+        for name, value in sorted(counters.items()):
+            lines.append(f'agent_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self.counters.clear()
+            self._totals.clear()
+            self._attr_totals.clear()
+
+
+def quantile(sorted_values, q):
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return round(sorted_values[index], 3)
+
+
+# Process-wide tracer shared by every agent and tool
+tracer = Tracer.from_env()
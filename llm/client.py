@@ -1,18 +1,84 @@
 import os
 import json
-import google.generativeai as genai
+import datetime
+import threading
+import functools
+from collections import OrderedDict
 from dotenv import load_dotenv
+from core.runtime import run_sync, iter_sync
+from core.telemetry import tracer
+from llm.scheduler import RequestScheduler, PRIORITY_PLAN
+from llm.tokens import estimate_tokens
+from llm.context_cache import ContextCache, prefix_hash
 
 load_dotenv()
 
+# Room left for the model's answer when estimating a call's token cost
+EXPECTED_OUTPUT_TOKENS = 512
+MAX_CACHED_MODELS = 64
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def get_genai():
+    """
+    Imports and configures google.generativeai on first use.
+    The SDK takes most of a second to import, so startup and cached or
+    templated queries never pay for it.
+    """
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _genai = genai
+    return _genai
+
+
+def is_throttle(error):
+    from google.api_core import exceptions as api_exceptions
+    return isinstance(error, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests))
+
+
 class LLMClient:
+    # Shared by every client so planner and verifier draw on one quota
+    scheduler = RequestScheduler.from_env()
+    # Explicit Gemini caches for long static system prompts (GEMINI_CONTEXT_CACHE=1)
+    context_cache = ContextCache.from_env()
+    _models = OrderedDict()
+    _models_lock = threading.Lock()
+
     def __init__(self):
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
         # self.model_name = "gemini-3-flash-preview"
         # self.model_name = "gemini-2.5-flash"
         self.model_name = "gemini-2.5-flash-lite"
 
-    def chat(self, messages, json_mode=False):
+    def _model_for(self, system_instruction):
+        """Reuses GenerativeModel handles per (model, system instruction)."""
+        # Keyed by hash so long prompts are not kept twice
+        key = prefix_hash(self.model_name, system_instruction)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = get_genai().GenerativeModel(
+                    model_name=self.model_name,
+                    system_instruction=system_instruction
+                )
+                self._models[key] = model
+                while len(self._models) > MAX_CACHED_MODELS:
+                    self._models.popitem(last=False)
+            else:
+                self._models.move_to_end(key)
+        return model
+
+    def _generation_config(self, json_mode):
+        return get_genai().types.GenerationConfig(
+            response_mime_type="application/json" if json_mode else "text/plain"
+        )
+
+    def _prepare(self, messages, json_mode):
         system_instruction = ""
         user_content = ""
 
@@ -26,20 +92,134 @@ class LLMClient:
         if not user_content.strip():
             user_content = "Please process the previous instructions."
 
-        generation_config = genai.types.GenerationConfig(
-            response_mime_type="application/json" if json_mode else "text/plain"
+        generation_config = self._generation_config(json_mode)
+        estimated = estimate_tokens(system_instruction) + estimate_tokens(user_content) + EXPECTED_OUTPUT_TOKENS
+        return system_instruction, user_content, generation_config, estimated
+
+    async def _amodel_for(self, system_instruction, span):
+        """
+        The model to call for a system instruction: one bound to its Gemini
+        context cache when the prefix is cached, else the plain handle.
+        Agents keep the system instruction static (no query, no results), so
+        every call of a kind shares one prefix.
+        """
+        key = prefix_hash(self.model_name, system_instruction)
+        span.set(prefix=key)
+        if self.context_cache.eligible(key, system_instruction):
+            model = await self.context_cache.amodel(
+                key, functools.partial(self._create_cached_model, system_instruction, key)
+            )
+            if model is not None:
+                span.set(context_cache=True)
+                return model
+        return self._model_for(system_instruction)
+
+    def _create_cached_model(self, system_instruction, key):
+        genai = get_genai()
+        cached = genai.caching.CachedContent.create(
+            model=f"models/{self.model_name}",
+            display_name=f"prefix-{key}",
+            system_instruction=system_instruction,
+            ttl=datetime.timedelta(seconds=self.context_cache.ttl_s)
         )
+        return genai.GenerativeModel.from_cached_content(cached_content=cached)
+
+    async def achat(self, messages, json_mode=False, priority=PRIORITY_PLAN):
+        """
+        Native async call; many of these can be in flight on one event loop.
+        Calls wait for RPM/TPM quota in priority order and 429s are retried;
+        once the retries run out the 429 is raised, so callers can report
+        the quota rather than answer with fallback text.
+        """
+        system_instruction, user_content, generation_config, estimated = self._prepare(messages, json_mode)
+
+        with tracer.span("llm", self.model_name, priority=priority) as span:
+            try:
+                model = await self._amodel_for(system_instruction, span)
+                response = await self.scheduler.run(
+                    lambda: model.generate_content_async(user_content, generation_config=generation_config),
+                    priority=priority,
+                    tokens=estimated,
+                    is_throttle=is_throttle
+                )
+                usage = getattr(response, "usage_metadata", None)
+                self._record_usage(span, usage)
+                self.scheduler.reconcile(estimated, getattr(usage, "total_token_count", 0))
+                if not response.text:
+                    return "{}" if json_mode else "I couldn't generate a response."
+                return response.text
+            except Exception as e:
+                span.set(error=str(e))
+                if is_throttle(e):
+                    self._report_quota(e)
+                    raise
+                print(f"⚠️ Gemini API Error: {e}")
+                return "{}" if json_mode else "Error: API call failed."
 
-        model = genai.GenerativeModel(
-            model_name=self.model_name,
-            system_instruction=system_instruction
+    def _record_usage(self, span, usage):
+        if usage is None:
+            return
+        span.add(
+            input_tokens=getattr(usage, "prompt_token_count", 0),
+            output_tokens=getattr(usage, "candidates_token_count", 0),
+            cached_tokens=getattr(usage, "cached_content_token_count", 0)
         )
 
+    def _report_quota(self, e):
+        print(f"⚠️ Gemini quota exhausted after {self.scheduler.max_retries} retries: {e}")
+
+    def chat(self, messages, json_mode=False, priority=PRIORITY_PLAN):
+        """Blocking wrapper around achat() for sync callers."""
+        return run_sync(self.achat(messages, json_mode, priority))
+
+    async def astream_chat(self, messages, json_mode=False, priority=PRIORITY_PLAN):
+        """
+        Yields response text chunks as Gemini produces them.
+        Quota and 429 retries apply to opening the stream, and a 429 that
+        outlasts them is raised as in achat(); once text has started
+        flowing, an error just ends the stream.
+        """
+        system_instruction, user_content, generation_config, estimated = self._prepare(messages, json_mode)
+        emitted = False
+        # Started explicitly: a generator's context does not persist across yields
+        span = tracer.start("llm", self.model_name, priority=priority, stream=True)
+
         try:
-            response = model.generate_content(user_content, generation_config=generation_config)
-            if not response.text:
-                return "{}" if json_mode else "I couldn't generate a response."
-            return response.text
+            model = await self._amodel_for(system_instruction, span)
+            response = await self.scheduler.run(
+                lambda: model.generate_content_async(
+                    user_content, generation_config=generation_config, stream=True
+                ),
+                priority=priority,
+                tokens=estimated,
+                is_throttle=is_throttle
+            )
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. only finish metadata)
+                    continue
+                if text:
+                    if not emitted:
+                        span.set(ttft_ms=round(span.elapsed_ms(), 3))
+                    emitted = True
+                    yield text
+            usage = getattr(response, "usage_metadata", None)
+            self._record_usage(span, usage)
+            self.scheduler.reconcile(estimated, getattr(usage, "total_token_count", 0))
         except Exception as e:
+            span.set(error=str(e))
+            if is_throttle(e) and not emitted:
+                self._report_quota(e)
+                raise
             print(f"⚠️ Gemini API Error: {e}")
-            return "{}" if json_mode else "Error: API call failed."
\ No newline at end of file
+        finally:
+            span.end()
+
+        if not emitted:
+            yield "{}" if json_mode else "Error: API call failed."
+
+    def stream_chat(self, messages, json_mode=False, priority=PRIORITY_PLAN):
+        """Sync generator over astream_chat() for sync callers."""
+        return iter_sync(self.astream_chat(messages, json_mode, priority))
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import hashlib
+from core.runtime import get_worker_pool
+from llm.tokens import estimate_tokens
+
+# Cached input tokens are billed at this fraction of the normal input rate (Gemini 2.5)
+CACHED_INPUT_PRICE_RATIO = 0.25
+# A cache this close to expiry is recreated instead of used
+RENEW_MARGIN_S = 60
+# After a transient creation failure (timeout, 429, 5xx) the prefix goes
+# uncached for this long, then creation is tried again
+RETRY_AFTER_S = 30
+# 4xx codes that say nothing about the prefix itself
+TRANSIENT_CLIENT_CODES = {408, 429, 499}
+
+
+def prefix_hash(model_name, system_instruction):
+    """Stable key of a (model, static prompt prefix) pair."""
+    return hashlib.sha256(f"{model_name}\0{system_instruction}".encode()).hexdigest()[:16]
+
+
+def is_rejection(error):
+    """
+    True when the API refused the cache for good (a 4xx such as a prefix
+    below the size minimum or an invalid argument), False for errors worth
+    retrying later: timeouts, quota and server errors.
+    """
+    from google.api_core import exceptions as api_exceptions
+    return isinstance(error, api_exceptions.ClientError) and error.code not in TRANSIENT_CLIENT_CODES
+
+
+def billed_input_tokens(input_tokens, cached_tokens):
+    """Input tokens at the full rate that would cost the same as this mix."""
+    return input_tokens - cached_tokens * (1 - CACHED_INPUT_PRICE_RATIO)
+
+
+class ContextCache:
+    """
+    Gemini explicit context caches for the agents' static prompt prefixes
+    (planner instructions + tool definitions, verifier instructions).
+
+    One CachedContent per prefix hash, created off the event loop on first
+    use and recreated when it expires; concurrent first calls share one
+    creation. Gemini refuses prefixes under a model-specific minimum
+    (1024 tokens for 2.5 Flash), so shorter ones are not tried, and a
+    prefix the API rejects is sent uncached from then on. Other failures
+    only skip the cache for RETRY_AFTER_S.
+    """
+
+    def __init__(self, enabled=False, min_tokens=1024, ttl_s=3600):
+        self.enabled = enabled
+        self.min_tokens = min_tokens
+        self.ttl_s = ttl_s
+        # prefix hash -> (model bound to the cache, expires_at)
+        self._entries = {}
+        self._creating = {}
+        self._rejected = set()
+        # prefix hash -> time before which creation is not retried
+        self._retry_at = {}
+        self.created = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.getenv("GEMINI_CONTEXT_CACHE", "0") == "1",
+            min_tokens=int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024")),
+            ttl_s=int(os.getenv("GEMINI_CONTEXT_CACHE_TTL", "3600"))
+        )
+
+    def eligible(self, key, system_instruction):
+        return (self.enabled and key not in self._rejected
+                and estimate_tokens(system_instruction) >= self.min_tokens)
+
+    async def amodel(self, key, create):
+        """
+        The model bound to prefix `key`'s cache, or None to send the prompt
+        uncached. `create()` makes the cache and returns the bound model; it
+        blocks on the network, so it runs on the worker pool.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] - time.time() > RENEW_MARGIN_S:
+            return entry[0]
+
+        future = self._creating.get(key)
+        if future is None:
+            if time.time() < self._retry_at.get(key, 0):
+                return None
+            future = asyncio.get_running_loop().run_in_executor(get_worker_pool(), create)
+            self._creating[key] = future
+            future.add_done_callback(lambda _: self._creating.pop(key, None))
+        try:
+            model = await asyncio.shield(future)
+        except Exception as e:
+            # Callers that shared the creation see the same error; count it once
+            if key in self._rejected or time.time() < self._retry_at.get(key, 0):
+                return None
+            self.failed += 1
+            if is_rejection(e):
+                self._rejected.add(key)
+                print(f"⚠️ Gemini context cache rejected for prefix {key}, sending it uncached: {e}")
+            else:
+                self._retry_at[key] = time.time() + RETRY_AFTER_S
+                print(f"⚠️ Gemini context cache creation failed for prefix {key}, retrying in {RETRY_AFTER_S}s: {e}")
+            return None
+        if self._entries.get(key, (None,))[0] is not model:
+            self._entries[key] = (model, time.time() + self.ttl_s)
+            self.created += 1
+        return model
+
+    def stats(self):
+        return {"caches": len(self._entries), "created": self.created, "failed": self.failed}
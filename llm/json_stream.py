@@ -0,0 +1,172 @@
+import json
+
+_SIMPLE_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JsonFieldStream:
+    """
+    Incrementally pulls one top-level string field out of streamed JSON.
+    feed() takes raw chunks as they arrive and returns the newly decoded
+    characters of that field, so the answer can be shown before the JSON
+    object is complete. Escapes split across chunks are handled.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.text = ""           # everything fed so far
+        self.value = ""          # decoded field value so far
+        self.found = False
+        self.complete = False
+        self._depth = 0
+        self._in_string = False
+        self._is_key = False
+        self._expect_key = False
+        self._current = []       # raw chars of the key being read
+        self._last_key = None
+        self._capturing = False
+        self._escape = None      # pending escape sequence after a backslash
+        self._high_surrogate = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        out = []
+        for ch in chunk:
+            if self._in_string:
+                self._string_char(ch, out)
+            elif ch == '"':
+                self._in_string = True
+                self._is_key = self._depth == 1 and self._expect_key
+                self._capturing = (
+                    not self._is_key and self._depth == 1
+                    and self._last_key == self.field and not self.complete
+                )
+                if self._capturing:
+                    self.found = True
+                self._current = []
+            elif ch in "{[":
+                self._depth += 1
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+            elif ch == ":" and self._depth == 1:
+                self._expect_key = False
+        decoded = "".join(out)
+        self.value += decoded
+        return decoded
+
+    def _string_char(self, ch, out):
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[0] == "u" and len(self._escape) < 5:
+                return
+            self._emit(self._decode_escape(self._escape), out)
+            self._escape = None
+            return
+        if ch == "\\":
+            self._escape = ""
+            return
+        if ch == '"':
+            self._in_string = False
+            if self._is_key:
+                self._last_key = "".join(self._current)
+            elif self._capturing:
+                self._capturing = False
+                self.complete = True
+            return
+        self._emit(ch, out)
+
+    def _decode_escape(self, seq):
+        if seq[0] != "u":
+            return _SIMPLE_ESCAPES.get(seq, seq)
+        code = int(seq[1:], 16)
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+        return chr(code)
+
+    def _emit(self, text, out):
+        if self._is_key:
+            self._current.append(text)
+        elif self._capturing:
+            out.append(text)
+
+    def parsed(self):
+        """The whole document once the stream has finished, or None if invalid."""
+        try:
+            return json.loads(self.text.replace("```json", "").replace("```", "").strip())
+        except json.JSONDecodeError:
+            return None
+
+
+class JsonArrayStream:
+    """
+    Incrementally pulls the objects of one top-level array field out of
+    streamed JSON, e.g. a plan's "steps". feed() returns each object as soon
+    as its closing brace arrives, so work can start before the rest of the
+    document has been generated.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.text = ""           # everything fed so far
+        self.items = []          # objects completed so far
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._last_key = None
+        self._in_array = False
+        self._item_start = None  # offset of the current item's "{"
+
+    def feed(self, chunk):
+        offset = len(self.text)
+        self.text += chunk
+        done = []
+        for i, ch in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = self.text[self._string_start:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ":" and self._depth == 1:
+                self._last_key = self._last_string
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and ch == "[" and self._last_key == self.field:
+                    self._in_array = True
+                elif self._depth == 3 and self._in_array and ch == "{":
+                    self._item_start = i
+            elif ch in "}]":
+                if self._depth == 3 and self._item_start is not None:
+                    try:
+                        item = json.loads(self.text[self._item_start:i + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        done.append(item)
+                    self._item_start = None
+                elif self._depth == 2:
+                    self._in_array = False
+                self._depth -= 1
+        self.items += done
+        return done
+
+    def parsed(self):
+        """The whole document once the stream has finished, or None if invalid."""
+        try:
+            return json.loads(self.text.replace("```json", "").replace("```", "").strip())
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,126 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+
+# Lower runs first: finishing an in-flight query beats starting a new one
+PRIORITY_VERIFY = 0
+PRIORITY_PLAN = 1
+
+
+class TokenBucket:
+    """Refills `capacity` units per minute, continuously."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        # May go negative when reconciling actual usage; later callers wait it out
+        self.tokens -= amount
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RequestScheduler:
+    """
+    Admits LLM calls within RPM/TPM quotas, highest priority first.
+    Callers wait in a priority heap; a single dispatcher grants the head of
+    the queue as soon as both buckets can cover it.
+    """
+
+    def __init__(self, rpm=15, tpm=250_000, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.rpm = TokenBucket(rpm)
+        self.tpm = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._waiters = []
+        self._seq = itertools.count()
+        self._dispatcher = None
+        self.retries = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rpm=int(os.getenv("GEMINI_RPM", "15")),
+            tpm=int(os.getenv("GEMINI_TPM", "250000")),
+            max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+        )
+
+    async def acquire(self, priority, tokens):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    async def _dispatch(self):
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = max(self.rpm.delay(1), self.tpm.delay(tokens))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self._waiters)
+            self.rpm.consume(1)
+            self.tpm.consume(tokens)
+            future.set_result(None)
+
+    def reconcile(self, estimated, actual):
+        """Charges the difference once the real token count is known."""
+        if actual:
+            self.tpm.consume(actual - estimated)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff after a 429; also pauses everyone else."""
+        self.throttled += 1
+        self.rpm.drain()
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def run(self, call, priority=PRIORITY_PLAN, tokens=1, is_throttle=lambda e: False):
+        """Runs `call()` (a coroutine factory) under the quota, retrying throttled calls."""
+        attempt = 0
+        while True:
+            await self.acquire(priority, tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if not is_throttle(e) or attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self.retries += 1
+                print(f"⏳ Gemini rate limited, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self):
+        return {
+            "queued": len(self._waiters),
+            "retries": self.retries,
+            "throttled": self.throttled
+        }
@@ -0,0 +1,17 @@
+import re
+
+# Words, numbers and single punctuation marks roughly track Gemini's tokenizer
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """
+    Cheap local token estimate, no API round trip.
+    Long words split into several sub-word tokens, so each word counts
+    one token per ~4 characters; punctuation counts one each.
+    """
+    if not text:
+        return 0
+    if not isinstance(text, str):
+        text = str(text)
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _PIECES.findall(text))
@@ -1,71 +1,134 @@
-import json
 import os
+import sys
+import json
+import argparse
+import contextlib
 from termcolor import colored
-from agents.planner import PlannerAgent
-from agents.executor import ExecutorAgent
-from agents.verifier import VerifierAgent
+# The agents run in the long-lived query service; this CLI is a client of it
+from agents.service_client import ServiceClient, ServiceError
+
+def run_query(client, user_query):
+    """Streams one query through the service; returns its final "done" event."""
+    # 2 + 3. Planning and execution, each step starting as soon as it is planned
+    print(colored("\n🧠 Planner thinking...", "magenta"))
+    print(colored("\n⚙️ Executor running...", "magenta"))
+    done = None
+    for event in client.stream(user_query):
+        if event["event"] == "plan":
+            print(colored(f"📋 Plan created: {json.dumps(event['plan'], indent=2)}", "blue"))
+        elif event["event"] == "results":
+            print(colored(f"📦 Raw Results: {json.dumps(event['results'], indent=2)}", "green"))
+            cache_stats = event["tool_cache"]
+            print(colored(f"🗄️ Tool cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses ({cache_stats['backend']})", "white"))
+            # 4. Verification
+            print(colored("\n🔍 Verifier checking...", "magenta"))
+            print(colored("\n✅ FINAL ANSWER:", "cyan", attrs=['bold']))
+        elif event["event"] == "answer":
+            # Streamed as it is generated instead of waiting for the full JSON
+            print(event["text"], end="", flush=True)
+        elif event["event"] == "done":
+            done = event
+    print()
+    return done
+
+def print_trace_summary(done):
+    """One line per span of this query, so slow stages stand out."""
+    print(colored("\n⏱️ Timing:", "white", attrs=['bold']))
+    for span in done["spans"]:
+        label = span["stage"] if span["name"] == span["stage"] else f"{span['stage']}:{span['name']}"
+        flags = [k for k in ("cache_hit", "routed", "rendered", "hedged", "timed_out") if span.get(k)] + (["error"] if span.get("error") else [])
+        print(colored(f"   {label:<32} {span['duration_ms']:>9.1f} ms  {' '.join(flags)}", "white"))
+    tokens = done["tokens"]
+    print(colored(f"   tokens in/out: {tokens['input_tokens']}/{tokens['output_tokens']}", "white"))
+
+def run_batch(args):
+    """
+    Answers every query in args.batch (JSONL or plain lines, "-" for stdin)
+    and writes one JSON line per query to args.output (stdout if omitted).
+    Re-running with the same output file skips the ids already answered.
+    Runs its own pipeline in this process: a batch keeps it warm for its
+    whole run and would only queue behind interactive users in the service.
+    """
+    from agents.batch import BatchRunner, read_batch, completed_ids
+    from core.runtime import run_sync
+    from tools.base import BaseTool
+
+    to_stdout = args.output in (None, "-")
+    skip_ids = set() if to_stdout else completed_ids(args.output)
+    source = sys.stdin if args.batch == "-" else open(args.batch)
+    out = sys.stdout if to_stdout else open(args.output, "a")
+    if skip_ids:
+        print(colored(f"↩️ Resuming: {len(skip_ids)} queries already in {args.output}", "yellow"), file=sys.stderr)
+
+    def sink(result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    runner = BatchRunner(concurrency=args.concurrency, ordered=args.ordered)
+    try:
+        # Per-query narration would drown the results; answers go to `out` only
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            summary = run_sync(runner.arun(read_batch(source, skip_ids), sink))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
 
-# Import all tools
-from tools.github_tool import GitHubTool
-from tools.weather_tool import WeatherTool
-from tools.news_tool import NewsTool
-from tools.currency_tool import CurrencyTool
-from tools.compatibility_tool import CompatibilityTool
-from tools.date_planner_tool import DatePlannerTool
+    cache_stats = BaseTool.cache.stats()
+    print(colored(
+        f"📊 {summary['queries']} queries ({summary['failures']} failed) in {summary['wall_s']:.1f}s "
+        f"→ {summary['throughput_qps']:.2f} q/s | latency p50/p95/p99 "
+        f"{summary['p50_ms']:.0f}/{summary['p95_ms']:.0f}/{summary['p99_ms']:.0f} ms | "
+        f"tool calls merged: {summary['tool_calls_deduplicated']}, cache hits: {cache_stats['hits']}",
+        "white"
+    ), file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="AI Operations Assistant")
+    parser.add_argument("--batch", metavar="PATH",
+                        help='Answer every query in a JSONL/text file ("-" for stdin) instead of prompting')
+    parser.add_argument("--output", metavar="PATH", help="Batch results file (JSONL, appended; default stdout)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight at once in batch mode")
+    parser.add_argument("--ordered", action="store_true",
+                        help="Write batch results in input order instead of as they complete")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run the long-lived query service that the CLI and the Streamlit app connect to")
+    return parser.parse_args(argv)
 
 def main():
+    args = parse_args()
+    if args.serve:
+        from agents.service import serve
+        serve()
+        return
+    if args.batch:
+        run_batch(args)
+        return
+
+    # Connects to the query service, starting it if nothing is listening yet
+    client = ServiceClient()
+    try:
+        stats = client.stats()
+    except ServiceError as e:
+        print(colored(f"❌ {e}", "red"))
+        sys.exit(1)
     print(colored("🤖 AI Operations Assistant (Enhanced) Initialized", "cyan", attrs=['bold']))
-    print(colored("Tools Loaded: GitHub, Weather, News, Currency\n", "white"))
+    print(colored(f"Tools Loaded: {', '.join(stats['tools'])}\n", "white"))
     
     # 1. Inputs
     user_query = input(colored("📝 Enter your request: ", "yellow"))
-    
-    # 2. Planning
-    planner = PlannerAgent()
-    # Register all 4 tool definitions for the Planner to see
-    tool_defs = [
-        GitHubTool().get_definition(), 
-        WeatherTool().get_definition(),
-        NewsTool().get_definition(),
-        CurrencyTool().get_definition(),
-        CompatibilityTool().get_definition(),
-        DatePlannerTool().get_definition()
-    ]
-    
-    print(colored("\n🧠 Planner thinking...", "magenta"))
-    plan = planner.create_plan(user_query, tool_defs)
-    print(colored(f"📋 Plan created: {json.dumps(plan, indent=2)}", "blue"))
 
-    # 3. Execution
-    executor = ExecutorAgent()
-    # Ensure Executor has all tool classes mapped
-    executor.tools = {
-        "github_tool": GitHubTool(),
-        "weather_tool": WeatherTool(),
-        "news_tool": NewsTool(),
-        "currency_tool": CurrencyTool(),
-        "compatibility_tool": CompatibilityTool(),
-        "date_planner_tool": DatePlannerTool()
-    }
-    
-    print(colored("\n⚙️ Executor running...", "magenta"))
-    execution_results = executor.execute_plan(plan)
-    print(colored(f"📦 Raw Results: {json.dumps(execution_results, indent=2)}", "green"))
-
-    # 4. Verification
-    verifier = VerifierAgent()
-    print(colored("\n🔍 Verifier checking...", "magenta"))
-    final_output = verifier.verify_and_respond(user_query, execution_results)
-    
-    # Final Output with Safety Check
+    # The service bounds the query by QUERY_DEADLINE_S; stages and tool calls take slices of it
     try:
-        parsed_output = json.loads(final_output)
-        answer = parsed_output.get('final_answer', "The assistant encountered an error processing the results.")
-        print(colored("\n✅ FINAL ANSWER:", "cyan", attrs=['bold']))
-        print(answer)
-    except json.JSONDecodeError:
-        print(colored("\n❌ Error: The agent returned invalid JSON.", "red"))
-        print(final_output)
+        done = run_query(client, user_query)
+    except ServiceError as e:
+        print(colored(f"\n❌ {e}", "red"))
+        sys.exit(1)
+    if done is None:
+        print(colored("\n❌ The query service stopped before the query finished.", "red"))
+        sys.exit(1)
+    print_trace_summary(done)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
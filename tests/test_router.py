@@ -0,0 +1,25 @@
+from agents.router import IntentRouter
+
+
+def currency_args(query):
+    plan, confidence = IntentRouter().analyze(query)
+    assert plan is not None and [s["tool"] for s in plan["steps"]] == ["currency_tool"]
+    return plan["steps"][0]["args"], confidence
+
+
+def test_each_amount_goes_to_the_target_after_it():
+    args, confidence = currency_args("Convert 10 USD to INR and 20 EUR to GBP")
+    assert args == {"conversions": [
+        {"from_code": "USD", "to_code": "INR", "amount": 10},
+        {"from_code": "EUR", "to_code": "GBP", "amount": 20}
+    ]}
+    assert confidence == 1.0
+
+
+def test_amounts_share_a_single_target():
+    args, _ = currency_args("Convert 10 USD and 20 EUR to INR")
+    assert [(c["from_code"], c["to_code"]) for c in args["conversions"]] == [("USD", "INR"), ("EUR", "INR")]
+
+
+def test_unclear_pairing_goes_to_the_llm():
+    assert IntentRouter().analyze("Convert 10 USD to INR, 20 EUR") == (None, 0.0)
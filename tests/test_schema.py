@@ -0,0 +1,25 @@
+import pytest
+from tools.currency_tool import CurrencyTool
+
+
+@pytest.mark.parametrize("args", [
+    {},
+    {"from_code": "USD", "to_code": "INR"},
+    {"conversions": []}
+])
+def test_currency_args_need_a_whole_conversion(args):
+    checked, error = CurrencyTool().validate_args(args)
+    assert checked is None and error.startswith("Invalid args for currency_tool")
+
+
+def test_conversion_items_take_missing_parts_from_the_top_level():
+    args = {"from_code": "usd", "to_code": "INR", "conversions": [5, {"amount": "1,000", "to_code": "EUR"}]}
+    checked, error = CurrencyTool().validate_args(args)
+    assert error is None
+    assert checked["conversions"] == [5, {"amount": 1000, "to_code": "EUR"}]
+
+
+def test_referenced_amount_is_checked_after_substitution():
+    args = {"from_code": "USD", "to_code": "INR", "amount": "{{s1.result}}"}
+    checked, error = CurrencyTool().validate_args(args, lambda value: str(value).startswith("{{"))
+    assert error is None and checked == args
@@ -0,0 +1,35 @@
+from google.api_core import exceptions as api_exceptions
+from agents.planner import PlannerAgent
+from agents.service import QueryService
+from core.runtime import run_sync
+from llm.client import LLMClient
+from llm.context_cache import ContextCache
+from llm.scheduler import RequestScheduler
+
+
+class ThrottledModel:
+    async def generate_content_async(self, user_content, generation_config=None, stream=False):
+        raise api_exceptions.TooManyRequests("quota exceeded")
+
+
+class ThrottledLLMClient(LLMClient):
+    """Every call is a 429, and the scheduler gives up on the first one."""
+    scheduler = RequestScheduler(max_retries=0)
+    context_cache = ContextCache(enabled=False)
+
+    async def _amodel_for(self, system_instruction, span):
+        return ThrottledModel()
+
+
+def test_throttled_llm_ends_the_query_with_a_quota_error():
+    planner = PlannerAgent()
+    planner.llm = ThrottledLLMClient()
+    service = QueryService(planner=planner)
+
+    async def events():
+        job = await service.asubmit("Plan a full weekend itinerary in Goa with a budget breakdown")
+        return [event async for event in service.aevents(job)]
+
+    final = run_sync(events())[-1]
+    assert final["event"] == "error" and final["kind"] == "quota"
+    assert service.failed == 1
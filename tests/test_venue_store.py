@@ -0,0 +1,31 @@
+from tools.venue_store import VenueStore
+
+
+def tomtom_results(*names):
+    return [{"poi": {"name": name, "categories": ["cafe"]}, "address": {"freeformAddress": f"{name}, Indiranagar"},
+             "position": {"lat": 12.97 + n * 0.001, "lon": 77.64}} for n, name in enumerate(names)]
+
+
+def output(*names):
+    return [{"name": name, "category": "cafe", "address": f"{name}, Indiranagar", "distance": "0.5km"} for name in names]
+
+
+def test_bare_neighbourhood_then_city():
+    store = VenueStore()
+    store.ingest("Indiranagar", "Cafes", tomtom_results("A", "B", "C"), output("A", "B", "C"))
+    venues, stale = store.lookup("Indiranagar, Bangalore", "coffee")
+    assert [v["name"] for v in venues] == ["A", "B", "C"] and not stale
+
+
+def test_city_then_bare_neighbourhood():
+    store = VenueStore()
+    store.ingest("Indiranagar, Bangalore", "coffee", tomtom_results("A", "B", "C"), output("A", "B", "C"))
+    venues, _ = store.lookup("Indiranagar", "Cafes")
+    assert [v["name"] for v in venues] == ["A", "B", "C"]
+
+
+def test_ambiguous_neighbourhood_stays_apart():
+    store = VenueStore()
+    store.ingest("MG Road, Bangalore", "cafe", tomtom_results("A", "B", "C"), output("A", "B", "C"))
+    assert store.lookup("MG Road, Pune", "cafe") is None
+    assert store.lookup("MG Road", "cafe") is None
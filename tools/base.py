@@ -1,10 +1,313 @@
+import os
+import copy
+import time
+import asyncio
+import functools
 from abc import ABC, abstractmethod
+from collections import deque
+from core.runtime import get_worker_pool, run_sync
+from core.deadline import cap_timeout, current_deadline, deadline_scope
+from core.telemetry import tracer, quantile
+from .cache import ToolCache, make_key
+from .transport import HttpTransport
+
+# Pass as cache_ttl for pure tools whose output never goes stale
+CACHE_FOREVER = float("inf")
 
 class BaseTool(ABC):
+    # One pooled transport for the whole process, shared by all tools
+    transport = HttpTransport()
+    # (connect, read) timeouts in seconds; tools override to match their API
+    timeout = (3.05, 10)
+    # Result cache shared by all tools; cache_ttl of None disables caching
+    cache = ToolCache.from_env()
+    cache_ttl = None
+    # Tools whose output depends on exact spelling/case key on raw args instead
+    cache_normalize_args = True
+    # str.format templates over {**args, **output} used to answer without the
+    # verifier LLM; the first one whose fields are all present wins
+    answer_templates = ()
+    # Output fields the verifier never needs; dropped before prompting
+    compact_exclude = ()
+    # Stricter types for get_definition() parameters: parameter -> name of a
+    # type in tools/schema.py, so pydantic loads only when args are validated.
+    # The rest are typed from their descriptions
+    arg_types = {}
+    # Name of a function in tools/schema.py that checks the validated args as
+    # a whole, for rules no single parameter can express
+    args_check = None
+    # Args models per tool class, built on first validation
+    _args_models = {}
+    # Cacheable calls currently running on the shared loop, by cache key.
+    # An identical call made meanwhile (e.g. by another query in a batch)
+    # awaits the running one instead of hitting the API again.
+    _inflight = {}
+    # Async GETs still unanswered after this tool's recent `hedge_quantile`
+    # latency are sent a second time and the first response wins; GETs are
+    # idempotent, and the extra load is about 1 - hedge_quantile of calls.
+    # Tools on tight API quotas can set hedge = False.
+    hedge = os.getenv("HEDGE_REQUESTS", "1") != "0"
+    hedge_quantile = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+    # GETs to observe before the percentile is trusted
+    hedge_min_samples = 20
+    # Recent async GET latencies in seconds, per tool class
+    _latencies = {}
+
+    @property
+    def name(self):
+        return self.get_definition()["name"]
+
+    def http_get(self, url, **kwargs):
+        """GET through the shared keep-alive transport with this tool's timeouts."""
+        kwargs["timeout"] = cap_timeout(kwargs.get("timeout", self.timeout))
+        return self.transport.get(url, **kwargs)
+
+    async def ahttp_get(self, url, **kwargs):
+        """
+        Async GET through the shared transport; same timeouts as http_get,
+        capped at the query deadline. Hedged once it runs slower than usual.
+        """
+        kwargs["timeout"] = cap_timeout(kwargs.get("timeout", self.timeout))
+        delay = self._hedge_delay()
+        if delay is None:
+            return await self._atimed_get(url, kwargs)
+
+        attempts = [asyncio.ensure_future(self._atimed_get(url, kwargs))]
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                tracer.incr("requests_hedged")
+                tracer.current_span().set(hedged=True)
+                attempts.append(asyncio.ensure_future(self._atimed_get(url, kwargs)))
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is not attempts[0]:
+                            tracer.incr("requests_hedge_won")
+                        return attempt.result()
+            # Every attempt failed; report the original request's error
+            return attempts[0].result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _atimed_get(self, url, kwargs):
+        start = time.perf_counter()
+        response = await self.transport.aget(url, **kwargs)
+        window = self._latencies.get(type(self))
+        if window is None:
+            window = self._latencies.setdefault(type(self), deque(maxlen=200))
+        window.append(time.perf_counter() - start)
+        return response
+
+    def _hedge_delay(self):
+        """Seconds to wait before hedging a GET, or None to send it once."""
+        window = self._latencies.get(type(self))
+        if not self.hedge or window is None or len(window) < self.hedge_min_samples:
+            return None
+        delay = quantile(sorted(window), self.hedge_quantile)
+        deadline = current_deadline()
+        # A hedge that could not finish before the deadline only adds load
+        if deadline is not None and deadline.remaining() <= delay:
+            return None
+        return delay
+
+    def http_post(self, url, **kwargs):
+        """POST through the shared transport, e.g. for GraphQL or bulk endpoints."""
+        kwargs["timeout"] = cap_timeout(kwargs.get("timeout", self.timeout))
+        return self.transport.post(url, **kwargs)
+
+    async def ahttp_post(self, url, **kwargs):
+        # Never hedged: a POST is not assumed to be safe to send twice
+        kwargs["timeout"] = cap_timeout(kwargs.get("timeout", self.timeout))
+        return await self.transport.apost(url, **kwargs)
+
+    def args_model(self):
+        """Pydantic model of this tool's args (None if it declares no parameters), built once per class."""
+        if type(self) not in self._args_models:
+            # Imported on first use: pydantic is slow to import and the registry lists tools without it
+            from .schema import build_args_model
+            self._args_models[type(self)] = build_args_model(self)
+        return self._args_models[type(self)]
+
+    def validate_args(self, args, is_unresolved=None):
+        """
+        Checks and normalizes args against args_model() before any call is
+        made. Returns (args, None), or (None, error) when they cannot be repaired.
+        """
+        model = self.args_model()
+        if model is None:
+            return args, None
+        from .schema import check_args
+        return check_args(model, self.name, args, is_unresolved)
+
+    def _cache_lookup(self, kwargs):
+        if self.cache_ttl is None:
+            return None, False, None
+        key = make_key(self.name, kwargs, self.cache_normalize_args)
+        hit, value = self.cache.get(key)
+        tracer.current_span().set(cache_hit=hit)
+        return key, hit, value
+
+    def _cache_store(self, key, output):
+        # Errors are never cached so a transient failure can be retried
+        if key is not None and not (isinstance(output, dict) and "error" in output):
+            self.cache.set(key, output, self.cache_ttl)
+
+    def run(self, **kwargs):
+        """execute() behind the shared result cache."""
+        key, hit, value = self._cache_lookup(kwargs)
+        if hit:
+            return value
+        output = self.execute(**kwargs)
+        self._cache_store(key, output)
+        return output
+
+    async def arun(self, **kwargs):
+        """aexecute() behind the shared result cache, with identical in-flight calls merged."""
+        key, hit, value = self._cache_lookup(kwargs)
+        if hit:
+            return value
+        if key is None:
+            return await self.aexecute(**kwargs)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            tracer.current_span().set(deduplicated=True)
+            tracer.incr("tool_calls_deduplicated")
+            # Each caller gets its own copy, like a cache hit would
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(self._aexecute_and_store(key, kwargs))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded: a cancelled first caller must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _aexecute_and_store(self, key, kwargs):
+        # Other queries may join this call, so it must not run under the
+        # first caller's deadline or report into its tool span
+        with deadline_scope(None), tracer.span("api", self.name):
+            output = await self.aexecute(**kwargs)
+        self._cache_store(key, output)
+        return output
+
+    async def arun_batch(self, calls):
+        """
+        aexecute_batch() behind the shared result cache, for a list of kwargs
+        dicts; returns outputs in the same order. Cached calls are answered
+        from the cache, calls already in flight (or repeated within the batch)
+        share one result, and only the rest reach the tool, in a single batch.
+        """
+        outputs = [None] * len(calls)
+        # (cache key, indices answered by the call), one entry per call to make
+        groups, positions = [], {}
+        joined = {}
+        hits = merged = 0
+        for i, kwargs in enumerate(calls):
+            key = make_key(self.name, kwargs, self.cache_normalize_args) if self.cache_ttl is not None else None
+            if key is not None:
+                hit, value = self.cache.get(key)
+                if hit:
+                    outputs[i] = value
+                    hits += 1
+                    continue
+                if key in positions:
+                    groups[positions[key]][1].append(i)
+                    merged += 1
+                    continue
+                if key in self._inflight:
+                    joined[i] = self._inflight[key]
+                    merged += 1
+                    continue
+                positions[key] = len(groups)
+            groups.append((key, [i]))
+
+        span = tracer.current_span()
+        span.set(batch_size=len(calls), cache_hit=hits == len(calls))
+        if hits:
+            span.set(cache_hits=hits)
+        if merged:
+            span.set(deduplicated=merged)
+            tracer.incr("tool_calls_deduplicated", merged)
+
+        if groups:
+            batch = asyncio.ensure_future(self._aexecute_batch_and_store(calls, groups))
+            # Single calls arriving meanwhile join their slot of the batch
+            for n, (key, _) in enumerate(groups):
+                if key is not None:
+                    item = asyncio.ensure_future(self._batch_item(batch, n))
+                    self._inflight[key] = item
+                    item.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+            for (_, indices), output in zip(groups, await asyncio.shield(batch)):
+                outputs[indices[0]] = output
+                for i in indices[1:]:
+                    outputs[i] = copy.deepcopy(output)
+
+        for i, task in joined.items():
+            try:
+                outputs[i] = copy.deepcopy(await asyncio.shield(task))
+            except Exception as e:
+                outputs[i] = {"error": str(e)}
+        return outputs
+
+    async def _aexecute_batch_and_store(self, calls, groups):
+        # Joinable like _aexecute_and_store(), so likewise detached from the first caller
+        with deadline_scope(None), tracer.span("api", self.name, batch_size=len(groups)):
+            outputs = await self.aexecute_batch([calls[indices[0]] for _, indices in groups])
+        for (key, _), output in zip(groups, outputs):
+            self._cache_store(key, output)
+        return outputs
+
+    @staticmethod
+    async def _batch_item(batch, n):
+        return (await asyncio.shield(batch))[n]
+
+    def render_answer(self, args, output):
+        """
+        Returns a one-sentence answer for a successful output, or None.
+        Templates are tried in order; one that needs a field the output left
+        empty (None) is skipped, so "None" never shows up in an answer.
+        """
+        if not isinstance(output, dict):
+            return None
+        fields = {key: value for key, value in {**args, **output}.items() if value is not None}
+        for template in self.answer_templates:
+            try:
+                return template.format_map(fields)
+            except (KeyError, IndexError):
+                continue
+        return None
+
     @abstractmethod
     def execute(self, **kwargs):
         pass
 
+    async def aexecute(self, **kwargs):
+        """
+        Async entry point used by the executor.
+        Network tools override this with a native implementation; pure tools
+        inherit this default, which runs execute() on the shared worker pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_worker_pool(), functools.partial(self.execute, **kwargs))
+
+    def execute_batch(self, calls):
+        """Blocking wrapper around aexecute_batch() for sync callers."""
+        return run_sync(self.aexecute_batch(calls))
+
+    async def aexecute_batch(self, calls):
+        """
+        Runs several calls of this tool (one kwargs dict each) and returns
+        their outputs in the same order. The executor uses it when a plan has
+        more than one ready step for the tool. Tools whose API has a bulk
+        endpoint override it; this default makes the calls concurrently.
+        """
+        outputs = await asyncio.gather(*(self.aexecute(**kwargs) for kwargs in calls), return_exceptions=True)
+        return [{"error": str(o)} if isinstance(o, Exception) else o for o in outputs]
+
     @abstractmethod
     def get_definition(self):
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def normalize_args(value):
+    """
+    Canonical form of tool args for cache keys.
+    Strings are trimmed, case-folded and whitespace-collapsed, and integral
+    floats become ints, so "Delhi " / "delhi" and 10000 / 10000.0 share a key.
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize_args(v) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def make_key(tool_name, args, normalize=True):
+    if normalize:
+        args = normalize_args(args)
+    return tool_name + ":" + json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class SqliteBackend:
+    """On-disk store so cached results survive restarts and are shared across processes."""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._writes = 0
+
+    def get(self, key, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            if row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM tool_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None, None
+            self._conn.execute("UPDATE tool_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0], row[1]
+
+    def set(self, key, value, expires_at, now):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now)
+            )
+            self._writes += 1
+            # Trim in batches rather than on every write
+            if self._writes % 64 == 0:
+                self._conn.execute("DELETE FROM tool_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM tool_cache WHERE key IN ("
+                    "SELECT key FROM tool_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM tool_cache")
+            self._conn.commit()
+
+
+class ToolCache:
+    """
+    LRU cache of tool results keyed on tool name + normalized args.
+    A bounded in-memory tier sits in front of an optional SQLite backend.
+    Values are stored as JSON so callers never share mutable results.
+    """
+
+    def __init__(self, max_entries=1024, path=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (json_value, expires_at or None)
+        self._lock = threading.Lock()
+        self.backend = SqliteBackend(path, max_entries * 10) if path else None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        """TOOL_CACHE_SIZE bounds memory; TOOL_CACHE_PATH enables the SQLite backend."""
+        return cls(
+            max_entries=int(os.getenv("TOOL_CACHE_SIZE", "1024")),
+            path=os.getenv("TOOL_CACHE_PATH") or None
+        )
+
+    def get(self, key):
+        """Returns (hit, value)."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, json.loads(entry[0])
+            if entry is not None:
+                del self._entries[key]
+
+        if self.backend is not None:
+            value, expires_at = self.backend.get(key, now)
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self.hits += 1
+                return True, json.loads(value)
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def set(self, key, value, ttl):
+        """ttl in seconds; float('inf') keeps the entry until evicted."""
+        now = time.time()
+        expires_at = None if ttl == float("inf") else now + ttl
+        encoded = json.dumps(value)
+        with self._lock:
+            self._store(key, encoded, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, encoded, expires_at, now)
+
+    def _store(self, key, encoded, expires_at):
+        self._entries[key] = (encoded, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "backend": "sqlite" if self.backend is not None else "memory"
+            }
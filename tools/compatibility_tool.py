@@ -1,18 +1,31 @@
-from .base import BaseTool
+import os
+import threading
+from .base import BaseTool, CACHE_FOREVER
+from .interests import CandidatePool, InterestIndex, split_interests, score_for_overlap
 
 class CompatibilityTool(BaseTool):
+    # Pure function of its inputs, so results never go stale
+    cache_ttl = CACHE_FOREVER
+    # Output depends on exact case and ", " separators, so key on raw args
+    cache_normalize_args = False
+    # Interests may come as lists; they are joined into the documented string
+    arg_types = {"user_interests": "TextList", "match_interests": "TextList"}
+    # Saved InterestIndex of the candidate pool, memory-mapped on first use
+    index_path = os.getenv("COMPATIBILITY_INDEX_PATH")
+    _index = None
+    _index_lock = threading.Lock()
+
     def execute(self, user_interests, match_interests):
         """
         Simulates TrulyMadly's compatibility scoring logic.
         """
         # Common interests calculation
-        user_set = set(user_interests.lower().split(", "))
-        match_set = set(match_interests.lower().split(", "))
+        user_set = split_interests(user_interests)
+        match_set = split_interests(match_interests)
         common = list(user_set.intersection(match_set))
         
         # Calculate a mock score based on overlap
-        score = 60 + (len(common) * 8)
-        if score > 95: score = 98
+        score = score_for_overlap(len(common))
 
         return {
             "compatibility_score": f"{score}%",
@@ -21,6 +34,43 @@ class CompatibilityTool(BaseTool):
             "date_recommendation": "Based on your shared love for " + (common[0] if common else "exploration")
         }
 
+    def candidate_index(self):
+        """The shared candidate InterestIndex: loaded from index_path if it exists, else empty."""
+        if CompatibilityTool._index is None:
+            with self._index_lock:
+                if CompatibilityTool._index is None:
+                    if self.index_path and os.path.exists(self.index_path):
+                        CompatibilityTool._index = InterestIndex.open(self.index_path)
+                    else:
+                        CompatibilityTool._index = InterestIndex()
+        return CompatibilityTool._index
+
+    def rank_candidates(self, user_interests, candidates=None, top_k=10):
+        """
+        Scores one user against many candidates and returns the top_k,
+        best first, each as {"candidate_id", "compatibility_score", "common_interests"}.
+        `candidates` is a CandidatePool or InterestIndex (reuse them across
+        users), a mapping / iterable of (candidate_id, interests string), or
+        None for the shared candidate index. Scores match execute().
+        """
+        if candidates is None:
+            candidates = self.candidate_index()
+        elif not isinstance(candidates, (CandidatePool, InterestIndex)):
+            candidates = CandidatePool.from_candidates(candidates)
+        return candidates.top_k(user_interests, top_k)
+
+    def render_answer(self, args, output):
+        common = output["common_interests"]
+        shared = f"You share {', '.join(common)}." if common else "You don't share any listed interests yet."
+        return (
+            f"Your compatibility score is {output['compatibility_score']}. {shared} "
+            f"Match vibe: {output['match_vibe']}. {output['date_recommendation']}."
+        )
+
+    async def aexecute(self, user_interests, match_interests):
+        # Pure in-memory scoring: cheaper to run inline than on the worker pool
+        return self.execute(user_interests, match_interests)
+
     def get_definition(self):
         return {
             "name": "compatibility_tool",
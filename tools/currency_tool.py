@@ -1,31 +1,186 @@
-import requests
 import os
+import asyncio
+import threading
+from decimal import Decimal
 from .base import BaseTool
+from .rates import RateBook, RateTable, to_decimal, format_decimal, AMOUNT_PLACES, RATE_PLACES
+
+INVALID_PAIR = "Invalid currency codes or API error"
 
 class CurrencyTool(BaseTool):
-    def execute(self, from_code, to_code, amount):
+    timeout = (3.05, 5)
+    base_url = os.getenv("EXCHANGE_RATE_BASE_URL", "https://v6.exchangerate-api.com")
+    # ExchangeRate-API refreshes its rates at most hourly
+    cache_ttl = 60 * 60
+    arg_types = {
+        "from_code": "CurrencyCode",
+        "to_code": "CurrencyCode",
+        "amount": "Amount",
+        "conversions": "ConversionList"
+    }
+    args_check = "complete_conversions"
+    answer_templates = (
+        "{conversion} (rate: {rate}).",
+        "{summary}."
+    )
+    # Fetch whole latest/{base} tables and price every pair locally from them;
+    # CURRENCY_RATE_TABLES=0 goes back to one /pair call per conversion
+    rate_tables = os.getenv("CURRENCY_RATE_TABLES", "1") != "0"
+    rates = RateBook(ttl=cache_ttl)
+    # Table fetches in flight: base -> asyncio task (async) / one lock (sync)
+    _table_fetches = {}
+    _table_lock = threading.Lock()
+
+    def _build_request(self, from_code, to_code, amount):
+        api_key = os.getenv("EXCHANGE_RATE_KEY")
+        return f"{self.base_url}/v6/{api_key}/pair/{from_code}/{to_code}/{amount}"
+
+    def _build_table_request(self, base):
         api_key = os.getenv("EXCHANGE_RATE_KEY")
-        url = f"https://v6.exchangerate-api.com/v6/{api_key}/pair/{from_code}/{to_code}/{amount}"
-        
+        return f"{self.base_url}/v6/{api_key}/latest/{base}"
+
+    def _parse_response(self, response, from_code, to_code, amount):
+        # Decimals straight from the JSON text, so no binary float rounding creeps in
+        data = response.json(parse_float=Decimal)
+        if data.get("result") == "success":
+            return self._quote(from_code, to_code, amount, to_decimal(data["conversion_rate"]))
+        return self._quote(from_code, to_code, amount, None)
+
+    def _parse_table(self, response):
+        data = response.json(parse_float=Decimal)
+        if data.get("result") == "success":
+            return self.rates.put(RateTable(data["base_code"], data["conversion_rates"]))
+        return None
+
+    # --- requests ---
+    def _requests(self, from_code, to_code, amount, conversions):
+        """
+        (from, to, amount) triples to price. A single conversion is a batch of one;
+        `conversions` items are {"from_code", "to_code", "amount"} dicts (missing
+        keys default to the top-level args) or bare amounts.
+        """
+        if conversions is None:
+            items = [(from_code, to_code, amount)]
+        else:
+            items = [
+                (c.get("from_code", from_code), c.get("to_code", to_code), c.get("amount", amount))
+                if isinstance(c, dict) else (from_code, to_code, c)
+                for c in conversions
+            ]
+        return [(str(f).strip().upper(), str(t).strip().upper(), a) for f, t, a in items]
+
+    def _quote(self, from_code, to_code, amount, rate):
+        if rate is None:
+            return {"from_code": from_code, "to_code": to_code, "amount": amount, "error": INVALID_PAIR}
+        try:
+            value = to_decimal(amount)
+        except ValueError as e:
+            return {"from_code": from_code, "to_code": to_code, "amount": amount, "error": str(e)}
+        return {"from_code": from_code, "to_code": to_code, "amount": value, "rate": rate, "result": value * rate}
+
+    def _price(self, table, from_code, to_code, amount):
+        if table is None or not table.covers(from_code, to_code):
+            return self._quote(from_code, to_code, amount, None)
+        return self._quote(from_code, to_code, amount, table.rate(from_code, to_code))
+
+    # --- rate tables ---
+    def _table_for(self, from_code, to_code):
+        table = self.rates.find(from_code, to_code)
+        if table is None:
+            with self._table_lock:
+                table = self.rates.find(from_code, to_code)
+                if table is None:
+                    self._parse_table(self.http_get(self._build_table_request(from_code)))
+                    table = self.rates.find(from_code, to_code)
+        return table
+
+    async def _afetch_table(self, base):
+        return self._parse_table(await self.ahttp_get(self._build_table_request(base)))
+
+    async def _atable_for(self, from_code, to_code):
+        table = self.rates.find(from_code, to_code)
+        if table is not None:
+            return table
+        # Concurrent misses on one base share a single fetch
+        task = self._table_fetches.get(from_code)
+        if task is None:
+            task = asyncio.ensure_future(self._afetch_table(from_code))
+            self._table_fetches[from_code] = task
+            task.add_done_callback(lambda _: self._table_fetches.pop(from_code, None))
+        await asyncio.shield(task)
+        return self.rates.find(from_code, to_code)
+
+    # --- output ---
+    def _format(self, quotes, bulk):
+        if not bulk:
+            quote = quotes[0]
+            if "error" in quote:
+                return {"error": quote["error"]}
+            return {
+                "conversion": f"{format_decimal(quote['amount'], AMOUNT_PLACES)} {quote['from_code']} = "
+                              f"{format_decimal(quote['result'], AMOUNT_PLACES)} {quote['to_code']}",
+                "rate": float(format_decimal(quote["rate"], RATE_PLACES))
+            }
+
+        conversions, totals = [], {}
+        for quote in quotes:
+            if "error" in quote:
+                conversions.append({**quote, "amount": str(quote["amount"])})
+                continue
+            totals[quote["to_code"]] = totals.get(quote["to_code"], Decimal(0)) + quote["result"]
+            conversions.append({
+                "from_code": quote["from_code"],
+                "to_code": quote["to_code"],
+                "amount": format_decimal(quote["amount"], AMOUNT_PLACES),
+                "result": format_decimal(quote["result"], AMOUNT_PLACES),
+                "rate": format_decimal(quote["rate"], RATE_PLACES)
+            })
+        ok = [c for c in conversions if "error" not in c]
+        if not ok:
+            return {"error": INVALID_PAIR}
+        summary = "; ".join(f"{c['amount']} {c['from_code']} = {c['result']} {c['to_code']}" for c in ok)
+        total_text = ", ".join(f"{format_decimal(v, AMOUNT_PLACES)} {code}" for code, v in totals.items())
+        return {
+            "conversions": conversions,
+            "totals": {code: format_decimal(v, AMOUNT_PLACES) for code, v in totals.items()},
+            "summary": f"{summary} (total: {total_text})" if len(ok) > 1 else summary
+        }
+
+    def execute(self, from_code=None, to_code=None, amount=None, conversions=None):
+        try:
+            quotes = []
+            for f, t, a in self._requests(from_code, to_code, amount, conversions):
+                if self.rate_tables:
+                    quotes.append(self._price(self._table_for(f, t), f, t, a))
+                else:
+                    quotes.append(self._parse_response(self.http_get(self._build_request(f, t, a)), f, t, a))
+            return self._format(quotes, conversions is not None)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aexecute(self, from_code=None, to_code=None, amount=None, conversions=None):
+        requests = self._requests(from_code, to_code, amount, conversions)
         try:
-            response = requests.get(url)
-            data = response.json()
-            if data.get("result") == "success":
-                return {
-                    "conversion": f"{amount} {from_code} = {data['conversion_result']} {to_code}",
-                    "rate": data["conversion_rate"]
-                }
-            return {"error": "Invalid currency codes or API error"}
+            if self.rate_tables:
+                # Sequential on purpose: the first table usually covers every later pair
+                quotes = [self._price(await self._atable_for(f, t), f, t, a) for f, t, a in requests]
+            else:
+                responses = await asyncio.gather(*(self.ahttp_get(self._build_request(f, t, a)) for f, t, a in requests))
+                quotes = [self._parse_response(r, f, t, a) for r, (f, t, a) in zip(responses, requests)]
+            return self._format(quotes, conversions is not None)
         except Exception as e:
             return {"error": str(e)}
 
     def get_definition(self):
         return {
             "name": "currency_tool",
-            "description": "Convert an amount from one currency to another (e.g., USD to INR).",
+            "description": "Convert an amount from one currency to another (e.g., USD to INR). "
+                           "For several figures use one call with 'conversions'.",
             "parameters": {
                 "from_code": "string (3-letter code)",
                 "to_code": "string (3-letter code)",
-                "amount": "number"
+                "amount": "number",
+                "conversions": "optional list of {from_code, to_code, amount} (or bare amounts "
+                               "using the top-level codes); returns each result plus totals"
             }
-        }
\ No newline at end of file
+        }
@@ -1,49 +1,150 @@
-import requests
 import os
+import time
+from core.runtime import spawn
+from core.deadline import deadline_scope
+from core.telemetry import tracer
 from .base import BaseTool
+from .venue_store import VenueStore, normalize_category
 
 class DatePlannerTool(BaseTool):
-    def execute(self, location, category):
+    timeout = (3.05, 8)
+    base_url = os.getenv("TOMTOM_BASE_URL", "https://api.tomtom.com")
+    # Venue listings barely change within a day
+    cache_ttl = 24 * 60 * 60
+    # Every venue TomTom has returned, so synonymous or nearby searches
+    # ("Cafes in Indiranagar" / "coffee in Indiranagar, Bangalore") stay local
+    venues = VenueStore.from_env()
+    result_limit = 3
+    # Locations searched this often get these categories fetched ahead of time
+    prefetch_min_hits = int(os.getenv("VENUE_PREFETCH_MIN_HITS", "3"))
+    prefetch_categories = ("cafe", "restaurant", "bar", "dessert")
+    # (location key, category) pairs with a background fetch in flight
+    _refreshing = set()
+
+    def _build_request(self, location, category):
         api_key = os.getenv("TOMTOM_API_KEY")
         if not api_key:
-            return {"error": "Missing TomTom API Key in .env"}
+            return None, {"error": "Missing TomTom API Key in .env"}
 
         # Use the Fuzzy Search endpoint
         query = f"{category} in {location}"
-        url = f"https://api.tomtom.com/search/2/search/{query}.json"
+        url = f"{self.base_url}/search/2/search/{query}.json"
         
         params = {
             "key": api_key,
-            "limit": 3,
+            "limit": self.result_limit,
             "countrySet": "IN"
         }
+        return (url, params), None
+
+    def _parse_response(self, response):
+        data = response.json()
+        
+        if response.status_code == 200 and data.get('results'):
+            top_spots = []
+            for place in data['results']:
+                poi = place.get("poi", {})
+                addr = place.get("address", {})
+                
+                # FIX: Safely handle the distance field
+                raw_dist = place.get('dist')
+                dist_str = f"{raw_dist/1000:.1f}km" if raw_dist is not None else "Location found"
+                
+                top_spots.append({
+                    "name": poi.get("name", "Unknown Venue"),
+                    "category": poi.get("categories", ["Venue"])[0],
+                    "address": addr.get("freeformAddress", "Address not available"),
+                    "distance": dist_str
+                })
+            return {"date_venues": top_spots}
+        else:
+            return {"error": "No venues found. Try a different category or be more specific with the city."}
+
+    def _store_response(self, response, location, category):
+        output = self._parse_response(response)
+        if "error" not in output:
+            self.venues.ingest(location, category, response.json().get("results", []), output["date_venues"])
+        return output
+
+    def _local_answer(self, location, category):
+        """Answers from the venue store when it can; stale answers are refreshed in the background."""
+        found = self.venues.lookup(location, category, self.result_limit)
+        self._maybe_prefetch(location, skip=normalize_category(category))
+        if found is None:
+            return None
+        venues, stale = found
+        tracer.current_span().set(venue_store_hit=True, venue_store_stale=stale)
+        if stale:
+            self._in_background(location, category)
+        return {"date_venues": venues}
+
+    def _in_background(self, location, category):
+        key = (self.venues.location_key(location), normalize_category(category))
+        if key not in self._refreshing:
+            self._refreshing.add(key)
+            spawn(self._arefresh(key, location, category))
+
+    async def _arefresh(self, key, location, category):
+        # spawn() copied the query's context; the refresh outlives that query,
+        # so it gets no deadline and a trace of its own
+        try:
+            with tracer.trace(), deadline_scope(None), tracer.span("api", self.name, background=True):
+                await self._afetch(location, category)
+        finally:
+            self._refreshing.discard(key)
+
+    def _maybe_prefetch(self, location, skip=None):
+        hits, prefetched_at = self.venues.location_stats(location)
+        if hits < self.prefetch_min_hits:
+            return
+        if prefetched_at is not None and time.time() - prefetched_at < self.venues.stale_after:
+            return
+        self.venues.mark_prefetched(location)
+        known = self.venues.known_categories(location)
+        for category in self.prefetch_categories:
+            norm_category = normalize_category(category)
+            if norm_category == skip:
+                continue  # The caller is fetching it right now
+            fetched_at = known.get(norm_category)
+            if fetched_at is None or time.time() - fetched_at > self.venues.stale_after:
+                self._in_background(location, category)
+
+    def prefetch_popular(self, limit=10):
+        """Refreshes common categories for the most searched locations in the background, e.g. from a scheduled job."""
+        for location, _, _ in self.venues.popular_locations(self.prefetch_min_hits, limit):
+            self._maybe_prefetch(location)
+
+    def execute(self, location, category):
+        local = self._local_answer(location, category)
+        if local is not None:
+            return local
+        request, error = self._build_request(location, category)
+        if error:
+            return error
+        url, params = request
+
+        try:
+            return self._store_response(self.http_get(url, params=params), location, category)
+        except Exception as e:
+            return {"error": f"TomTom API failed: {str(e)}"}
+
+    async def _afetch(self, location, category):
+        request, error = self._build_request(location, category)
+        if error:
+            return error
+        url, params = request
 
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if response.status_code == 200 and data.get('results'):
-                top_spots = []
-                for place in data['results']:
-                    poi = place.get("poi", {})
-                    addr = place.get("address", {})
-                    
-                    # FIX: Safely handle the distance field
-                    raw_dist = place.get('dist')
-                    dist_str = f"{raw_dist/1000:.1f}km" if raw_dist is not None else "Location found"
-                    
-                    top_spots.append({
-                        "name": poi.get("name", "Unknown Venue"),
-                        "category": poi.get("categories", ["Venue"])[0],
-                        "address": addr.get("freeformAddress", "Address not available"),
-                        "distance": dist_str
-                    })
-                return {"date_venues": top_spots}
-            else:
-                return {"error": "No venues found. Try a different category or be more specific with the city."}
+            return self._store_response(await self.ahttp_get(url, params=params), location, category)
         except Exception as e:
             return {"error": f"TomTom API failed: {str(e)}"}
 
+    async def aexecute(self, location, category):
+        local = self._local_answer(location, category)
+        if local is not None:
+            return local
+        return await self._afetch(location, category)
+
     def get_definition(self):
         return {
             "name": "date_planner_tool",
@@ -52,4 +153,4 @@ class DatePlannerTool(BaseTool):
                 "location": "string (e.g., 'Indiranagar, Bangalore')",
                 "category": "string (e.g., 'Coffee' or 'Pizza')"
             }
-        }
\ No newline at end of file
+        }
@@ -1,24 +1,83 @@
-import requests
+import os
 from .base import BaseTool
 
 class GitHubTool(BaseTool):
+    timeout = (3.05, 10)
+    base_url = os.getenv("GITHUB_API_BASE_URL", "https://api.github.com")
+    cache_ttl = 10 * 60
+    arg_types = {"repo_name": "RepoName"}
+    answer_templates = (
+        "{name} has {stars} stars on GitHub: {description} ({url})",
+        # Repos without a description
+        "{name} has {stars} stars on GitHub ({url})",
+    )
+
+    # Fields the GraphQL batch asks for; named like the REST answer's
+    GRAPHQL_FIELDS = "name stargazers_count: stargazerCount description html_url: url"
+
+    def _parse_response(self, response, repo_name):
+        if response.status_code == 200:
+            return self._format(response.json(), repo_name)
+        return self._format(None, repo_name)
+
+    def _format(self, data, repo_name):
+        if not data:
+            return {"error": f"Repo '{repo_name}' not found or API error."}
+        return {
+            "name": data.get("name"),
+            "stars": data.get("stargazers_count"),
+            "description": data.get("description"),
+            "url": data.get("html_url")
+        }
+
+    def _build_graphql(self, repo_names):
+        """One query with an aliased repository() lookup per repo."""
+        params, fields, variables = [], [], {}
+        for i, repo_name in enumerate(repo_names):
+            owner, name = repo_name.split("/")
+            params.append(f"$o{i}: String!, $n{i}: String!")
+            fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ {self.GRAPHQL_FIELDS} }}")
+            variables[f"o{i}"], variables[f"n{i}"] = owner, name
+        return f"query({', '.join(params)}) {{ {' '.join(fields)} }}", variables
+
     def execute(self, repo_name):
         """Fetches repo details from GitHub."""
-        url = f"https://api.github.com/repos/{repo_name}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "name": data.get("name"),
-                "stars": data.get("stargazers_count"),
-                "description": data.get("description"),
-                "url": data.get("html_url")
-            }
-        return {"error": f"Repo '{repo_name}' not found or API error."}
+        url = f"{self.base_url}/repos/{repo_name}"
+        return self._parse_response(self.http_get(url), repo_name)
+
+    async def aexecute(self, repo_name):
+        url = f"{self.base_url}/repos/{repo_name}"
+        return self._parse_response(await self.ahttp_get(url), repo_name)
+
+    async def aexecute_batch(self, calls):
+        """
+        Several repos in one GraphQL request. GraphQL needs a token, so
+        without GITHUB_TOKEN (or if the request fails) this falls back to
+        concurrent REST calls.
+        """
+        token = os.getenv("GITHUB_TOKEN")
+        repo_names = [c.get("repo_name") for c in calls]
+        if not token or not all(isinstance(r, str) and r.count("/") == 1 for r in repo_names):
+            return await super().aexecute_batch(calls)
+
+        query, variables = self._build_graphql(repo_names)
+        try:
+            response = await self.ahttp_post(
+                f"{self.base_url}/graphql",
+                json={"query": query, "variables": variables},
+                headers={"Authorization": f"bearer {token}"}
+            )
+            data = response.json().get("data") if response.status_code == 200 else None
+        except Exception:
+            data = None
+        if data is None:
+            return await super().aexecute_batch(calls)
+        # Missing repos come back as null (with an entry in "errors")
+        return [self._format(data.get(f"r{i}"), r) for i, r in enumerate(repo_names)]
 
     def get_definition(self):
         return {
             "name": "github_tool",
             "description": "Get details about a GitHub repository (stars, description).",
             "parameters": {"repo_name": "string (format: owner/repo)"}
-        }
\ No newline at end of file
+        }
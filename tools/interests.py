@@ -0,0 +1,454 @@
+"""
+Bulk compatibility scoring: one user against many candidates.
+
+CandidatePool interns interests into a shared vocabulary and stores each
+candidate as a bitset over it (rows of uint64 words), so scoring N
+candidates is one vectorized bit test per interest of the user instead of
+N set intersections.
+
+InterestIndex is an inverted index (interest -> candidates listing it)
+that only ever touches candidates sharing at least one interest, and
+persists to a single file that is memory-mapped on open.
+
+Scores follow CompatibilityTool.execute exactly.
+"""
+import os
+import json
+import threading
+
+BITS_PER_WORD = 64
+# File signature and format version of a saved InterestIndex
+INDEX_MAGIC = b"IIDX\x00\x00\x00\x01"
+# Merge posting lists by counting into a pool-sized array once they hold
+# more than 1/DENSE_MERGE_RATIO of the pool; below that, sort them
+DENSE_MERGE_RATIO = 8
+
+
+def split_interests(text):
+    """Same tokenization as CompatibilityTool: lowercase, split on ", "."""
+    return set(text.lower().split(", "))
+
+
+def score_for_overlap(common_count):
+    """The compatibility formula: 60 plus 8 per shared interest, capped at 98."""
+    score = 60 + (common_count * 8)
+    if score > 95: score = 98
+    return score
+
+
+def _np():
+    # NumPy is only needed for bulk scoring, so the tool itself imports fast
+    import numpy
+    return numpy
+
+
+class InterestVocabulary:
+    """Interest string <-> dense integer id, shared by every candidate in a pool."""
+
+    def __init__(self, terms=()):
+        self.terms = []
+        self.ids = {}
+        for term in terms:
+            self.intern(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def intern(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def lookup(self, terms):
+        """Ids of the known terms; unknown terms cannot be shared with anyone."""
+        return sorted(self.ids[t] for t in terms if t in self.ids)
+
+
+class CandidatePool:
+    """
+    Candidate interest sets packed as bitsets for batched intersection counts.
+    Add candidates with add()/extend(); the bit matrix is (re)built lazily
+    on the first query after a change.
+    """
+
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary or InterestVocabulary()
+        self.candidate_ids = []
+        self._rows = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_candidates(cls, candidates):
+        """`candidates` is a mapping or iterable of (candidate_id, interests string)."""
+        pool = cls()
+        pool.extend(candidates.items() if hasattr(candidates, "items") else candidates)
+        return pool
+
+    def __len__(self):
+        return len(self.candidate_ids)
+
+    def add(self, candidate_id, interests):
+        self.extend([(candidate_id, interests)])
+
+    def extend(self, candidates):
+        ids, rows = [], []
+        known, intern = self.vocabulary.ids, self.vocabulary.intern
+        for candidate_id, interests in candidates:
+            ids.append(candidate_id)
+            # split_interests() already dedupes, so each row holds distinct ids
+            rows.append([known[t] if t in known else intern(t) for t in split_interests(interests)])
+        with self._lock:
+            self.candidate_ids.extend(ids)
+            self._rows.extend(rows)
+            self._matrix = None
+
+    def _bits(self):
+        with self._lock:
+            if self._matrix is not None:
+                return self._matrix
+            np = _np()
+            words = max(1, -(-len(self.vocabulary) // BITS_PER_WORD))
+            matrix = np.zeros((len(self._rows), words), dtype=np.uint64)
+            lengths = np.fromiter((len(r) for r in self._rows), dtype=np.int64, count=len(self._rows))
+            term_ids = np.fromiter((t for r in self._rows for t in r), dtype=np.int64, count=int(lengths.sum()))
+            row_index = np.repeat(np.arange(len(self._rows)), lengths)
+            bits = np.left_shift(np.uint64(1), (term_ids % BITS_PER_WORD).astype(np.uint64))
+            np.bitwise_or.at(matrix, (row_index, term_ids // BITS_PER_WORD), bits)
+            self._matrix = matrix
+            return matrix
+
+    def overlap_counts(self, user_interests):
+        """Number of interests each candidate shares with the user, as an int array."""
+        np = _np()
+        matrix = self._bits()
+        counts = np.zeros(len(matrix), dtype=np.int32)
+        for term_id in self.vocabulary.lookup(split_interests(user_interests)):
+            word, bit = divmod(term_id, BITS_PER_WORD)
+            counts += ((matrix[:, word] >> np.uint64(bit)) & np.uint64(1)).astype(np.int32)
+        return counts
+
+    def scores(self, user_interests):
+        """Compatibility score of every candidate, in pool order."""
+        np = _np()
+        scores = 60 + self.overlap_counts(user_interests) * 8
+        return np.where(scores > 95, 98, scores)
+
+    def common_interests(self, index, user_interests):
+        row = set(self._rows[index])
+        return sorted(t for t in split_interests(user_interests) if self.vocabulary.ids.get(t) in row)
+
+    def top_k(self, user_interests, k=10):
+        """
+        The k best candidates, highest score first and ties in pool order,
+        each with its score and the interests it shares with the user.
+        """
+        np = _np()
+        scores = self.scores(user_interests)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        # One int64 key orders by score (desc) then pool position (asc),
+        # so the partition below is deterministic even with many ties
+        keys = (98 - scores).astype(np.int64) * len(scores) + np.arange(len(scores))
+        if k < len(keys):
+            # Partition first so only k entries get sorted
+            best = np.argpartition(keys, k - 1)[:k]
+        else:
+            best = np.arange(len(keys))
+        best = best[np.argsort(keys[best])].tolist()
+        return [
+            {
+                "candidate_id": self.candidate_ids[i],
+                "compatibility_score": f"{int(scores[i])}%",
+                "common_interests": self.common_interests(i, user_interests)
+            }
+            for i in best
+        ]
+
+
+class InterestIndex:
+    """
+    Inverted index from interest to the sorted ids of candidates listing it.
+
+    Postings of a saved index are memory-mapped, so open() costs only the
+    header. add()/remove() go to an in-memory delta and tombstones that
+    queries merge in; save() compacts everything into a fresh file.
+    Internal doc ids follow insertion order, which is also the tie-break.
+    """
+
+    def __init__(self):
+        np = _np()
+        self.vocabulary = InterestVocabulary()
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._base_ids = np.zeros(0, dtype=np.int64)
+        # With mixed id types the base ids are stored as text; 1 marks those that were ints
+        self._base_int_ids = None
+        self._new_ids = []
+        self._delta = {}
+        self._dead = set()
+        self._doc_of = None
+        self._lock = threading.RLock()
+
+    # --- building ---
+    @classmethod
+    def build(cls, candidates):
+        """
+        Bulk-builds an index from a mapping or iterable of (candidate_id, interests).
+        Much faster than add() per candidate; ids are assumed unique.
+        """
+        np = _np()
+        index = cls()
+        known, intern = index.vocabulary.ids, index.vocabulary.intern
+        ids, terms, lengths = [], [], []
+        items = candidates.items() if hasattr(candidates, "items") else candidates
+        for candidate_id, interests in items:
+            row = [known[t] if t in known else intern(t) for t in split_interests(interests)]
+            ids.append(candidate_id)
+            terms.extend(row)
+            lengths.append(len(row))
+        terms = np.asarray(terms, dtype=np.int64)
+        docs = np.repeat(np.arange(len(ids), dtype=np.int32), lengths)
+        index._set_base(terms, docs, *_id_array(ids))
+        return index
+
+    def _set_base(self, terms, docs, ids, int_ids=None):
+        """Installs (term, doc) pairs as the base postings, grouped by term with docs ascending."""
+        np = _np()
+        order = np.lexsort((docs, terms))
+        counts = np.bincount(terms, minlength=len(self.vocabulary))
+        self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self._postings = docs[order].astype(np.int32)
+        self._base_ids = ids
+        self._base_int_ids = int_ids
+        self._new_ids = []
+        self._delta = {}
+        self._dead = set()
+        self._doc_of = None
+
+    def __len__(self):
+        return len(self._base_ids) + len(self._new_ids) - len(self._dead)
+
+    def _doc_count(self):
+        return len(self._base_ids) + len(self._new_ids)
+
+    def _candidate_id(self, doc):
+        if doc < len(self._base_ids):
+            value = self._base_ids[doc]
+            value = value.item() if hasattr(value, "item") else value
+            return int(value) if self._base_int_ids is not None and self._base_int_ids[doc] else value
+        return self._new_ids[doc - len(self._base_ids)]
+
+    def _base_id_list(self):
+        """The base candidate ids as Python values, in doc order and with their original types."""
+        ids = self._base_ids.tolist()
+        if self._base_int_ids is not None:
+            ids = [int(i) if is_int else i for i, is_int in zip(ids, self._base_int_ids.tolist())]
+        return ids
+
+    def _docs_by_candidate(self):
+        # Only needed to update or remove profiles, so built on first use
+        if self._doc_of is None:
+            ids = self._base_id_list() + self._new_ids
+            doc_of = dict(zip(ids, range(len(ids))))
+            for doc in self._dead:
+                if doc_of.get(ids[doc]) == doc:
+                    del doc_of[ids[doc]]
+            self._doc_of = doc_of
+        return self._doc_of
+
+    def add(self, candidate_id, interests):
+        """Adds a profile, replacing any earlier profile with the same id."""
+        with self._lock:
+            doc_of = self._docs_by_candidate()
+            if candidate_id in doc_of:
+                self._dead.add(doc_of[candidate_id])
+            doc = self._doc_count()
+            self._new_ids.append(candidate_id)
+            doc_of[candidate_id] = doc
+            for term in split_interests(interests):
+                self._delta.setdefault(self.vocabulary.intern(term), []).append(doc)
+
+    def remove(self, candidate_id):
+        """Drops a profile; returns False if it was not indexed."""
+        with self._lock:
+            doc = self._docs_by_candidate().pop(candidate_id, None)
+            if doc is None:
+                return False
+            self._dead.add(doc)
+            return True
+
+    # --- querying ---
+    def _posting(self, term_id):
+        np = _np()
+        if term_id + 1 < len(self._offsets):
+            base = self._postings[self._offsets[term_id]:self._offsets[term_id + 1]]
+        else:
+            base = self._postings[:0]
+        delta = self._delta.get(term_id)
+        if delta:
+            return np.concatenate((base, np.asarray(delta, dtype=np.int32)))
+        return base
+
+    def overlaps(self, user_interests):
+        """
+        (doc ids, shared interest counts) for every live candidate sharing at
+        least one interest with the user, found by merging their posting lists.
+        """
+        np = _np()
+        with self._lock:
+            postings = [self._posting(t) for t in self.vocabulary.lookup(split_interests(user_interests))]
+            dead = np.fromiter(self._dead, dtype=np.int32, count=len(self._dead))
+        if not postings:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        merged = np.concatenate(postings)
+        if len(merged) * DENSE_MERGE_RATIO > self._doc_count():
+            # Posting lists cover much of the pool: counting beats sorting
+            counts = np.bincount(merged, minlength=self._doc_count())
+            docs = np.flatnonzero(counts).astype(np.int32)
+            counts = counts[docs]
+        else:
+            docs, counts = np.unique(merged, return_counts=True)
+        if len(dead):
+            live = ~np.isin(docs, dead)
+            docs, counts = docs[live], counts[live]
+        return docs, counts
+
+    def top_k(self, user_interests, k=10):
+        """
+        The k candidates sharing the most interests with the user, most first
+        and ties in insertion order, with scores as CompatibilityTool.execute.
+        Candidates sharing nothing are never considered.
+        """
+        np = _np()
+        docs, counts = self.overlaps(user_interests)
+        k = min(k, len(docs))
+        if k <= 0:
+            return []
+        keys = (counts.max() - counts).astype(np.int64) * self._doc_count() + docs
+        best = np.argpartition(keys, k - 1)[:k] if k < len(keys) else np.arange(len(keys))
+        best = best[np.argsort(keys[best])]
+
+        user_terms = sorted(split_interests(user_interests))
+        best_docs = docs[best]
+        with self._lock:
+            membership = {
+                term: _contains_sorted(self._posting(self.vocabulary.ids[term]), best_docs)
+                for term in user_terms if term in self.vocabulary.ids
+            }
+            return [
+                {
+                    "candidate_id": self._candidate_id(int(docs[i])),
+                    "compatibility_score": f"{score_for_overlap(int(counts[i]))}%",
+                    "common_interests": [term for term in user_terms if term in membership and membership[term][rank]]
+                }
+                for rank, i in enumerate(best.tolist())
+            ]
+
+    # --- persistence ---
+    def _compacted(self):
+        """Base and delta postings merged, dead profiles dropped and docs renumbered."""
+        np = _np()
+        base_terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int64), np.diff(self._offsets))
+        delta_terms = [np.full(len(d), t, dtype=np.int64) for t, d in self._delta.items()]
+        terms = np.concatenate([base_terms] + delta_terms)
+        docs = np.concatenate(
+            [np.asarray(self._postings, dtype=np.int32)] + [np.asarray(d, dtype=np.int32) for d in self._delta.values()]
+        )
+        alive = np.ones(self._doc_count(), dtype=bool)
+        alive[list(self._dead)] = False
+        keep = alive[docs]
+        remap = np.cumsum(alive, dtype=np.int64) - 1
+        if not (self._dead or self._new_ids):
+            return terms[keep], remap[docs[keep]].astype(np.int32), self._base_ids, self._base_int_ids
+        ids = self._base_id_list() + self._new_ids
+        ids = [ids[doc] for doc in np.flatnonzero(alive).tolist()]
+        return (terms[keep], remap[docs[keep]].astype(np.int32)) + _id_array(ids)
+
+    def save(self, path):
+        """
+        Writes the compacted index to `path` atomically (temp file + rename)
+        and reloads it from there, memory-mapped.
+        Layout: magic, header length, JSON header, then 8-byte aligned
+        offsets (int64), postings (int32), candidate ids and, when ids of
+        mixed types are stored as text, one uint8 per id marking the ints.
+        """
+        np = _np()
+        with self._lock:
+            terms, docs, ids, int_ids = self._compacted()
+            self._set_base(terms, docs, ids, int_ids)
+            offsets, postings = np.asarray(self._offsets), np.asarray(self._postings)
+            header = json.dumps({
+                "terms": self.vocabulary.terms,
+                "candidates": len(ids),
+                "postings": len(postings),
+                "ids_dtype": ids.dtype.str,
+                "int_ids": int_ids is not None
+            }).encode()
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(INDEX_MAGIC + len(header).to_bytes(8, "little") + header)
+                sections = (offsets, postings, ids) + ((int_ids,) if int_ids is not None else ())
+                for section in sections:
+                    f.write(b"\0" * (-f.tell() % 8))
+                    f.write(np.ascontiguousarray(section).tobytes())
+            os.replace(tmp, path)
+        loaded = self.open(path)
+        with self._lock:
+            self.__dict__.update({k: v for k, v in loaded.__dict__.items() if k != "_lock"})
+        return path
+
+    @classmethod
+    def open(cls, path):
+        """Opens a saved index; postings and ids are memory-mapped, not read."""
+        np = _np()
+        with open(path, "rb") as f:
+            if f.read(len(INDEX_MAGIC)) != INDEX_MAGIC:
+                raise ValueError(f"{path} is not an interest index")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len))
+        index = cls()
+        index.vocabulary = InterestVocabulary(header["terms"])
+        position = len(INDEX_MAGIC) + 8 + header_len
+        layout = [(np.int64, len(header["terms"]) + 1), (np.int32, header["postings"]),
+                  (np.dtype(header["ids_dtype"]), header["candidates"])]
+        if header.get("int_ids"):
+            layout.append((np.uint8, header["candidates"]))
+        sections = []
+        for dtype, count in layout:
+            dtype = np.dtype(dtype)
+            position += -position % 8
+            if count:
+                sections.append(np.memmap(path, dtype=dtype, mode="r", offset=position, shape=(count,)))
+            else:
+                sections.append(np.zeros(0, dtype=dtype))
+            position += dtype.itemsize * count
+        index._offsets, index._postings, index._base_ids = sections[:3]
+        index._base_int_ids = sections[3] if len(sections) > 3 else None
+        return index
+
+
+def _contains_sorted(posting, docs):
+    """Which of `docs` appear in a posting list (sorted: delta docs always follow base docs)."""
+    np = _np()
+    if not len(posting):
+        return np.zeros(len(docs), dtype=bool)
+    positions = np.minimum(np.searchsorted(posting, docs), len(posting) - 1)
+    return posting[positions] == docs
+
+
+def _id_array(ids):
+    """
+    Candidate ids as (fixed-width array, int flags). All ints: int64 and no
+    flags. Otherwise unicode, with a uint8 array marking the ids that were
+    ints so they come back as ints (None when there are none).
+    """
+    np = _np()
+    is_int = [isinstance(i, int) and not isinstance(i, bool) for i in ids]
+    if all(is_int):
+        return np.asarray(ids, dtype=np.int64), None
+    text = np.asarray([str(i) for i in ids], dtype=str)
+    return text, np.asarray(is_int, dtype=np.uint8) if any(is_int) else None
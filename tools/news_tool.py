@@ -1,19 +1,43 @@
-import requests
 import os
 from .base import BaseTool
 
 class NewsTool(BaseTool):
-    def execute(self, query):
+    timeout = (3.05, 8)
+    base_url = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org")
+    cache_ttl = 5 * 60
+    compact_exclude = ("url",)
+
+    def _build_request(self, query):
         api_key = os.getenv("NEWS_API_KEY")
-        url = f"https://newsapi.org/v2/everything?q={query}&sortBy=publishedAt&pageSize=3&apiKey={api_key}"
+        url = f"{self.base_url}/v2/everything"
+        params = {
+            "q": query,
+            "sortBy": "publishedAt",
+            "pageSize": 3,
+            "apiKey": api_key
+        }
+        return url, params
+
+    def _parse_response(self, response):
+        data = response.json()
+        if response.status_code == 200:
+            articles = data.get("articles", [])
+            return [{"title": a["title"], "source": a["source"]["name"], "url": a["url"]} for a in articles]
+        return {"error": data.get("message", "Failed to fetch news")}
+
+    def execute(self, query):
+        url, params = self._build_request(query)
         
         try:
-            response = requests.get(url)
-            data = response.json()
-            if response.status_code == 200:
-                articles = data.get("articles", [])
-                return [{"title": a["title"], "source": a["source"]["name"], "url": a["url"]} for a in articles]
-            return {"error": data.get("message", "Failed to fetch news")}
+            return self._parse_response(self.http_get(url, params=params))
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aexecute(self, query):
+        url, params = self._build_request(query)
+
+        try:
+            return self._parse_response(await self.ahttp_get(url, params=params))
         except Exception as e:
             return {"error": str(e)}
 
@@ -22,4 +46,4 @@ class NewsTool(BaseTool):
             "name": "news_tool",
             "description": "Search for the latest news articles on a specific topic.",
             "parameters": {"query": "string"}
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,80 @@
+import time
+import threading
+from decimal import Decimal, InvalidOperation, ROUND_HALF_EVEN
+
+# Decimal places shown for converted amounts and for rates
+AMOUNT_PLACES = Decimal("0.0001")
+RATE_PLACES = Decimal("0.000001")
+
+# Symbols and names people use instead of ISO codes
+CURRENCY_NAMES = {
+    "$": "USD", "₹": "INR", "€": "EUR", "£": "GBP", "¥": "JPY",
+    "dollar": "USD", "dollars": "USD", "rupee": "INR", "rupees": "INR", "euro": "EUR", "euros": "EUR",
+    "pound": "GBP", "pounds": "GBP", "yen": "JPY", "dirham": "AED", "dirhams": "AED"
+}
+
+
+def to_decimal(value):
+    """Amounts as exact decimals: 10000, 10000.5, "10,000" and "1e4" are all accepted."""
+    if isinstance(value, Decimal):
+        return value
+    try:
+        # str() first so floats keep the digits they were written with
+        return Decimal(str(value).replace(",", "").strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}")
+
+
+def format_decimal(value, places):
+    """Rounded, without trailing zeros or exponent notation."""
+    text = format(value.quantize(places, rounding=ROUND_HALF_EVEN), "f")
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+class RateTable:
+    """Units of every currency per one unit of `base`, as fetched from latest/{base}."""
+
+    def __init__(self, base, rates, fetched_at=None):
+        self.base = base
+        self.rates = {code: to_decimal(rate) for code, rate in rates.items()}
+        self.rates[base] = Decimal(1)
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    def covers(self, *codes):
+        return all(code in self.rates for code in codes)
+
+    def rate(self, from_code, to_code):
+        """Cross rate from_code -> to_code, triangulated through the base when neither is it."""
+        if from_code == self.base:
+            return self.rates[to_code]
+        return self.rates[to_code] / self.rates[from_code]
+
+
+class RateBook:
+    """
+    Rate tables per base currency, each kept for `ttl` seconds.
+    Any fresh table listing both currencies of a pair can price it, so one
+    fetch answers every pair until it expires.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def find(self, *codes):
+        """A fresh table covering all `codes`, preferring one based on the first code, or None."""
+        now = time.time()
+        with self._lock:
+            tables = [t for t in self._tables.values() if now - t.fetched_at < self.ttl and t.covers(*codes)]
+        tables.sort(key=lambda t: t.base != codes[0])
+        return tables[0] if tables else None
+
+    def put(self, table):
+        with self._lock:
+            self._tables[table.base] = table
+        return table
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
@@ -0,0 +1,127 @@
+import os
+import json
+import inspect
+import pkgutil
+import importlib
+import threading
+from collections.abc import Mapping
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFINITIONS_CACHE = os.path.join(TOOLS_DIR, "__pycache__", "tool_definitions.json")
+
+
+class ToolRegistry(Mapping):
+    """
+    Single source of tools for the planner, executor and UIs.
+    Tool modules are found by name (*_tool.py) without importing them.
+    get_definition() output is cached on disk, keyed on each module's
+    mtime and size, so a warm start lists every tool without importing any.
+    Tool instances are created on first lookup and then reused.
+    """
+
+    def __init__(self, package="tools", directory=TOOLS_DIR, cache_path=DEFINITIONS_CACHE):
+        self.package = package
+        self.directory = directory
+        self.cache_path = cache_path
+        self._instances = {}
+        self._definitions = None
+        self._lock = threading.Lock()
+        self._modules = {
+            info.name: os.path.join(directory, info.name + ".py")
+            for info in pkgutil.iter_modules([directory])
+            if info.name.endswith("_tool") and not info.ispkg
+        }
+
+    # --- Mapping interface: name -> lazily created tool instance ---
+    def __getitem__(self, name):
+        instance = self._instances.get(name)
+        if instance is None:
+            if name not in self._modules:
+                raise KeyError(name)
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._load_class(name)()
+                    self._instances[name] = instance
+        return instance
+
+    def __contains__(self, name):
+        return name in self._modules
+
+    def __iter__(self):
+        return iter(sorted(self._modules))
+
+    def __len__(self):
+        return len(self._modules)
+
+    def register(self, name, tool):
+        """Adds or replaces a tool instance (e.g. a stub in benchmarks)."""
+        with self._lock:
+            self._instances[name] = tool
+            self._modules.setdefault(name, None)
+            self._definitions = None
+
+    def _load_class(self, name):
+        module = importlib.import_module(f"{self.package}.{name}")
+        # Local import: tools.base pulls in the HTTP transport
+        from tools.base import BaseTool
+        for _, obj in inspect.getmembers(module, inspect.isclass):
+            if issubclass(obj, BaseTool) and obj is not BaseTool and obj.__module__ == module.__name__:
+                return obj
+        raise ImportError(f"No BaseTool subclass found in {module.__name__}")
+
+    def _fingerprint(self, name):
+        path = self._modules.get(name)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, cache):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(cache, f)
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass  # Read-only checkout: definitions are simply rebuilt next time
+
+    def definitions(self):
+        """Every tool's get_definition(), in name order, served from cache when fresh."""
+        if self._definitions is not None:
+            return self._definitions
+
+        with self._lock:
+            if self._definitions is not None:
+                return self._definitions
+            cache = self._read_cache()
+            changed = False
+            definitions = []
+            for name in sorted(self._modules):
+                fingerprint = self._fingerprint(name)
+                entry = cache.get(name)
+                if fingerprint is None or entry is None or entry.get("fingerprint") != fingerprint:
+                    instance = self._instances.get(name)
+                    if instance is None:
+                        instance = self._instances[name] = self._load_class(name)()
+                    entry = {"fingerprint": fingerprint, "definition": instance.get_definition()}
+                    if fingerprint is not None:
+                        cache[name] = entry
+                        changed = True
+                definitions.append(entry["definition"])
+            if changed:
+                self._write_cache(cache)
+            self._definitions = definitions
+        return definitions
+
+
+# Process-wide registry shared by the agents, main.py and app.py
+registry = ToolRegistry()
@@ -0,0 +1,216 @@
+"""
+Typed argument models for tools, derived from get_definition().
+
+Each parameter's type comes from the start of its description ("string",
+"number", "optional list ...") unless the tool names a stricter type from
+this module in `arg_types`. A parameter is required when execute() has no default for it;
+rules across parameters go in a check named by the tool's `args_check`.
+Models are built once per tool class and reused; the validators below also
+normalize what planners tend to get slightly wrong.
+"""
+import re
+import inspect
+from decimal import Decimal
+from typing import Annotated, Any, Optional, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, ValidationError, create_model, model_validator
+from .rates import CURRENCY_NAMES, to_decimal
+
+# Stripped from amounts like "₹10,000" or "$25"
+CURRENCY_SYMBOLS = "$€£₹¥"
+
+
+def clean_text(value):
+    """Trimmed, with runs of whitespace collapsed; bare numbers become text."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def parse_amount(value):
+    """Amounts as people and models write them: 10000, "10,000", "1e4", "₹500"."""
+    if isinstance(value, str):
+        # A ValueError here is reported by pydantic as the field's one error
+        value = to_decimal(value.strip().lstrip(CURRENCY_SYMBOLS))
+    if isinstance(value, Decimal) and value.is_finite():
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def currency_code(value):
+    """ISO code from " usd", "USD", "rupees" or "₹"."""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    return CURRENCY_NAMES.get(value.lower(), value.upper())
+
+
+def join_list(value):
+    """["sushi", "hiking"] -> "sushi, hiking" for comma separated string parameters."""
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(item).strip() for item in value)
+    return clean_text(value)
+
+
+def repo_path(value):
+    """"https://github.com/owner/repo.git/" -> "owner/repo"."""
+    if not isinstance(value, str):
+        return value
+    value = re.sub(r"^(https?://)?(www\.)?github\.com/", "", value.strip(), flags=re.IGNORECASE)
+    return value.strip("/").removesuffix(".git")
+
+
+Text = Annotated[str, BeforeValidator(clean_text), Field(min_length=1)]
+Amount = Annotated[Union[int, float], BeforeValidator(parse_amount), Field(allow_inf_nan=False)]
+CurrencyCode = Annotated[str, BeforeValidator(currency_code), Field(pattern=r"^[A-Z]{3}$")]
+TextList = Annotated[str, BeforeValidator(join_list), Field(min_length=1)]
+RepoName = Annotated[str, BeforeValidator(repo_path), Field(pattern=r"^[\w.-]+/[\w.-]+$")]
+
+
+class Conversion(BaseModel):
+    """One item of CurrencyTool's `conversions`; missing codes default to the top-level ones."""
+    model_config = ConfigDict(extra="forbid")
+
+    from_code: Optional[CurrencyCode] = None
+    to_code: Optional[CurrencyCode] = None
+    amount: Optional[Amount] = None
+
+
+# CurrencyTool's `conversions`: items, or bare amounts converted with the top-level codes
+ConversionList = list[Union[Conversion, Amount]]
+
+
+def complete_conversions(args):
+    """
+    CurrencyTool's args name at least one whole conversion: a non-empty
+    `conversions` or from_code, to_code and amount, where each item's
+    missing parts come from the top-level args.
+    """
+    top = (args.from_code, args.to_code, args.amount)
+    if args.conversions is None:
+        items = [top]
+    elif not args.conversions:
+        raise ValueError("conversions is empty")
+    else:
+        items = [
+            (c.from_code or top[0], c.to_code or top[1], top[2] if c.amount is None else c.amount)
+            if isinstance(c, Conversion) else (top[0], top[1], c)
+            for c in args.conversions
+        ]
+    for n, item in enumerate(items):
+        missing = [name for name, value in zip(("from_code", "to_code", "amount"), item) if value is None]
+        if missing:
+            where = f"conversion {n + 1}" if args.conversions else "a conversion"
+            raise ValueError(f"{where} needs {', '.join(missing)}")
+    return args
+
+
+def resolve_type(name):
+    """A type named in a tool's `arg_types`, e.g. "CurrencyCode"; a type given as such is used as is."""
+    if not isinstance(name, str):
+        return name
+    annotation = globals().get(name)
+    if annotation is None:
+        raise ValueError(f"Unknown argument type {name!r} in arg_types")
+    return annotation
+
+
+def resolve_check(name):
+    """A whole-args check named in a tool's `args_check`, e.g. "complete_conversions"."""
+    check = globals().get(name)
+    if not callable(check):
+        raise ValueError(f"Unknown args check {name!r} in args_check")
+    return check
+
+
+def annotation_for(description):
+    """Field type from a get_definition() parameter description."""
+    text = description.lower().removeprefix("optional").strip()
+    for prefix, annotation in (("string", Text), ("number", Amount), ("integer", int), ("bool", bool),
+                               ("list", list), ("array", list)):
+        if text.startswith(prefix):
+            return annotation
+    return Any
+
+
+def build_args_model(tool):
+    """
+    Pydantic model of a tool's args, or None when its definition lists no
+    parameters. Argument names that repair_names() cannot place are dropped
+    (extra="ignore"): the tool could not have used them anyway.
+    """
+    parameters = tool.get_definition().get("parameters")
+    if not isinstance(parameters, dict):
+        return None
+    try:
+        signature = inspect.signature(tool.execute).parameters
+    except (TypeError, ValueError):
+        signature = {}
+
+    fields = {}
+    for name, description in parameters.items():
+        type_name = tool.arg_types.get(name)
+        annotation = resolve_type(type_name) if type_name else annotation_for(str(description))
+        has_default = name in signature and signature[name].default is not inspect.Parameter.empty
+        if has_default or str(description).lower().startswith("optional"):
+            fields[name] = (Optional[annotation], None)
+        else:
+            fields[name] = (annotation, ...)
+    validators = {}
+    if tool.args_check:
+        validators[tool.args_check] = model_validator(mode="after")(resolve_check(tool.args_check))
+    return create_model(f"{type(tool).__name__}Args", __config__=ConfigDict(extra="ignore"),
+                        __validators__=validators, **fields)
+
+
+def _name_key(name):
+    return re.sub(r"[^a-z0-9]", "", str(name).lower())
+
+
+def repair_names(args, fields):
+    """
+    Maps misspelt argument names onto the model's: "fromCode", "From Code"
+    or "from" for "from_code", and any single unknown name for a
+    one-parameter tool.
+    """
+    by_key = {_name_key(name): name for name in fields}
+    repaired = {}
+    for name, value in args.items():
+        if name not in fields:
+            key = _name_key(name)
+            prefixed = [field for field_key, field in by_key.items() if key and field_key.startswith(key)]
+            name = by_key.get(key) or (prefixed[0] if len(prefixed) == 1 else name)
+        repaired.setdefault(name, value)
+    unknown = [name for name in repaired if name not in fields]
+    if len(fields) == 1 and len(unknown) == 1 and not set(fields) & set(repaired):
+        repaired[next(iter(fields))] = repaired.pop(unknown[0])
+    return repaired
+
+
+def describe_errors(errors):
+    """ValidationError.errors() as one short line for the step's error output."""
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc']) or 'args'}: {e['msg']}" for e in errors)
+
+
+def check_args(model, tool_name, args, is_unresolved=None):
+    """
+    Returns (normalized_args, None) or (None, error). Values for which
+    `is_unresolved` is true still hold step references and pass through
+    unchecked; they are checked once the executor has substituted them.
+    """
+    if not isinstance(args, dict):
+        return None, f"Invalid args for {tool_name}: expected an object."
+    args = repair_names(args, model.model_fields)
+    pending = {name: value for name, value in args.items() if is_unresolved and is_unresolved(value)}
+    try:
+        checked = model.model_validate({k: v for k, v in args.items() if k not in pending})
+    except ValidationError as e:
+        # Missing fields and whole-args checks wait until the referenced values are substituted
+        errors = [err for err in e.errors()
+                  if not (pending and (not err["loc"] or err["type"] == "missing" and err["loc"][0] in pending))]
+        if errors:
+            return None, f"Invalid args for {tool_name}: {describe_errors(errors)}"
+        # Only the referenced fields are missing; the rest is checked again after resolution
+        return args, None
+    return {**checked.model_dump(exclude_unset=True), **pending}, None
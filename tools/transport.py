@@ -0,0 +1,90 @@
+import threading
+import weakref
+import asyncio
+from urllib.parse import urlsplit
+
+
+
+class HttpTransport:
+    """
+    Process-wide HTTP layer shared by every tool.
+    Keeps one keep-alive requests.Session per host so repeated calls reuse
+    pooled connections instead of paying DNS + TCP + TLS setup each time.
+    The async side keeps one pooled httpx.AsyncClient per event loop.
+    """
+
+    def __init__(self, pool_maxsize=32, max_retries=1, max_async_connections=512):
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.max_async_connections = max_async_connections
+        self._sessions = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _session_for(self, url):
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    # Imported on first use to keep startup light
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    # Retries only cover connection failures, never a sent request
+                    adapter = HTTPAdapter(
+                        pool_connections=1,
+                        pool_maxsize=self.pool_maxsize,
+                        max_retries=self.max_retries
+                    )
+                    session.mount(host, adapter)
+                    self._sessions[host] = session
+        return session
+
+    def _async_client(self):
+        import httpx
+        # httpx clients are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_async_connections,
+                    max_keepalive_connections=self.pool_maxsize
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=self.max_retries)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    def get(self, url, timeout, **kwargs):
+        return self._session_for(url).get(url, timeout=timeout, **kwargs)
+
+    async def aget(self, url, timeout, **kwargs):
+        return await self._arequest("GET", url, timeout, **kwargs)
+
+    def post(self, url, timeout, **kwargs):
+        return self._session_for(url).post(url, timeout=timeout, **kwargs)
+
+    async def apost(self, url, timeout, **kwargs):
+        return await self._arequest("POST", url, timeout, **kwargs)
+
+    async def _arequest(self, method, url, timeout, **kwargs):
+        import httpx
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return await self._async_client().request(
+            method, url, timeout=httpx.Timeout(read, connect=connect), **kwargs
+        )
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+    async def aclose(self):
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
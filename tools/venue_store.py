@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import math
+import time
+import sqlite3
+import threading
+
+# Grid cell size in degrees (~1.1 km of latitude)
+CELL_DEG = 0.01
+KM_PER_DEG = 111.32
+
+# Canonical category -> phrases people (and the planner) use for it
+CATEGORY_SYNONYMS = {
+    "cafe": ("cafe", "cafes", "café", "coffee", "coffee shop", "coffee house", "coffeehouse", "tea house"),
+    "restaurant": ("restaurant", "restaurants", "dinner", "lunch", "dining", "eatery", "food", "fine dining"),
+    "bar": ("bar", "bars", "pub", "pubs", "lounge", "brewery", "brewpub", "cocktail bar", "drinks"),
+    "dessert": ("dessert", "desserts", "ice cream", "gelato", "bakery", "patisserie"),
+    "park": ("park", "parks", "garden", "gardens", "picnic spot"),
+    "pizza": ("pizza", "pizzeria", "pizzas"),
+    "cinema": ("cinema", "cinemas", "movie", "movies", "movie theater", "movie theatre", "theatre", "theater"),
+    "museum": ("museum", "museums", "art gallery", "gallery")
+}
+_SYNONYMS = {phrase: canonical for canonical, phrases in CATEGORY_SYNONYMS.items() for phrase in phrases}
+_LONGEST_SYNONYM = max(len(phrase.split()) for phrase in _SYNONYMS)
+
+# Words that describe the mood, not the kind of venue
+DESCRIPTORS = {
+    "romantic", "cozy", "cosy", "best", "good", "nice", "great", "quiet", "cute", "top", "popular",
+    "famous", "date", "spot", "spots", "place", "places", "a", "an", "the", "some", "for"
+}
+
+# Segment aliases so "Bengaluru" and "Bangalore" share a location
+CITY_ALIASES = {"bengaluru": "bangalore", "bombay": "mumbai", "gurugram": "gurgaon", "new delhi": "delhi"}
+# Trailing segments that add nothing to a location served in one country
+COUNTRY_SEGMENTS = {"india"}
+
+
+def _singular(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def normalize_category(category):
+    """
+    Canonical venue category: descriptors dropped, synonym phrases folded
+    and plurals trimmed, so "romantic Cafes" and "coffee shop" are both
+    "cafe". Qualifiers that are neither are kept: "Italian restaurants" is
+    "italian restaurant", never plain "restaurant".
+    """
+    words = [w for w in re.sub(r"[^\w\s]", " ", category.lower()).split() if w not in DESCRIPTORS and not w.isdigit()]
+    folded, i = [], 0
+    while i < len(words):
+        # Longest synonym phrase starting here, e.g. "fine dining" before "dining"
+        for size in range(min(_LONGEST_SYNONYM, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + size])
+            if phrase in _SYNONYMS:
+                folded.append(_SYNONYMS[phrase])
+                i += size
+                break
+        else:
+            folded.append(_singular(words[i]))
+            i += 1
+    return " ".join(folded)
+
+
+def normalize_location(location):
+    """
+    Location key: every comma segment, whitespace collapsed and city
+    aliases folded, so "Indiranagar, Bengaluru" and "indiranagar,
+    bangalore, India" match but "MG Road, Pune" and "MG Road, Bangalore"
+    do not.
+    """
+    segments = [" ".join(s.split()) for s in location.lower().split(",")]
+    segments = [CITY_ALIASES.get(s, s) for s in segments if s]
+    while len(segments) > 1 and segments[-1] in COUNTRY_SEGMENTS:
+        segments.pop()
+    return ", ".join(segments)
+
+
+def cell_of(lat, lon):
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Haversine distance."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class VenueStore:
+    """
+    Persistent venue store behind DatePlannerTool.
+
+    Every TomTom result is kept with its coordinates, indexed by grid cell
+    and normalized category, and every search is remembered per
+    (location key, category). A later search is answered locally when the
+    same location/category was fetched recently (whatever the wording), or
+    when enough venues of that category are already known around the
+    location's centre. Answers older than `stale_after` are still served,
+    but flagged so the caller refreshes them; past `max_age` they are misses.
+
+    A bare neighbourhood ("Indiranagar") shares the entry of the one
+    qualified location it is known by ("Indiranagar, Bangalore"), in either
+    order; once two cities qualify it, the bare name stands on its own.
+    """
+
+    def __init__(self, path=":memory:", stale_after=12 * 3600, max_age=7 * 24 * 3600, radius_km=2.5):
+        self.path = path
+        self.stale_after = stale_after
+        self.max_age = max_age
+        self.radius_km = radius_km
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS venues ("
+            " id TEXT NOT NULL, name TEXT NOT NULL, category TEXT, norm_category TEXT NOT NULL,"
+            " address TEXT, lat REAL NOT NULL, lon REAL NOT NULL, cell_lat INTEGER NOT NULL,"
+            " cell_lon INTEGER NOT NULL, fetched_at REAL NOT NULL,"
+            # A venue found by several searches is indexed under each category
+            " PRIMARY KEY (id, norm_category));"
+            "CREATE INDEX IF NOT EXISTS venues_by_cell ON venues (norm_category, cell_lat, cell_lon);"
+            "CREATE TABLE IF NOT EXISTS searches ("
+            " location_key TEXT NOT NULL, norm_category TEXT NOT NULL, location TEXT NOT NULL,"
+            " category TEXT NOT NULL, output TEXT NOT NULL, fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (location_key, norm_category));"
+            "CREATE TABLE IF NOT EXISTS locations ("
+            " location_key TEXT PRIMARY KEY, location TEXT NOT NULL, lat REAL, lon REAL,"
+            " hits INTEGER NOT NULL DEFAULT 0, prefetched_at REAL);"
+            # Bare neighbourhood -> its one qualified location key, '' once it is ambiguous
+            "CREATE TABLE IF NOT EXISTS place_names (name TEXT PRIMARY KEY, location_key TEXT NOT NULL);"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            path=os.getenv("VENUE_STORE_PATH") or ":memory:",
+            stale_after=float(os.getenv("VENUE_STALE_AFTER", str(12 * 3600))),
+            max_age=float(os.getenv("VENUE_MAX_AGE", str(7 * 24 * 3600)))
+        )
+
+    # --- location keys (called with the lock held) ---
+    def _location_key(self, location):
+        """The key `location` is stored under: a bare name resolves to its qualified location."""
+        location_key = normalize_location(location)
+        if "," not in location_key:
+            row = self._conn.execute("SELECT location_key FROM place_names WHERE name = ?", (location_key,)).fetchone()
+            if row is not None and row[0]:
+                return row[0]
+        return location_key
+
+    def _link_name(self, location_key):
+        """
+        Records that a qualified key's first segment names it. The first
+        time, whatever was stored under the bare name moves to the key.
+        """
+        name = location_key.split(",")[0]
+        if name == location_key:
+            return
+        row = self._conn.execute("SELECT location_key FROM place_names WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            if row[0] and row[0] != location_key:
+                self._conn.execute("UPDATE place_names SET location_key = '' WHERE name = ?", (name,))
+            return
+        self._conn.execute("INSERT INTO place_names (name, location_key) VALUES (?, ?)", (name, location_key))
+        # Searches the key already has win; the bare name's hits add to its own
+        self._conn.execute(
+            "UPDATE OR IGNORE searches SET location_key = ? WHERE location_key = ?", (location_key, name)
+        )
+        self._conn.execute("DELETE FROM searches WHERE location_key = ?", (name,))
+        bare = self._conn.execute(
+            "SELECT location, lat, lon, hits, prefetched_at FROM locations WHERE location_key = ?", (name,)
+        ).fetchone()
+        if bare is not None:
+            self._conn.execute(
+                "INSERT INTO locations (location_key, location, lat, lon, hits, prefetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(location_key) DO UPDATE SET "
+                "lat = COALESCE(lat, excluded.lat), lon = COALESCE(lon, excluded.lon), hits = hits + excluded.hits",
+                (location_key, *bare)
+            )
+            self._conn.execute("DELETE FROM locations WHERE location_key = ?", (name,))
+
+    # --- reads ---
+    def location_key(self, location):
+        """The key a location's searches are stored under."""
+        with self._lock:
+            return self._location_key(location)
+
+    def lookup(self, location, category, limit=3):
+        """
+        Returns (venues, stale) in the tool's output format, or None when the
+        network has to be asked. Counts the location's popularity either way.
+        """
+        norm_category = normalize_category(category)
+        now = time.time()
+        with self._lock:
+            self._link_name(normalize_location(location))
+            location_key = self._location_key(location)
+            self._conn.execute(
+                "INSERT INTO locations (location_key, location, hits) VALUES (?, ?, 1) "
+                "ON CONFLICT(location_key) DO UPDATE SET hits = hits + 1",
+                (location_key, location)
+            )
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT output, fetched_at FROM searches WHERE location_key = ? AND norm_category = ?",
+                (location_key, norm_category)
+            ).fetchone()
+            centre = self._conn.execute(
+                "SELECT lat, lon FROM locations WHERE location_key = ? AND lat IS NOT NULL", (location_key,)
+            ).fetchone()
+
+        if row is not None and now - row[1] < self.max_age:
+            self.hits += 1
+            return json.loads(row[0])[:limit], now - row[1] > self.stale_after
+
+        if centre is not None:
+            venues, oldest = self.nearby(centre[0], centre[1], norm_category, limit, now)
+            if len(venues) >= limit:
+                self.hits += 1
+                return venues, now - oldest > self.stale_after
+        self.misses += 1
+        return None
+
+    def nearby(self, lat, lon, norm_category, limit, now=None):
+        """Up to `limit` known venues of a category within radius_km, nearest first, plus the oldest fetch time."""
+        now = now or time.time()
+        # Cells are square in degrees; longitude degrees shrink with cos(latitude)
+        span_lat = math.ceil(self.radius_km / (KM_PER_DEG * CELL_DEG))
+        span_lon = math.ceil(self.radius_km / (KM_PER_DEG * max(math.cos(math.radians(lat)), 0.01) * CELL_DEG))
+        cell_lat, cell_lon = cell_of(lat, lon)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, category, address, lat, lon, fetched_at FROM venues "
+                "WHERE norm_category = ? AND cell_lat BETWEEN ? AND ? AND cell_lon BETWEEN ? AND ? AND fetched_at > ?",
+                (norm_category, cell_lat - span_lat, cell_lat + span_lat, cell_lon - span_lon, cell_lon + span_lon,
+                 now - self.max_age)
+            ).fetchall()
+        found = sorted((distance_km(lat, lon, r[3], r[4]), r) for r in rows)
+        found = [(d, r) for d, r in found if d <= self.radius_km][:limit]
+        venues = [
+            {"name": r[0], "category": r[1], "address": r[2], "distance": f"{d:.1f}km"}
+            for d, r in found
+        ]
+        return venues, min((r[5] for _, r in found), default=now)
+
+    def location_stats(self, location):
+        """(hits, prefetched_at) for a location, or (0, None) if never looked up."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT hits, prefetched_at FROM locations WHERE location_key = ?", (self._location_key(location),)
+            ).fetchone()
+        return tuple(row) if row else (0, None)
+
+    def popular_locations(self, min_hits, limit=20):
+        """Most requested locations with at least `min_hits` lookups, as (location, hits, prefetched_at)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT location, hits, prefetched_at FROM locations WHERE hits >= ? ORDER BY hits DESC LIMIT ?",
+                (min_hits, limit)
+            ).fetchall()
+
+    def known_categories(self, location):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT norm_category, fetched_at FROM searches WHERE location_key = ?", (self._location_key(location),)
+            ).fetchall()
+        return {category: fetched_at for category, fetched_at in rows}
+
+    # --- writes ---
+    def ingest(self, location, category, results, output):
+        """
+        Stores one TomTom response: every result with a position, the
+        formatted tool output for this search, and the location's centre.
+        """
+        norm_category = normalize_category(category)
+        now = time.time()
+        venues, lats, lons = [], [], []
+        for place in results:
+            position = place.get("position") or {}
+            if "lat" not in position or "lon" not in position:
+                continue
+            poi, addr = place.get("poi", {}), place.get("address", {})
+            name = poi.get("name", "Unknown Venue")
+            address = addr.get("freeformAddress", "Address not available")
+            lat, lon = float(position["lat"]), float(position["lon"])
+            venues.append((
+                f"{name}|{address}".lower(), name, poi.get("categories", ["Venue"])[0], norm_category,
+                address, lat, lon, *cell_of(lat, lon), now
+            ))
+            lats.append(lat)
+            lons.append(lon)
+
+        with self._lock:
+            self._link_name(normalize_location(location))
+            location_key = self._location_key(location)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO venues (id, name, category, norm_category, address, lat, lon, "
+                "cell_lat, cell_lon, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                venues
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (location_key, norm_category, location, category, output, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (location_key, norm_category, location, category, json.dumps(output), now)
+            )
+            if lats:
+                # Centroid of what the search returned stands in for geocoding the location
+                self._conn.execute(
+                    "INSERT INTO locations (location_key, location, lat, lon) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(location_key) DO UPDATE SET lat = COALESCE(lat, excluded.lat), "
+                    "lon = COALESCE(lon, excluded.lon)",
+                    (location_key, location, sum(lats) / len(lats), sum(lons) / len(lons))
+                )
+            self._conn.commit()
+
+    def mark_prefetched(self, location):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE locations SET prefetched_at = ? WHERE location_key = ?",
+                (time.time(), self._location_key(location))
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript("DELETE FROM venues; DELETE FROM searches; DELETE FROM locations; DELETE FROM place_names;")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            venues = self._conn.execute("SELECT COUNT(*) FROM venues").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "venues": venues
+        }
+
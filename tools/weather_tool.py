@@ -1,15 +1,29 @@
-import requests
 import os
+import asyncio
 from .base import BaseTool
 
+# Most city ids one /group request accepts
+GROUP_LIMIT = 20
+
 class WeatherTool(BaseTool):
-    def execute(self, city):
+    timeout = (3.05, 5)
+    base_url = os.getenv("WEATHER_API_BASE_URL", "https://api.openweathermap.org")
+    # Conditions change slowly enough for a few minutes of reuse
+    cache_ttl = 10 * 60
+    answer_templates = (
+        "It is currently {temperature}°C in {city} with {condition} and {humidity}% humidity.",
+    )
+    # OpenWeather city ids by requested city name, learned from earlier answers.
+    # The /group endpoint only takes ids, so only known cities can be batched.
+    _city_ids = {}
+
+    def _build_request(self, city):
         api_key = os.getenv("WEATHER_API_KEY")
         if not api_key:
-            return {"error": "Missing Weather API Key in .env file"}
+            return None, {"error": "Missing Weather API Key in .env file"}
         
         # Standard Current Weather endpoint
-        url = "https://api.openweathermap.org/data/2.5/weather"
+        url = f"{self.base_url}/data/2.5/weather"
         
         # FIX: 'metric' must be in quotes as it is a string value for the API
         params = {
@@ -17,26 +31,89 @@ class WeatherTool(BaseTool):
             "appid": api_key,
             "units": "metric"  
         }
+        return (url, params), None
+
+    def _parse_response(self, response, city=None):
+        data = response.json()
         
+        if response.status_code == 200:
+            if city and data.get("id"):
+                self._city_ids[self._city_key(city)] = data["id"]
+            return self._format(data)
+        else:
+            return {"error": f"API Error {response.status_code}: {data.get('message', 'Unknown error')}"}
+
+    def _format(self, data):
+        return {
+            "city": data.get("name"),
+            "temperature": data["main"].get("temp"),
+            "condition": data["weather"][0].get("description"),
+            "humidity": data["main"].get("humidity")
+        }
+
+    @staticmethod
+    def _city_key(city):
+        return " ".join(str(city).lower().split())
+
+    def execute(self, city):
+        request, error = self._build_request(city)
+        if error:
+            return error
+        url, params = request
+
         try:
-            response = requests.get(url, params=params)
-            data = response.json()
-            
-            if response.status_code == 200:
-                return {
-                    "city": data.get("name"),
-                    "temperature": data["main"].get("temp"),
-                    "condition": data["weather"][0].get("description"),
-                    "humidity": data["main"].get("humidity")
-                }
-            else:
-                return {"error": f"API Error {response.status_code}: {data.get('message', 'Unknown error')}"}
+            return self._parse_response(self.http_get(url, params=params), city)
         except Exception as e:
             return {"error": f"Connection error: {str(e)}"}
 
+    async def aexecute(self, city):
+        request, error = self._build_request(city)
+        if error:
+            return error
+        url, params = request
+
+        try:
+            return self._parse_response(await self.ahttp_get(url, params=params), city)
+        except Exception as e:
+            return {"error": f"Connection error: {str(e)}"}
+
+    async def _afetch_group(self, city_ids):
+        """Current weather for up to GROUP_LIMIT city ids in one request, by id, or None on failure."""
+        params = {"id": ",".join(str(i) for i in city_ids), "appid": os.getenv("WEATHER_API_KEY"), "units": "metric"}
+        try:
+            response = await self.ahttp_get(f"{self.base_url}/data/2.5/group", params=params)
+            if response.status_code != 200:
+                return None
+            return {item["id"]: self._format(item) for item in response.json().get("list", [])}
+        except Exception:
+            return None
+
+    async def aexecute_batch(self, calls):
+        """
+        Cities seen before go out in /group requests of up to GROUP_LIMIT ids;
+        new cities (and any the group answer lacks) are fetched one by one,
+        which also learns their ids for next time.
+        """
+        ids = [self._city_ids.get(self._city_key(c.get("city", ""))) for c in calls]
+        known = [i for i, city_id in enumerate(ids) if city_id is not None]
+        if len(known) < 2 or not os.getenv("WEATHER_API_KEY"):
+            return await super().aexecute_batch(calls)
+
+        chunks = [known[n:n + GROUP_LIMIT] for n in range(0, len(known), GROUP_LIMIT)]
+        groups = await asyncio.gather(*(self._afetch_group([ids[i] for i in chunk]) for chunk in chunks))
+        outputs = [None] * len(calls)
+        for chunk, found in zip(chunks, groups):
+            for i in chunk:
+                if found and ids[i] in found:
+                    outputs[i] = found[ids[i]]
+        rest = [i for i, output in enumerate(outputs) if output is None]
+        for i, output in zip(rest, await super().aexecute_batch([calls[i] for i in rest])):
+            outputs[i] = output
+        return outputs
+
     def get_definition(self):
         return {
             "name": "weather_tool",
             "description": "Get current weather for a city including temperature and conditions.",
             "parameters": {"city": "string"}
-        }
\ No newline at end of file
+        }